@@ -0,0 +1,375 @@
+"""
+Matchmaking simulator / benchmark.
+
+Drives synthetic users (see bench/seed.py) through the real API: POST /matchmaking/me/join,
+GET /matchmaking/me/poll until 'found' or 'timeout', and, for users who became hosts, waits
+until a guest lands in their session (GET /matchmaking/me/session, or the 'session_found'
+socket event with --socket-url). By default the app runs in-process through httpx's
+ASGITransport, so no server is needed; --base-url points it at a running uvicorn instead.
+
+Reports:
+    time to match p50 / p95 / p99 (join -> partner known, for guests and hosts)
+    match rate (matched users / simulated users)
+    queries per match, per join and per poll (SQLAlchemy cursor executions, in-process only)
+    candidate rejections by reason code (services/matchmaking_rejections.py, in-process only)
+    CPU ms per poll (process CPU time / polls, in-process only, includes the join work)
+    poll latency p50 / p95 / p99
+
+Save a run with --save-baseline and compare later runs with --baseline; the process exits
+non-zero when a metric regresses by more than --tolerance.
+
+ONLY run this against a throwaway local Postgres:
+    DB_HOST=localhost DB_SSLMODE=disable python -m bench.matchmaking --seed --users 1000
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+from jose import jwt
+
+from migrations.explain_hot_queries import _is_local
+
+# metric -> True when higher is better
+BASELINE_METRICS = {
+    "time_to_match_p50_seconds": False,
+    "time_to_match_p95_seconds": False,
+    "time_to_match_p99_seconds": False,
+    "match_rate": True,
+    "queries_per_match": False,
+    "queries_per_poll": False,
+    "cpu_ms_per_poll": False,
+    "poll_latency_p95_ms": False,
+}
+
+current_op: contextvars.ContextVar[str] = contextvars.ContextVar("bench_op", default="other")
+
+
+@dataclass
+class BenchStats:
+    time_to_match: List[float] = field(default_factory=list)
+    poll_latency: List[float] = field(default_factory=list)
+    roles: Counter = field(default_factory=Counter)
+    requests: Counter = field(default_factory=Counter)
+    queries: Counter = field(default_factory=Counter)
+    socket_events: Counter = field(default_factory=Counter)
+    errors: Counter = field(default_factory=Counter)
+    users: int = 0
+    unmatched: int = 0
+
+
+def _mint_token(uid: str, secret: str) -> str:
+    """A Supabase-shaped access token, so the requests go through the real auth_user dependency."""
+    now = int(time.time())
+    claims = {"sub": uid, "aud": "authenticated", "role": "authenticated", "iat": now, "exp": now + 3600}
+    return jwt.encode(claims, secret, algorithm="HS256")
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _count_queries(stats: BenchStats):
+    """Count cursor executions per simulated operation (join / poll / state) via engine events."""
+    from sqlalchemy import event
+    from models.db import engine
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats.queries[current_op.get()] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return lambda: event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def _request(client: httpx.AsyncClient, stats: BenchStats, op: str, method: str, url: str, token: str):
+    token_op = current_op.set(op)
+    try:
+        stats.requests[op] += 1
+        response = await client.request(method, url, headers={"Authorization": f"Bearer {token}"})
+    finally:
+        current_op.reset(token_op)
+    if response.status_code >= 400:
+        stats.errors[f"{op} {response.status_code}"] += 1
+        return None
+    return response.json()
+
+
+async def _connect_socket(socket_url: str, token: str, stats: BenchStats, session_found: asyncio.Event):
+    try:
+        import socketio
+    except ImportError:
+        sys.exit("--socket-url needs python-socketio with its asyncio client extras (pip install 'python-socketio[asyncio_client]')")
+
+    sio = socketio.AsyncClient(reconnection=False)
+
+    @sio.on("*")
+    async def on_any(event, data=None):
+        stats.socket_events[event] += 1
+        if event == "session_found":
+            session_found.set()
+
+    await sio.connect(socket_url, auth={"token": token}, transports=["websocket"], socketio_path="socket.io")
+    return sio
+
+
+async def _wait_for_guest(client, stats: BenchStats, token: str, args, session_found: Optional[asyncio.Event], inflight: asyncio.Semaphore) -> bool:
+    """A host is matched once a guest joins their session."""
+    deadline = time.perf_counter() + args.host_wait
+    while time.perf_counter() < deadline:
+        if session_found is not None:
+            try:
+                await asyncio.wait_for(session_found.wait(), timeout=deadline - time.perf_counter())
+                return True
+            except asyncio.TimeoutError:
+                return False
+
+        async with inflight:
+            state = await _request(client, stats, "state", "GET", "/matchmaking/me/session", token)
+        session = (state or {}).get("session") or {}
+        if session.get("guest_uid"):
+            return True
+        await asyncio.sleep(args.poll_interval)
+    return False
+
+
+async def _simulate_user(client, stats: BenchStats, uid: str, delay: float, args, secret: str, inflight: asyncio.Semaphore):
+    await asyncio.sleep(delay)
+    token = _mint_token(uid, secret)
+
+    sio = None
+    session_found = None
+    if args.socket_url:
+        session_found = asyncio.Event()
+        sio = await _connect_socket(args.socket_url, token, stats, session_found)
+
+    try:
+        started = time.perf_counter()
+        async with inflight:
+            joined = await _request(client, stats, "join", "POST", "/matchmaking/me/join", token)
+        if joined is None:
+            stats.unmatched += 1
+            return
+
+        while True:
+            async with inflight:
+                poll_started = time.perf_counter()
+                result = await _request(client, stats, "poll", "GET", "/matchmaking/me/poll", token)
+                stats.poll_latency.append(time.perf_counter() - poll_started)
+
+            status = (result or {}).get("status")
+            if status == "found":
+                stats.roles[result.get("role") or "guest"] += 1
+                stats.time_to_match.append(time.perf_counter() - started)
+                return
+            if status == "timeout":
+                stats.roles["host"] += 1
+                if await _wait_for_guest(client, stats, token, args, session_found, inflight):
+                    stats.time_to_match.append(time.perf_counter() - started)
+                else:
+                    stats.unmatched += 1
+                return
+            if status != "searching":
+                stats.unmatched += 1
+                return
+            await asyncio.sleep(args.poll_interval)
+    finally:
+        if sio is not None:
+            await sio.disconnect()
+
+
+def _summarize(
+    stats: BenchStats,
+    wall_seconds: float,
+    cpu_seconds: Optional[float],
+    in_process: bool,
+    rejections: Optional[Dict[str, int]] = None,
+) -> Dict[str, Any]:
+    matched = len(stats.time_to_match)
+    polls = stats.requests["poll"]
+    total_queries = sum(stats.queries.values())
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    def seconds(value):
+        return round(value, 3) if value is not None else None
+
+    return {
+        "users": stats.users,
+        "matched_users": matched,
+        "unmatched_users": stats.unmatched,
+        "match_rate": round(matched / stats.users, 4) if stats.users else 0.0,
+        "roles": dict(stats.roles),
+        "time_to_match_p50_seconds": seconds(_percentile(stats.time_to_match, 50)),
+        "time_to_match_p95_seconds": seconds(_percentile(stats.time_to_match, 95)),
+        "time_to_match_p99_seconds": seconds(_percentile(stats.time_to_match, 99)),
+        "time_to_match_mean_seconds": seconds(statistics.fmean(stats.time_to_match)) if matched else None,
+        "poll_latency_p50_ms": ms(_percentile(stats.poll_latency, 50)),
+        "poll_latency_p95_ms": ms(_percentile(stats.poll_latency, 95)),
+        "poll_latency_p99_ms": ms(_percentile(stats.poll_latency, 99)),
+        "requests": dict(stats.requests),
+        "queries": dict(stats.queries) if in_process else None,
+        "queries_per_match": round(total_queries / matched, 2) if in_process and matched else None,
+        "queries_per_join": round(stats.queries["join"] / stats.requests["join"], 2) if in_process and stats.requests["join"] else None,
+        "queries_per_poll": round(stats.queries["poll"] / polls, 2) if in_process and polls else None,
+        "cpu_ms_per_poll": ms(cpu_seconds / polls) if cpu_seconds is not None and polls else None,
+        "socket_events": dict(stats.socket_events),
+        "rejections": rejections,
+        "errors": dict(stats.errors),
+        "wall_seconds": round(wall_seconds, 3),
+    }
+
+
+def _compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print a metric by metric comparison and return the regressions beyond tolerance."""
+    regressions = []
+    print(f"\n{'metric':<28}{'baseline':>12}{'current':>12}{'change':>10}")
+    for metric, higher_is_better in BASELINE_METRICS.items():
+        before, after = baseline.get(metric), result.get(metric)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before if before else 0.0
+        worse = -change if higher_is_better else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        print(f"{metric:<28}{before:>12}{after:>12}{change:>+10.1%}{flag}")
+        if flag:
+            regressions.append(f"{metric}: {before} -> {after} ({change:+.1%})")
+    return regressions
+
+
+async def run_simulation(args, uids: List[str], secret: str) -> Dict[str, Any]:
+    stats = BenchStats(users=len(uids))
+    in_process = not args.base_url
+    inflight = asyncio.Semaphore(args.max_inflight)
+
+    stop_counting = None
+    if in_process:
+        import controllers.matchmaking as matchmaking
+        from main import app
+        from config import settings
+        from services import matchmaking_rejections
+        from services.matchmaking_rounds import run_matchmaking_rounds
+        from services.matchmaking_timers import bind_loop, unbind_loop
+
+        matchmaking_rejections.reset()
+        if args.timeout is not None:
+            matchmaking.MATCHMAKING_TIMEOUT_SECONDS = args.timeout
+        # ASGITransport does not run the lifespan hook, bind the host promotion timers
+        # (and start the batch rounds) ourselves
+        bind_loop(asyncio.get_running_loop())
+        if args.rounds_ms:
+            settings.matchmaking_round_interval_ms = args.rounds_ms
+            rounds_stop = asyncio.Event()
+            rounds_task = asyncio.create_task(run_matchmaking_rounds(rounds_stop))
+        stop_counting = _count_queries(stats)
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench")
+    else:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+
+    rng = random.Random(args.seed)
+    delays = sorted(rng.uniform(0, len(uids) / args.arrival_rate) for _ in uids)
+
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            _simulate_user(client, stats, uid, delay, args, secret, inflight)
+            for uid, delay in zip(uids, delays)
+        ))
+    finally:
+        wall_seconds = time.perf_counter() - wall_started
+        cpu_seconds = time.process_time() - cpu_started if in_process else None
+        await client.aclose()
+        if in_process:
+            if args.rounds_ms:
+                rounds_stop.set()
+                await rounds_task
+            stop_counting()
+            unbind_loop()
+
+    rejections = matchmaking_rejections.rejection_report()["rejections"] if in_process else None
+    return _summarize(stats, wall_seconds, cpu_seconds, in_process, rejections)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Matchmaking simulator and benchmark")
+    parser.add_argument("--users", type=int, default=1000, help="Number of simulated users")
+    parser.add_argument("--seed", action="store_true", help="(Re)seed the bench population before running")
+    parser.add_argument("--random-seed", dest="random_seed", type=int, default=42, help="Seed for population and arrivals")
+    parser.add_argument("--selectivity", type=float, default=0.3, help="Share of seeded users with extra_options filters")
+    parser.add_argument("--arrival-rate", type=float, default=50.0, help="Users joining the queue per second")
+    parser.add_argument("--poll-interval", type=float, default=None, help="Seconds between polls (default: MATCHMAKING_POLL_INTERVAL_SECONDS)")
+    parser.add_argument("--rounds-ms", type=int, default=0, help="Pair users in batch rounds every N ms (in-process only)")
+    parser.add_argument("--timeout", type=int, default=None, help="Override MATCHMAKING_TIMEOUT_SECONDS (in-process only)")
+    parser.add_argument("--host-wait", type=float, default=30.0, help="Seconds a host waits for a guest before counting as unmatched")
+    # keep this below the engine pool (pool_size + max_overflow): the async poll route checks
+    # connections out on the event loop, so a starved pool stalls every in-flight request
+    parser.add_argument("--max-inflight", type=int, default=4, help="Max concurrent HTTP requests")
+    parser.add_argument("--base-url", default=None, help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--socket-url", default=None, help="Also connect every user to this Socket.IO server (needs --base-url)")
+    parser.add_argument("--baseline", default=None, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", default=None, help="Write this run's results to a JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression before failing")
+    parser.add_argument("--log-level", default="WARNING", help="Log level for the app loggers during the run")
+    parser.add_argument("--allow-remote", action="store_true", help="Allow running against a non-local DB_HOST")
+    args = parser.parse_args()
+    args.seed_population, args.seed = args.seed, args.random_seed
+
+    if args.socket_url and not args.base_url:
+        sys.exit("--socket-url needs --base-url (Socket.IO cannot run over the in-process transport)")
+
+    from config import settings
+    from controllers.matchmaking import MATCHMAKING_POLL_INTERVAL_SECONDS
+    from models.db import engine
+    from bench.seed import load_bench_uids, reset_matchmaking_state, seed_users
+
+    if not args.allow_remote and not _is_local(settings.db_host):
+        sys.exit(f"Refusing to run against non-local DB_HOST '{settings.db_host}' (use --allow-remote)")
+
+    if args.poll_interval is None:
+        args.poll_interval = MATCHMAKING_POLL_INTERVAL_SECONDS
+
+    if args.seed_population:
+        seed_users(engine, args.users, seed=args.seed, selectivity=args.selectivity)
+    reset_matchmaking_state(engine)
+
+    uids = load_bench_uids(engine, limit=args.users)
+    if not uids:
+        sys.exit("No bench users found, run with --seed first")
+
+    logging.getLogger().setLevel(args.log_level)
+    for name in ("matchmaking", "janitor", "httpx"):
+        logging.getLogger(name).setLevel(args.log_level)
+
+    result = asyncio.run(run_simulation(args, uids, settings.supabase_jwt_secret))
+    print(json.dumps(result, indent=2))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nSaved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = _compare(result, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
@@ -0,0 +1,200 @@
+"""
+Profile save benchmark.
+
+Sends PUT /profile/me (the route the app uses for every profile save, it creates the profile when
+there is none) for the synthetic users of bench/seed.py, with random but valid payloads drawn from
+the real enums, and reports per operation:
+    statements per request (SQLAlchemy cursor executions, so lookup table loads count too)
+    latency p50 / p95 / p99
+
+With --fresh the bench users' profiles are deleted first, so each user's first save goes through
+the create path ('create') and the next ones through the update path ('update').
+
+The app runs in-process through httpx's ASGITransport, same as bench/matchmaking.py.
+
+ONLY run this against a throwaway local Postgres:
+    DB_HOST=localhost DB_SSLMODE=disable python -m bench.profile_save --users 200 --saves 5 --fresh
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from enum import Enum
+from typing import Any, Dict, List, Type
+
+import httpx
+from sqlalchemy import text
+
+from bench.matchmaking import _mint_token, _percentile, current_op
+from migrations.explain_hot_queries import _is_local
+from schemas.profile import (
+    AttachmentStyleEnum,
+    DietEnum,
+    DrinkFrequencyEnum,
+    ExerciseFrequencyEnum,
+    GendersEnum,
+    InterestsEnum,
+    LanguageEnum,
+    LoveLanguageEnum,
+    PersonalityTypeEnum,
+    PetsEnum,
+    PoliticalViewsEnum,
+    PronounsEnum,
+    RelationshipGoalsEnum,
+    ReligionEnum,
+    SexualOrientationsEnum,
+    SleepScheduleEnum,
+    SmokeFrequencyEnum,
+    ZodiacSignsEnum,
+)
+
+# UserProfileSchema single-value enum field -> enum
+PROFILE_ENUM_FIELDS: Dict[str, Type[Enum]] = {
+    "drug_use": SmokeFrequencyEnum,
+    "weed_use": SmokeFrequencyEnum,
+    "orientation": SexualOrientationsEnum,
+    "pronouns": PronounsEnum,
+    "relationship_goal": RelationshipGoalsEnum,
+    "personality_type": PersonalityTypeEnum,
+    "love_language": LoveLanguageEnum,
+    "attachment_style": AttachmentStyleEnum,
+    "political_view": PoliticalViewsEnum,
+    "zodiac_sign": ZodiacSignsEnum,
+    "religion": ReligionEnum,
+    "diet": DietEnum,
+    "exercise_frequency": ExerciseFrequencyEnum,
+    "smoke_frequency": SmokeFrequencyEnum,
+    "drink_frequency": DrinkFrequencyEnum,
+    "sleep_schedule": SleepScheduleEnum,
+}
+
+# UserProfileSchema list field -> (enum, min values, max values)
+PROFILE_LIST_FIELDS = {
+    "interests": (InterestsEnum, 1, 5),
+    "pets": (PetsEnum, 0, 2),
+    "languages_spoken": (LanguageEnum, 1, 2),
+}
+
+
+def _values(enum_cls: Type[Enum]) -> List[str]:
+    return [member.value for member in enum_cls]
+
+
+def _random_payload(rng: random.Random) -> Dict[str, Any]:
+    lat, lng = 40.7128 + rng.uniform(-1, 1), -74.0060 + rng.uniform(-1, 1)
+    payload: Dict[str, Any] = {
+        "bio": f"bench bio {rng.randint(0, 10**6)}",
+        "gender": rng.choice([g for g in _values(GendersEnum) if g != GendersEnum.any.value]),
+        "location": f"{lat:.5f},{lng:.5f}",
+        "location_label": "Bench City",
+        "show_precise_location": rng.random() < 0.5,
+        "school": "Bench University",
+        "occupation": "Benchmarker",
+    }
+    for name, enum_cls in PROFILE_ENUM_FIELDS.items():
+        payload[name] = rng.choice(_values(enum_cls)) if rng.random() < 0.8 else None
+    for name, (enum_cls, low, high) in PROFILE_LIST_FIELDS.items():
+        values = _values(enum_cls)
+        payload[name] = rng.sample(values, k=min(len(values), rng.randint(low, high)))
+    return payload
+
+
+def _delete_profiles(engine, uids: List[str]):
+    with engine.begin() as conn:
+        for table in ("profiles.interests", "profiles.pets", "profiles.languages_spoken", "profiles.profiles"):
+            conn.execute(text(f"DELETE FROM {table} WHERE uid = ANY(CAST(:uids AS uuid[]))"), {"uids": uids})
+
+
+async def run_saves(args, uids: List[str], secret: str) -> Dict[str, Any]:
+    from sqlalchemy import event
+    from main import app
+    from models.db import engine
+
+    queries: Counter = Counter()
+    requests: Counter = Counter()
+    errors: Counter = Counter()
+    latency: Dict[str, List[float]] = defaultdict(list)
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        queries[current_op.get()] += 1
+
+    rng = random.Random(args.seed)
+    tokens = {uid: _mint_token(uid, secret) for uid in uids}
+    saved = set() if args.fresh else set(uids)
+    inflight = asyncio.Semaphore(args.max_inflight)
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    client = httpx.AsyncClient(transport=transport, base_url="http://bench")
+
+    async def save(uid: str, payload: Dict[str, Any]):
+        op = "update" if uid in saved else "create"
+        saved.add(uid)
+        async with inflight:
+            token_op = current_op.set(op)
+            started = time.perf_counter()
+            try:
+                requests[op] += 1
+                response = await client.put("/profile/me", json=payload, headers={"Authorization": f"Bearer {tokens[uid]}"})
+            finally:
+                current_op.reset(token_op)
+            latency[op].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            errors[f"{op} {response.status_code}"] += 1
+
+    # warm the lookup tables / connection pool outside the measurement
+    await save(uids[0], _random_payload(rng))
+    requests.clear()
+    latency.clear()
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        for _ in range(args.saves):
+            # one round = one save per user, users of a round run concurrently (up to --max-inflight)
+            await asyncio.gather(*(save(uid, _random_payload(rng)) for uid in uids))
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        await client.aclose()
+
+    result: Dict[str, Any] = {}
+    for op in sorted(requests):
+        samples = latency[op]
+        result[op] = {
+            "requests": requests[op],
+            "statements_per_request": round(queries[op] / requests[op], 2),
+            **{
+                f"latency_p{pct}_ms": round(_percentile(samples, pct) * 1000, 2)
+                for pct in (50, 95, 99)
+            },
+        }
+    result["errors"] = dict(errors)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile save (PUT /profile/me) benchmark")
+    parser.add_argument("--users", type=int, default=200, help="Number of bench users saving their profile")
+    parser.add_argument("--saves", type=int, default=5, help="Saves per user")
+    parser.add_argument("--fresh", action="store_true", help="Delete the users' profiles first (first save creates)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the payloads")
+    parser.add_argument("--max-inflight", type=int, default=4, help="Max concurrent HTTP requests")
+    parser.add_argument("--allow-remote", action="store_true", help="Allow running against a non-local DB_HOST")
+    args = parser.parse_args()
+
+    from config import settings
+    from models.db import engine
+    from bench.seed import load_bench_uids
+
+    if not args.allow_remote and not _is_local(settings.db_host):
+        sys.exit(f"Refusing to run against non-local DB_HOST '{settings.db_host}' (use --allow-remote)")
+
+    uids = load_bench_uids(engine, limit=args.users)
+    if not uids:
+        sys.exit("No bench users found, run python -m bench.seed first")
+    if args.fresh:
+        _delete_profiles(engine, uids)
+
+    result = asyncio.run(run_saves(args, uids, settings.supabase_jwt_secret))
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,300 @@
+"""
+Synthetic users for the matchmaking benchmark.
+
+Profiles and preferences are drawn from the real enums under schemas/preferences, so
+every compatibility branch in controllers/matchmaking.py gets exercised (gender, age,
+distance and the extra_options filters). Everything is generated in Python from a fixed
+seed, so two runs with the same --seed / --users produce the same population.
+
+ONLY run this against a throwaway local Postgres:
+    DB_HOST=localhost DB_SSLMODE=disable python -m bench.seed --users 2000
+"""
+import argparse
+import json
+import random
+import sys
+import typing
+import uuid
+from datetime import date, timedelta
+from enum import Enum
+from typing import Any, Dict, List, Optional, Type
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from migrations.explain_hot_queries import _create_local_schema, _is_local
+from migrations.migrate import apply_migrations
+from schemas.preferences import (
+    ExtraPreferenceOptionsSchema,
+    GendersEnum,
+    InterestsEnum,
+    LanguageEnum,
+    PetsEnum,
+    PronounsEnum,
+    RelationshipGoalsEnum,
+    PersonalityTypeEnum,
+    LoveLanguageEnum,
+    AttachmentStyleEnum,
+    PoliticalViewsEnum,
+    ZodiacSignsEnum,
+    ReligionEnum,
+    DietEnum,
+    ExerciseFrequencyEnum,
+    SmokeFrequencyEnum,
+    DrinkFrequencyEnum,
+    SleepScheduleEnum,
+)
+from schemas.preferences.sexual_orientation import SexualOrientationsEnum
+
+BENCH_LAST_NAME = "Bench"
+
+# public.<table> lookup -> enum it is filled from
+LOOKUP_ENUMS: Dict[str, Type[Enum]] = {
+    "genders": GendersEnum,
+    "orientations": SexualOrientationsEnum,
+    "pronouns": PronounsEnum,
+    "relationship_goals": RelationshipGoalsEnum,
+    "personality_types": PersonalityTypeEnum,
+    "love_languages": LoveLanguageEnum,
+    "attachment_styles": AttachmentStyleEnum,
+    "political_views": PoliticalViewsEnum,
+    "zodiac_signs": ZodiacSignsEnum,
+    "religions": ReligionEnum,
+    "diets": DietEnum,
+    "exercise_frequencies": ExerciseFrequencyEnum,
+    "smoke_frequencies": SmokeFrequencyEnum,
+    "drink_frequencies": DrinkFrequencyEnum,
+    "sleep_schedules": SleepScheduleEnum,
+    "interests": InterestsEnum,
+    "pets": PetsEnum,
+    "languages": LanguageEnum,
+}
+
+# profiles.profiles FK column -> lookup table (same mapping as controllers.profile._get_profile)
+PROFILE_FKS = {
+    "pronoun_id": "pronouns",
+    "relationship_goal_id": "relationship_goals",
+    "personality_type_id": "personality_types",
+    "love_language_id": "love_languages",
+    "attachment_style_id": "attachment_styles",
+    "political_view_id": "political_views",
+    "zodiac_sign_id": "zodiac_signs",
+    "religion_id": "religions",
+    "diet_id": "diets",
+    "exercise_frequency_id": "exercise_frequencies",
+    "smoke_frequency_id": "smoke_frequencies",
+    "drink_frequency_id": "drink_frequencies",
+    "sleep_schedule_id": "sleep_schedules",
+}
+
+# profiles.<junction> -> (fk column, lookup table, min values, max values)
+PROFILE_JUNCTIONS = {
+    "interests": ("interest_id", "interests", 1, 5),
+    "pets": ("pet_id", "pets", 0, 2),
+    "languages_spoken": ("language_id", "languages", 1, 2),
+}
+
+MATCHMAKING_TABLES = [
+    "sessions.interactions",
+    "sessions.chats",
+    "users.chat_messages",
+    "users.chats",
+    "sessions.sessions",
+    "sessions.matchmaking_queue",
+]
+
+
+def _enum_values(enum_cls: Type[Enum]) -> List[str]:
+    return [member.value for member in enum_cls]
+
+
+def _extra_option_enums() -> Dict[str, Type[Enum]]:
+    """extra_options field -> enum, read off ExtraPreferenceOptionsSchema (Optional[List[SomeEnum]])."""
+    fields = {}
+    for name, field in ExtraPreferenceOptionsSchema.model_fields.items():
+        for arg in typing.get_args(field.annotation):
+            inner = typing.get_args(arg)
+            if inner and isinstance(inner[0], type) and issubclass(inner[0], Enum):
+                fields[name] = inner[0]
+    return fields
+
+
+def _seed_lookups(engine: Engine) -> Dict[str, Dict[str, str]]:
+    """Fill every public lookup table from its enum and return {table: {name: id}}."""
+    lookups = {}
+    with engine.begin() as conn:
+        for table, enum_cls in LOOKUP_ENUMS.items():
+            conn.execute(
+                text(f"INSERT INTO public.{table} (name) VALUES (:name) ON CONFLICT (name) DO NOTHING"),
+                [{"name": value} for value in _enum_values(enum_cls)],
+            )
+            rows = conn.execute(text(f"SELECT id, name FROM public.{table}")).mappings().all()
+            ids = {row["name"]: str(row["id"]) for row in rows}
+            # keep enum order so the same seed always draws the same values
+            lookups[table] = {value: ids[value] for value in _enum_values(enum_cls)}
+    return lookups
+
+
+def _random_birthdate(rng: random.Random, today: date) -> date:
+    age = rng.randint(18, 60)
+    return today - timedelta(days=age * 365 + rng.randint(0, 364))
+
+
+def _random_extra_options(rng: random.Random, option_enums: Dict[str, Type[Enum]], selectivity: float) -> Dict[str, Any]:
+    """Most users set no filters, a 'selectivity' share set one or two from the real option enums."""
+    if rng.random() >= selectivity:
+        return {}
+    extra = {}
+    for name in rng.sample(sorted(option_enums), k=rng.randint(1, 2)):
+        values = _enum_values(option_enums[name])
+        extra[name] = rng.sample(values, k=min(len(values), rng.randint(1, 4)))
+    return extra
+
+
+def _build_population(
+    n: int,
+    lookups: Dict[str, Dict[str, str]],
+    rng: random.Random,
+    selectivity: float,
+    center: tuple,
+    spread_degrees: float,
+) -> Dict[str, List[Dict[str, Any]]]:
+    today = date.today()
+    genders = [g for g in _enum_values(GendersEnum) if g != GendersEnum.any.value]
+    option_enums = _extra_option_enums()
+
+    rows: Dict[str, List[Dict[str, Any]]] = {"users": [], "profiles": [], "preferences": []}
+    for junction in PROFILE_JUNCTIONS:
+        rows[junction] = []
+
+    for i in range(n):
+        uid = str(uuid.uuid4())
+        birthdate = _random_birthdate(rng, today)
+        age = (today - birthdate).days // 365
+
+        rows["users"].append({
+            "id": uid,
+            "phone": f"+1999{i:07d}",
+            "first_name": f"Bench{i}",
+            "last_name": BENCH_LAST_NAME,
+            "birthdate": birthdate,
+        })
+
+        lat = round(center[0] + rng.uniform(-spread_degrees, spread_degrees), 5)
+        lng = round(center[1] + rng.uniform(-spread_degrees, spread_degrees), 5)
+        profile = {
+            "uid": uid,
+            "gender_id": lookups["genders"][rng.choice(genders)],
+            "orientation_id": rng.choice(list(lookups["orientations"].values())),
+            "location": f"{lat:.5f},{lng:.5f}",
+            "lat": lat,
+            "lng": lng,
+        }
+        for column, table in PROFILE_FKS.items():
+            profile[column] = rng.choice(list(lookups[table].values())) if rng.random() < 0.8 else None
+        rows["profiles"].append(profile)
+
+        for junction, (fk_column, table, low, high) in PROFILE_JUNCTIONS.items():
+            ids = list(lookups[table].values())
+            for value_id in rng.sample(ids, k=min(len(ids), rng.randint(low, high))):
+                rows[junction].append({"uid": uid, "value_id": value_id})
+
+        target_gender = GendersEnum.any.value if rng.random() < 0.5 else rng.choice(genders)
+        rows["preferences"].append({
+            "uid": uid,
+            "age_min": max(18, age - rng.randint(2, 15)),
+            "age_max": age + rng.randint(2, 15),
+            "max_distance": rng.choice([10, 25, 50, 100, 250]),
+            "target_gender_id": lookups["genders"][target_gender],
+            "extra_options": _random_extra_options(rng, option_enums, selectivity),
+        })
+
+    return rows
+
+
+def reset_matchmaking_state(engine: Engine):
+    """Empty the queue / sessions / chats tables so every run starts from the same state."""
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {', '.join(MATCHMAKING_TABLES)}"))
+        conn.execute(text("UPDATE users.users SET is_online = TRUE WHERE last_name = :last_name"), {"last_name": BENCH_LAST_NAME})
+
+
+def seed_users(
+    engine: Engine,
+    n: int,
+    seed: int = 42,
+    selectivity: float = 0.3,
+    center: tuple = (40.7128, -74.0060),
+    spread_degrees: float = 1.0,
+) -> List[str]:
+    """Replace the previous bench population with n synthetic users and return their uids."""
+    _create_local_schema(engine)
+    apply_migrations(engine)
+    reset_matchmaking_state(engine)
+
+    lookups = _seed_lookups(engine)
+    rows = _build_population(n, lookups, random.Random(seed), selectivity, center, spread_degrees)
+
+    with engine.begin() as conn:
+        previous = "SELECT id FROM users.users WHERE last_name = :last_name"
+        for table in ("profiles.interests", "profiles.pets", "profiles.languages_spoken",
+                      "profiles.sexual_orientations", "profiles.profiles", "users.preferences"):
+            conn.execute(text(f"DELETE FROM {table} WHERE uid IN ({previous})"), {"last_name": BENCH_LAST_NAME})
+        conn.execute(text("DELETE FROM users.users WHERE last_name = :last_name"), {"last_name": BENCH_LAST_NAME})
+
+        conn.execute(text("""
+            INSERT INTO users.users (id, phone, first_name, last_name, birthdate, is_online)
+            VALUES (:id, :phone, :first_name, :last_name, :birthdate, TRUE)
+        """), rows["users"])
+
+        fk_columns = ", ".join(PROFILE_FKS)
+        fk_params = ", ".join(f":{column}" for column in PROFILE_FKS)
+        conn.execute(text(f"""
+            INSERT INTO profiles.profiles (uid, gender_id, orientation_id, location, lat, lng, {fk_columns})
+            VALUES (:uid, :gender_id, :orientation_id, :location, :lat, :lng, {fk_params})
+        """), rows["profiles"])
+
+        for junction, (fk_column, _, _, _) in PROFILE_JUNCTIONS.items():
+            if rows[junction]:
+                conn.execute(
+                    text(f"INSERT INTO profiles.{junction} (uid, {fk_column}) VALUES (:uid, :value_id)"),
+                    rows[junction],
+                )
+
+        conn.execute(text("""
+            INSERT INTO users.preferences (uid, age_min, age_max, max_distance, target_gender_id, extra_options)
+            VALUES (:uid, :age_min, :age_max, :max_distance, :target_gender_id, CAST(:extra_options AS jsonb))
+        """), [{**row, "extra_options": json.dumps(row["extra_options"])} for row in rows["preferences"]])
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+    return [row["id"] for row in rows["users"]]
+
+
+def load_bench_uids(engine: Engine, limit: Optional[int] = None) -> List[str]:
+    with engine.connect() as conn:
+        uids = conn.execute(
+            text("SELECT id FROM users.users WHERE last_name = :last_name ORDER BY phone"),
+            {"last_name": BENCH_LAST_NAME},
+        ).scalars().all()
+    uids = [str(uid) for uid in uids]
+    return uids[:limit] if limit else uids
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed synthetic users for the matchmaking benchmark")
+    parser.add_argument("--users", type=int, default=2000, help="Number of synthetic users")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the population")
+    parser.add_argument("--selectivity", type=float, default=0.3, help="Share of users with extra_options filters")
+    parser.add_argument("--allow-remote", action="store_true", help="Allow running against a non-local DB_HOST")
+    args = parser.parse_args()
+
+    from config import settings
+    from models.db import engine
+
+    if not args.allow_remote and not _is_local(settings.db_host):
+        sys.exit(f"Refusing to run against non-local DB_HOST '{settings.db_host}' (use --allow-remote)")
+
+    uids = seed_users(engine, args.users, seed=args.seed, selectivity=args.selectivity)
+    print(f"Seeded {len(uids)} bench users")
@@ -0,0 +1,151 @@
+"""
+JSON serialization microbenchmark.
+
+Renders synthetic but realistically shaped hot DTOs (a hydrated profile, a chat list, a chat with a long
+history, a poll result) both the way FastAPI does it by default (response_model validation / serialization or
+jsonable_encoder, then json.dumps) and through services/serializers.py, checks that both produce the same
+JSON, and reports the time per render and the speedup. No database needed:
+    python -m bench.serialization
+    python -m bench.serialization --messages 5000 --chats 200 --repeat 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from schemas.chats import ChatDetailSchema, ChatListItemSchema
+from services import serializers
+
+
+def _now(rng: random.Random) -> datetime:
+    return datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=rng.randint(0, 10**7), microseconds=rng.randint(0, 999999))
+
+
+def _user(rng: random.Random) -> Dict[str, Any]:
+    # a users.users row: more columns than UserInfoSchema, response_model drops the extra ones
+    return {
+        "id": uuid.uuid4(), "phone": f"+1999{rng.randint(0, 10**7):07d}", "first_name": "Bench", "last_name": "User",
+        "birthdate": date(1990, 1, 1) + timedelta(days=rng.randint(0, 10000)), "is_online": True, "paused": False,
+        "created_at": _now(rng), "last_seen_at": _now(rng), "deleted_at": None,
+    }
+
+
+def _message(rng: random.Random, a: uuid.UUID, b: uuid.UUID) -> Dict[str, Any]:
+    author, receiver = (a, b) if rng.random() < 0.5 else (b, a)
+    return {
+        "id": uuid.uuid4(), "created_at": _now(rng), "author_uid": author, "receiver_uid": receiver,
+        "content": "hey! " * rng.randint(1, 30), "is_system": False, "source": rng.choice(["session", "direct"]),
+    }
+
+
+def _chat(rng: random.Random, messages: int) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    me, other = uuid.uuid4(), uuid.uuid4()
+    chat = {
+        "id": uuid.uuid4(), "match_session_id": uuid.uuid4(), "last_message_at": _now(rng), "status": "active",
+        "other_user_uid": str(other), "other_user": _user(rng),
+    }
+    history = sorted((_message(rng, me, other) for _ in range(messages)), key=lambda m: m["created_at"])
+    return chat, history
+
+
+def build_payloads(args) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+
+    profile = {
+        "uid": uuid.uuid4(), "bio": "lorem ipsum " * 80, "drug_use": "never", "weed_use": "sometimes",
+        "location": "40.71280,-74.00600", "lat": 40.7128, "lng": -74.006, "location_label": "New York",
+        "show_precise_location": False, "school": "Bench University", "occupation": "Benchmarker",
+        "created_at": _now(rng), "updated_at": _now(rng), "birthdate": date(1995, 5, 17), "age": 30,
+        "interests": ["music", "hiking", "tech", "dancing", "languages"], "pets": ["cats"],
+        "languages_spoken": ["english", "spanish"],
+    }
+    for column in ("gender", "orientation", "pronoun", "relationship_goal", "personality_type", "love_language",
+                   "attachment_style", "political_view", "zodiac_sign", "religion", "diet", "exercise_frequency",
+                   "smoke_frequency", "drink_frequency", "sleep_schedule"):
+        profile[f"{column}_id"] = uuid.uuid4()
+        profile[column] = f"{column} value"
+
+    chat_list = []
+    for _ in range(args.chats):
+        chat, history = _chat(rng, 1)
+        chat_list.append({**chat, "last_message": history[0]})
+
+    chat_detail, history = _chat(rng, args.messages)
+    chat_detail["messages"] = history
+
+    session = {
+        "id": uuid.uuid4(), "host_uid": uuid.uuid4(), "guest_uid": uuid.uuid4(), "mode_id": uuid.uuid4(),
+        "status": "active", "created_at": _now(rng), "started_at": _now(rng), "ended_at": None,
+    }
+    poll = {"status": "found", "role": "guest", "session": session, "message": "Match found!"}
+
+    return {"profile": profile, "chat_list": chat_list, "chat_detail": chat_detail, "poll": poll}
+
+
+def _fastapi_render(model) -> Callable[[Any], bytes]:
+    """What a route returning this content costs by default: serialize_response + JSONResponse.render."""
+    field = create_model_field(name="Response", type_=model, mode="serialization") if model else None
+    loop = asyncio.new_event_loop()
+
+    def render(content: Any) -> bytes:
+        encoded = loop.run_until_complete(serialize_response(field=field, response_content=content, is_coroutine=True))
+        return JSONResponse(content=encoded).body
+
+    return render
+
+
+CASES = {
+    # payload -> (response_model of the route, new renderer)
+    "profile": (None, lambda content: serializers.json_response(content).body),
+    "chat_list": (List[ChatListItemSchema], lambda content: serializers.chat_list_response(content).body),
+    "chat_detail": (ChatDetailSchema, lambda content: serializers.chat_detail_response(content).body),
+    "poll": (None, lambda content: serializers.json_response(content).body),
+}
+
+
+def _time(render: Callable[[Any], bytes], content: Any, repeat: int) -> float:
+    render(content)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        render(content)
+    return (time.perf_counter() - started) / repeat
+
+
+def run(args) -> Dict[str, Any]:
+    payloads = build_payloads(args)
+    results = {}
+    for name, (model, fast) in CASES.items():
+        content = payloads[name]
+        default = _fastapi_render(model)
+        before, after = default(content), fast(content)
+        if json.loads(before) != json.loads(after):
+            raise SystemExit(f"{name}: the fast serializer does not produce the same JSON")
+
+        before_ms = _time(default, content, args.repeat) * 1000
+        after_ms = _time(fast, content, args.repeat) * 1000
+        results[name] = {
+            "bytes": len(after),
+            "default_ms": round(before_ms, 3),
+            "fast_ms": round(after_ms, 3),
+            "speedup": round(before_ms / after_ms, 1),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Default FastAPI vs orjson / pydantic-core response rendering")
+    parser.add_argument("--messages", type=int, default=2000, help="Messages in the chat detail payload")
+    parser.add_argument("--chats", type=int, default=50, help="Chats in the chat list payload")
+    parser.add_argument("--repeat", type=int, default=100, help="Renders per measurement")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the synthetic payloads")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args), indent=2))
@@ -18,6 +18,49 @@ class Settings(BaseSettings):
     db_port: str = Field(env="DB_PORT")
     db_host: str = Field(env="DB_HOST")
     db_name: str = Field(env="DB_NAME")
+    db_sslmode: str = Field(default="require", env="DB_SSLMODE")
+    # Statements (and requests' total DB time) slower than this are logged with their normalized SQL, 0 disables
+    slow_query_ms: int = Field(default=200, env="SLOW_QUERY_MS")
+
+    # Root log level, per-logger overrides ("matchmaking=WARNING,db=INFO") and output format ("json" or "text")
+    log_level: str = Field(default="INFO", env="LOG_LEVEL")
+    log_levels: str = Field(default="", env="LOG_LEVELS")
+    log_format: str = Field(default="json", env="LOG_FORMAT")
+    # "Explain match" trace: log the compatibility outcome (reason code) for pairs involving this uid,
+    # and for a sampled share (0.0 - 1.0) of all other pairs
+    matchmaking_trace_uid: str | None = Field(default=None, env="MATCHMAKING_TRACE_UID")
+    matchmaking_trace_sample_rate: float = Field(default=0.0, env="MATCHMAKING_TRACE_SAMPLE_RATE")
+    # Run global batch matching rounds this often (services/matchmaking_rounds.py) instead of matching
+    # queued users from each poll, 0 disables
+    matchmaking_round_interval_ms: int = Field(default=0, env="MATCHMAKING_ROUND_INTERVAL_MS")
+    # Size (degrees of latitude / longitude) of the geo cells the matchmaking queue is sharded by
+    matchmaking_shard_cell_degrees: float = Field(default=1.0, env="MATCHMAKING_SHARD_CELL_DEGREES")
+    # Compatibility verdicts are memoized per pair (and per prefs / profile version), up to this many entries
+    # and for this long. The TTL bounds staleness across workers, which don't see each other's version bumps
+    matchmaking_verdict_cache_size: int = Field(default=50000, env="MATCHMAKING_VERDICT_CACHE_SIZE")
+    matchmaking_verdict_cache_ttl_seconds: float = Field(default=60.0, env="MATCHMAKING_VERDICT_CACHE_TTL_SECONDS")
+    # Per-user matchmaking exclusion sets (previous partners / recent-session cooldowns) kept per worker: max users
+    # and how long a set is trusted before it is reloaded
+    matchmaking_exclusion_cache_size: int = Field(default=50000, env="MATCHMAKING_EXCLUSION_CACHE_SIZE")
+    matchmaking_exclusion_cache_ttl_seconds: float = Field(default=600.0, env="MATCHMAKING_EXCLUSION_CACHE_TTL_SECONDS")
+    # In-memory matchmaking state per user (services/matchmaking_state.py) serving /matchmaking/me/session and /poll:
+    # max entries (0 disables) and how long a worker trusts one (bounds staleness across workers)
+    matchmaking_state_cache_size: int = Field(default=50000, env="MATCHMAKING_STATE_CACHE_SIZE")
+    matchmaking_state_ttl_seconds: float = Field(default=15.0, env="MATCHMAKING_STATE_TTL_SECONDS")
+    # Rendered responses of the other-user reads (services/response_cache.py): per worker entries and TTL,
+    # plus an optional Redis tier shared by the workers (needs the 'redis' package, unset = in-process only)
+    response_cache_size: int = Field(default=10000, env="RESPONSE_CACHE_SIZE")
+    response_cache_ttl_seconds: float = Field(default=30.0, env="RESPONSE_CACHE_TTL_SECONDS")
+    response_cache_redis_url: str | None = Field(default=None, env="RESPONSE_CACHE_REDIS_URL")
+    response_cache_redis_timeout_seconds: float = Field(default=0.05, env="RESPONSE_CACHE_REDIS_TIMEOUT_SECONDS")
+
+    # Socket.IO packets: "json" (default) or "msgpack" (every client then needs socket.io-msgpack-parser), and the
+    # size in bytes above which long-polling responses are gzipped (websockets use permessage-deflate)
+    socket_serializer: str = Field(default="json", env="SOCKET_SERIALIZER")
+    socket_compression_threshold: int = Field(default=1024, env="SOCKET_COMPRESSION_THRESHOLD")
+
+    # Bearer token for /metrics and other internal endpoints (they answer 404 when unset)
+    internal_api_token: str | None = Field(default=None, env="INTERNAL_API_TOKEN")
     
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -7,6 +7,26 @@ from sqlalchemy import text
 
 from controllers.user import _get_user_by_id
 
+# _get_last_message_for_pair: the latest direct message between two users
+LAST_DIRECT_MESSAGE_SQL = """
+    SELECT
+        id,
+        created_at,
+        author_uid,
+        receiver_uid,
+        content,
+        FALSE AS is_system,
+        'direct' AS source
+    FROM users.chat_messages
+    WHERE
+        (author_uid = :a AND receiver_uid = :b)
+        OR
+        (author_uid = :b AND receiver_uid = :a)
+    ORDER BY created_at DESC
+    LIMIT 1
+"""
+
+
 def _get_last_message_for_pair(
     session_id,
     user_a_uid,
@@ -43,23 +63,7 @@ def _get_last_message_for_pair(
         "b": b
     }).mappings().first()
 
-    stmt_direct = text("""
-        SELECT
-            id,
-            created_at,
-            author_uid,
-            receiver_uid,
-            content,
-            FALSE AS is_system,
-            'direct' AS source
-        FROM users.chat_messages
-        WHERE
-            (author_uid = :a AND receiver_uid = :b)
-            OR
-            (author_uid = :b AND receiver_uid = :a)
-        ORDER BY created_at DESC
-        LIMIT 1
-    """)
+    stmt_direct = text(LAST_DIRECT_MESSAGE_SQL)
 
     direct_last = db.execute(stmt_direct, {
         "a": a,
@@ -70,21 +74,25 @@ def _get_last_message_for_pair(
         return session_last if session_last["created_at"] >= direct_last["created_at"] else direct_last
     return session_last or direct_last
 
+# _get_user_chats: the user's matches, latest activity first
+USER_CHATS_SQL = """
+    SELECT
+        id,
+        user_a_uid,
+        user_b_uid,
+        match_session_id,
+        last_message_at,
+        status
+    FROM users.chats
+    WHERE user_a_uid = :uid OR user_b_uid = :uid
+    ORDER BY last_message_at DESC
+"""
+
+
 def _get_user_chats(uid: UUID, db: Session) -> List[Dict[str, Any]]:
     uid_str = str(uid)
 
-    stmt = text("""
-        SELECT
-            id,
-            user_a_uid,
-            user_b_uid,
-            match_session_id,
-            last_message_at,
-            status
-        FROM users.chats
-        WHERE user_a_uid = :uid OR user_b_uid = :uid
-        ORDER BY last_message_at DESC
-    """)
+    stmt = text(USER_CHATS_SQL)
 
     chats = db.execute(stmt, {"uid": uid_str}).mappings().all()
     result: List[Dict[str, Any]] = []
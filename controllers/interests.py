@@ -3,32 +3,34 @@ from sqlalchemy import text
 from fastapi.encoders import jsonable_encoder
 from fastapi import HTTPException
 from schemas.preferences import InterestsEnum
-from controllers.profile import _profile_exists
+from controllers.profile import _profile_exists, _write_junction_ids
 from controllers.user import _user_exists
+from services.cache import versions
+from services import lookups
 
 from typing import List
 
 
 def _interest_name_to_id(name: str, db: Session) -> str | HTTPException:
-    id = db.execute(text("SELECT id FROM public.interests WHERE name = :name LIMIT 1"), {"name": name}).scalar()
+    id = lookups.name_to_id("interests", name, db)
     if id:
         return id
     else:
         raise HTTPException(status_code=400, detail=f"User interest '{name}' is not registered in the database!")
 
 def _interest_id_to_name(id: str, db: Session) -> str | HTTPException:
-    name = db.execute(text("SELECT name FROM public.interests WHERE id = :id LIMIT 1"), {"id": id}).scalar()
+    name = lookups.id_to_name("interests", id, db)
     if name:
         return name
     else:
         raise HTTPException(status_code=400, detail=f"User interest with id '{id}' is not registered in the database!")
 
 def _interests_to_id_arr(arr: List[str], db: Session) -> List[str]:
-    res: list[str] = []
+    ids = lookups.names_to_ids("interests", arr, db)
     for interest in arr:
-        id = _interest_name_to_id(name=interest, db=db)
-        res.append(id)
-    return res
+        if interest not in ids:
+            raise HTTPException(status_code=400, detail=f"User interest '{interest}' is not registered in the database!")
+    return [ids[interest] for interest in arr]
 
 def _get_all_interest_options(db: Session):
     res = db.execute(text("SELECT * FROM public.interests")).mappings().all()
@@ -58,14 +60,8 @@ def _update_profile_interests(payload: List[InterestsEnum], uid: str, db: Sessio
     
     payload = jsonable_encoder(payload)
     interest_ids = _interests_to_id_arr(payload, db=db) # List of str
-    _delete_profile_interests(uid=uid, db=db) # Delete existing user interests for said user
-
-    for interest_id in interest_ids:
-        stmt = text("""
-            INSERT INTO profiles.interests (uid, interest_id)
-            VALUES (:uid, :interest_id)
-        """)
-        db.execute(stmt, {"uid": uid, "interest_id": interest_id})
+    _write_junction_ids(uid, "interests", "interest_id", interest_ids, db) # Only the added / removed rows change
+    versions.bump("profile", uid, db=db)
     return {"ok": True}
 
 """Delete all existing interests for a given user"""
@@ -75,4 +71,5 @@ def _delete_profile_interests(uid: str, db: Session):
         WHERE uid = :uid
     """)
     db.execute(stmt, {"uid": uid})
+    versions.bump("profile", uid, db=db)
     return {"ok": True}
\ No newline at end of file
@@ -6,26 +6,127 @@ import json
 from datetime import datetime, timedelta, date
 from typing import Optional, Dict, Any, List
 import logging
+import time
+import asyncio
+from dataclasses import dataclass
 
 from controllers.preferences import _get_user_prefs
-from controllers.profile import _get_profile
+from controllers.profile import _get_profile, _get_profiles, _parse_location
+from services.matchmaking_timers import schedule_host_promotion, cancel_host_promotion
+from services.log import EXPLAIN_LOGGER, explain_match_enabled
+from services.matchmaking_rejections import record_outcome
+from services.matchmaking_scoring import CandidateFeatures, top_candidates
+from services.matchmaking_rounds import rounds_enabled
+from services.cache import TTLCache, versions
+from services import matchmaking_pools, matchmaking_state
+from services.matchmaking_pools import PoolEntry
+from services.matchmaking_shards import ShardKey, is_unbounded, make_shard_key, shard_accepts
+from services import metrics
+from config import settings
 import uuid
 
 # Configurable matchmaking settings
 MATCHMAKING_TIMEOUT_SECONDS = 15
 MATCHMAKING_POLL_INTERVAL_SECONDS = 3
 RECENT_SESSION_COOLDOWN_MINUTES = 0
+# Queue rows / open sessions considered per search. Every compatible one is scored, the best is matched
+MATCHMAKING_CANDIDATE_LIMIT = 50
+# How many of the best-ranked peers to try to claim when concurrent polls go after the same one
+MATCHMAKING_CLAIM_ATTEMPTS = 5
+
+
+@dataclass
+class ExclusionSet:
+    """Who a queued user must not be paired with, for the queue entry enqueued at 'enqueued_at'."""
+    enqueued_at: Optional[datetime]
+    partners: set[str]
+    cooldowns: dict[str, float]  # partner uid -> time.monotonic() expiry
+
+
+# Per-user exclusion sets, loaded at enqueue and kept current by _match_user / _leave_session on this worker.
+# A set is tied to the queue entry it was loaded for: a new entry (e.g. after a match made by another worker)
+# reloads it, so does a miss (bounded per worker, expired after a while)
+exclusion_sets = TTLCache(
+    "matchmaking_exclusions",
+    maxsize=settings.matchmaking_exclusion_cache_size,
+    ttl_seconds=settings.matchmaking_exclusion_cache_ttl_seconds,
+)
+
+# sessions.modes time limits are static reference data, cached per worker
+mode_timeouts: dict[str, int] = {}
+
+explain_log = logging.getLogger(EXPLAIN_LOGGER)
+
+# extra_options preference field -> profile field it filters on. Which of these actually reject
+# candidates is counted per hour in services.matchmaking_rejections ('extra:<field>')
+PREFERENCE_FIELDS = [
+    ('relationship_goal', 'relationship_goal'),
+    ('personality_type', 'personality_type'),
+    ('love_language', 'love_language'),
+    ('attachment_style', 'attachment_style'),
+    ('political_view', 'political_view'),
+    ('zodiac_sign', 'zodiac_sign'),
+    ('religion', 'religion'),
+    ('diet', 'diet'),
+    ('exercise_frequency', 'exercise_frequency'),
+    ('smoke_frequency', 'smoke_frequency'),
+    ('drink_frequency', 'drink_frequency'),
+    ('sleep_schedule', 'sleep_schedule'),
+    ('weed_use', 'weed_use'),
+    ('drug_use', 'drug_use'),
+    ('interests', 'interests'),
+    ('languages_spoken', 'languages_spoken'),
+    ('pets', 'pets'),
+    ('school', 'school'),
+]
+
+# Profile fields _compatibility_rejection reads. Cached verdicts and candidate pools follow the 'profile_match'
+# version, so a partial profile edit of any other field (bio, pronouns, ...) keeps them. The age check reads the
+# birthdate of the users row, written by controllers.user under the 'user' kind
+MATCH_PROFILE_FIELDS = frozenset({"gender", "location", *(profile_key for _, profile_key in PREFERENCE_FIELDS)})
+versions.add_scope("profile", "profile_match", MATCH_PROFILE_FIELDS)
+versions.add_scope("user", "profile_match", ("birthdate",))
+
+def _get_mode_time_limit(mode_id: str, db: Session) -> Optional[int]:
+    """A session mode's time_limit (SessionModeSchema.time_limit), or None when there is no such mode."""
+    key = str(mode_id)
+    if key not in mode_timeouts:
+        time_limit = db.execute(
+            text("SELECT time_limit FROM sessions.modes WHERE id = :id LIMIT 1"),
+            {"id": key},
+        ).scalar()
+        if time_limit is None:
+            # Not cached, a mode added later is picked up without a restart
+            return None
+        mode_timeouts[key] = int(time_limit)
+    return mode_timeouts[key]
+
+
+def _get_mode_timeout_seconds(mode_id: Optional[str], db: Session) -> int:
+    """Matchmaking timeout for a session mode (SessionModeSchema.time_limit), defaulting to MATCHMAKING_TIMEOUT_SECONDS."""
+    if not mode_id:
+        return MATCHMAKING_TIMEOUT_SECONDS
+    return _get_mode_time_limit(mode_id=mode_id, db=db) or MATCHMAKING_TIMEOUT_SECONDS
+
+# _find_queue / _get_queue: the user's queue entry, unless expired
+FIND_QUEUE_SQL = """
+    SELECT *
+    FROM sessions.matchmaking_queue
+    WHERE uid = :uid
+    AND expires_at > NOW()
+    LIMIT 1
+"""
+
+
+def _find_queue(uid: str, db: Session):
+    """User's current (not expired) queue entry, or None."""
+    stmt = text(FIND_QUEUE_SQL)
+    return db.execute(stmt, {"uid": uid}).mappings().first()
+
 
 def _get_queue(uid: str, db: Session):
     """Get user's current queue entry."""
-    stmt = text("""
-        SELECT *
-        FROM sessions.matchmaking_queue
-        WHERE uid = :uid
-        AND expires_at > NOW()
-        LIMIT 1
-    """)
-    queue = db.execute(stmt, {"uid": uid}).mappings().first()
+    queue = _find_queue(uid=uid, db=db)
     
     if not queue:
         raise HTTPException(status_code=404, detail=f"User with uid '{uid}' is not currently in the queue!")
@@ -47,8 +148,13 @@ def _user_in_queue(uid: str, db: Session) -> bool:
     return result['in_queue'] if result else False
 
 
-def _join_queue(uid: str, db: Session):
-    """Add user to matchmaking queue with their current preferences."""
+def _join_queue(uid: str, db: Session, mode_id: Optional[str] = None):
+    """Add user to matchmaking queue with their current preferences, for a session mode (sessions.modes) if given."""
+    if mode_id is not None:
+        mode_id = str(mode_id)
+        if _get_mode_time_limit(mode_id=mode_id, db=db) is None:
+            raise HTTPException(status_code=404, detail=f"Session mode '{mode_id}' does not exist!")
+
     if _user_in_queue(uid=uid, db=db):
         db.execute(
             text("DELETE FROM sessions.matchmaking_queue WHERE uid = :uid"),
@@ -67,7 +173,7 @@ def _join_queue(uid: str, db: Session):
         # If user has no preferences set, use defaults (match with anyone)
         if e.status_code == 404:
             log = logging.getLogger("matchmaking")
-            log.info(f"User {uid} has no preferences set, using defaults (match with anyone)")
+            log.info("User %s has no preferences set, using defaults (match with anyone)", uid)
             
             user_prefs = {
                 "target_gender": "any",
@@ -80,26 +186,43 @@ def _join_queue(uid: str, db: Session):
             raise
     
     user_profile = _get_profile(uid=uid, db=db)
+    timeout_seconds = _get_mode_timeout_seconds(mode_id=mode_id, db=db)
     
     stmt = text("""
         INSERT INTO sessions.matchmaking_queue
-            (uid, mode_id, prefs_snapshot, location_snapshot, expires_at)
-        VALUES (:uid, :mode_id, CAST(:prefs_snapshot AS jsonb), CAST(:location_snapshot AS jsonb), :expires_at)
+            (uid, mode_id, prefs_snapshot, location_snapshot, lat, lng, shard_key, expires_at)
+        VALUES (
+            :uid, :mode_id, CAST(:prefs_snapshot AS jsonb), CAST(:location_snapshot AS jsonb), :lat, :lng,
+            :shard_key, :expires_at
+        )
         RETURNING *
     """)
     
     # Calculate expiry time (timeout + buffer)
-    expires_at = datetime.utcnow() + timedelta(seconds=MATCHMAKING_TIMEOUT_SECONDS + 60)
+    expires_at = datetime.utcnow() + timedelta(seconds=timeout_seconds + 60)
+    coords = _profile_coords(user_profile)
     
     params = {
         "uid": uid,
-        "mode_id": None,
+        "mode_id": mode_id,
         "prefs_snapshot": json.dumps(jsonable_encoder(user_prefs)),
         "location_snapshot": json.dumps(user_profile.get("location", "")),
+        "lat": coords[0] if coords else None,
+        "lng": coords[1] if coords else None,
+        "shard_key": str(_shard_key(user_prefs, user_profile)),
         "expires_at": expires_at
     }
     
     res = db.execute(stmt, params).mappings().first()
+    matchmaking_state.touch(db, uid, snapshot=matchmaking_state.searching(res, timeout_seconds))
+
+    _load_exclusion_set(uid=uid, db=db, enqueued_at=res["enqueued_at"])
+    if _pools_active():
+        _add_to_candidate_pools(_pool_entry(res, user_profile), db)
+
+    # Server-side timeout: become a host exactly at timeout even if the client stops polling
+    schedule_host_promotion(uid=uid, delay_seconds=timeout_seconds)
+
     return res
 
 
@@ -111,6 +234,11 @@ def _leave_queue(uid: str, db: Session):
         RETURNING *
     """)
     res = db.execute(stmt, {"uid": uid}).mappings().first()
+    if res:
+        matchmaking_state.touch(db, uid)
+    _drop_exclusion_set(uid=uid)
+    matchmaking_pools.remove(uid)
+    cancel_host_promotion(uid=uid)
     
     if not res:
         return None
@@ -156,48 +284,31 @@ def _calculate_age_from_dob(dob) -> int:
     )
     return age
 
-def _parse_location(location_text: str) -> Optional[tuple[float, float]]:
-    """
-    Parse location text to extract latitude and longitude.
-    
-    Supports formats:
-    - JSON string: '{"lat": 40.7128, "lng": -74.0060}'
-    - Comma-separated: '40.7128,-74.0060'
-    - Dict (if already parsed): {'lat': 40.7128, 'lng': -74.0060}
-    
-    Returns tuple of (latitude, longitude) or None if parsing fails.
-    """
-    if not location_text:
-        return None
-    
-    try:
-        # If it's a string, try to parse as JSON first
-        if isinstance(location_text, str):
-            # Try JSON format
-            if location_text.strip().startswith('{'):
-                loc_dict = json.loads(location_text)
-                lat = loc_dict.get('lat') or loc_dict.get('latitude')
-                lng = loc_dict.get('lng') or loc_dict.get('longitude') or loc_dict.get('lon')
-                if lat is not None and lng is not None:
-                    return (float(lat), float(lng))
-            
-            # Try comma-separated format
-            if ',' in location_text:
-                parts = location_text.split(',')
-                if len(parts) == 2:
-                    return (float(parts[0].strip()), float(parts[1].strip()))
-        
-        # If it's already a dict
-        elif isinstance(location_text, dict):
-            lat = location_text.get('lat') or location_text.get('latitude')
-            lng = location_text.get('lng') or location_text.get('longitude') or location_text.get('lon')
-            if lat is not None and lng is not None:
-                return (float(lat), float(lng))
-    
-    except (ValueError, json.JSONDecodeError, KeyError, AttributeError):
-        return None
-    
-    return None
+def _profile_coords(profile: dict) -> Optional[tuple[float, float]]:
+    """(lat, lng) from the typed columns, parsing the location text only for rows not backfilled yet."""
+    lat, lng = profile.get("lat"), profile.get("lng")
+    if lat is not None and lng is not None:
+        return (float(lat), float(lng))
+    return _parse_location(profile.get("location"))
+
+
+def _profile_age(profile: dict) -> int:
+    """Age computed by the profile query (controllers.profile.PROFILE_AGE_SQL), 0 when unknown."""
+    age = profile.get("age")
+    if age is not None:
+        return age
+    dob = profile.get("birthdate")
+    return _calculate_age_from_dob(dob) if dob else 0
+
+
+def _fill_location_from_queue(profile: dict, queue_row) -> None:
+    """Profiles without a location fall back to what was snapshotted in their queue row."""
+    if profile.get("location"):
+        return
+    if queue_row.get("lat") is not None and queue_row.get("lng") is not None:
+        profile["lat"], profile["lng"] = queue_row["lat"], queue_row["lng"]
+    elif queue_row.get("location_snapshot"):
+        profile["location"] = queue_row["location_snapshot"]
 
 
 def _calculate_distance_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -232,43 +343,103 @@ def _calculate_distance_miles(lat1: float, lon1: float, lat2: float, lon2: float
     distance = R * c
     return distance
 
-def _have_matched_before(uid_a: str, uid_b: str, db: Session) -> bool:
-    a, b = sorted([str(uid_a), str(uid_b)])
-    row = db.execute(
-        text(
-            """
-            SELECT 1
-            FROM users.chats
-            WHERE user_a_uid = :a
-              AND user_b_uid = :b
-            LIMIT 1
-            """
-        ),
-        {"a": a, "b": b},
-    ).first()
-    return row is not None
+# _load_exclusion_set: previous chat partners (cooldown_remaining NULL) and recent-session partners
+EXCLUSION_SET_SQL = """
+    SELECT
+        CASE WHEN c.user_a_uid = :uid THEN c.user_b_uid ELSE c.user_a_uid END AS partner_uid,
+        NULL AS cooldown_remaining
+    FROM users.chats c
+    WHERE c.user_a_uid = :uid OR c.user_b_uid = :uid
+    UNION ALL
+    SELECT
+        CASE WHEN s.host_uid = :uid THEN s.guest_uid ELSE s.host_uid END AS partner_uid,
+        EXTRACT(EPOCH FROM (s.closed_at + make_interval(secs => :cooldown_seconds) - NOW())) AS cooldown_remaining
+    FROM sessions.sessions s
+    WHERE (s.host_uid = :uid OR s.guest_uid = :uid)
+      AND s.guest_uid IS NOT NULL
+      AND s.closed_at IS NOT NULL
+      AND s.closed_at > NOW() - make_interval(secs => :cooldown_seconds)
+"""
+
+
+def _load_exclusion_set(uid: str, db: Session, enqueued_at: Optional[datetime] = None) -> ExclusionSet:
+    """
+    Load the partners a user must never be paired with again (previous chat partners)
+    plus the partners still inside the recent-session cooldown, in a single query.
+    Called once at enqueue (with the queue entry's enqueued_at) so candidate pruning is an in-memory membership test.
+    """
+    stmt = text(EXCLUSION_SET_SQL)
+    rows = db.execute(stmt, {"uid": uid, "cooldown_seconds": RECENT_SESSION_COOLDOWN_MINUTES * 60}).mappings().all()
+
+    now = time.monotonic()
+    partners: set[str] = set()
+    cooldowns: dict[str, float] = {}
+    for row in rows:
+        partner_uid = str(row["partner_uid"])
+        if row["cooldown_remaining"] is None:
+            partners.add(partner_uid)
+        else:
+            cooldowns[partner_uid] = max(cooldowns.get(partner_uid, 0), now + float(row["cooldown_remaining"]))
+
+    exclusions = ExclusionSet(enqueued_at=enqueued_at, partners=partners, cooldowns=cooldowns)
+    exclusion_sets.set(str(uid), exclusions)
+    return exclusions
 
 
-def _has_recent_session(uid_a: str, uid_b: str, db: Session) -> bool:
+def _drop_exclusion_set(uid: str):
+    """Forget a user's exclusion set once they are no longer searching."""
+    exclusion_sets.delete(str(uid))
+
+
+def _exclusion_set(uid: str, enqueued_at: Optional[datetime], db: Session) -> ExclusionSet:
+    """
+    The user's exclusion set for their queue entry enqueued at 'enqueued_at' (None: whichever is loaded).
+    Loaded lazily on a cold start (e.g. worker restarted while the user was queued) and reloaded when the set
+    was loaded for another queue entry: matches made by other workers are only seen by a reload.
+    """
+    exclusions = exclusion_sets.get(str(uid))
+    if exclusions is None or (enqueued_at is not None and exclusions.enqueued_at != enqueued_at):
+        exclusions = _load_exclusion_set(uid=uid, db=db, enqueued_at=enqueued_at)
+    return exclusions
+
+
+def _excludes(exclusions: ExclusionSet, candidate_uid: str) -> bool:
+    """Check whether candidate_uid is a previous match or still in cooldown, in memory."""
+    candidate_str = str(candidate_uid)
+    if candidate_str in exclusions.partners:
+        return True
+
+    cooldowns = exclusions.cooldowns
+    expires = cooldowns.get(candidate_str)
+    if expires is None:
+        return False
+    if expires <= time.monotonic():
+        cooldowns.pop(candidate_str, None)
+        return False
+    return True
+
+
+def _record_matched_pair(uid_a: str, uid_b: str):
+    """Incrementally exclude a newly created users.chats pair for any loaded sets."""
+    a, b = str(uid_a), str(uid_b)
+    for uid, partner in ((a, b), (b, a)):
+        exclusions = exclusion_sets.get(uid)
+        if exclusions is not None:
+            exclusions.partners.add(partner)
+
+
+def _record_session_closed(uid_a: str, uid_b: str):
+    """Put both participants of a closed session in each other's cooldown for any loaded sets."""
     cooldown_seconds = RECENT_SESSION_COOLDOWN_MINUTES * 60
-    row = db.execute(
-        text(
-            """
-            SELECT 1
-            FROM sessions.sessions s
-            WHERE (
-                (s.host_uid = :a AND s.guest_uid = :b)
-                OR
-                (s.host_uid = :b AND s.guest_uid = :a)
-            )
-              AND s.closed_at IS NOT NULL
-              AND s.closed_at > NOW() - make_interval(secs => :cooldown_seconds)
-            LIMIT 1
-            """
-        ),
-        {"a": uid_a, "b": uid_b, "cooldown_seconds": cooldown_seconds},
-    ).first()
-    return row is not None
+    if cooldown_seconds <= 0:
+        return
+
+    a, b = str(uid_a), str(uid_b)
+    expires = time.monotonic() + cooldown_seconds
+    for uid, partner in ((a, b), (b, a)):
+        exclusions = exclusion_sets.get(uid)
+        if exclusions is not None:
+            exclusions.cooldowns[partner] = expires
 
 
 def _normalize_value(val):
@@ -318,7 +489,7 @@ def _check_preference_match(profile_value, preference_filter) -> bool:
     return False
 
 
-def _are_preferences_compatible(host_prefs: dict, guest_prefs: dict, host_profile: dict, guest_profile: dict) -> bool:
+def _compatibility_rejection(host_prefs: dict, guest_prefs: dict, host_profile: dict, guest_profile: dict) -> Optional[str]:
     """
     Enhanced compatibility check with extra_options preference filtering.
     
@@ -326,14 +497,11 @@ def _are_preferences_compatible(host_prefs: dict, guest_prefs: dict, host_profil
     - Core preferences (gender, age, distance) must match (both ways)
     - Extra options preferences: If a preference field has values, the other user's profile
       must have AT LEAST ONE matching value in that field
-    """
-    log = logging.getLogger("matchmaking")
-    log.info("┌─────────────────────────────────────────┐")
-    log.info("│  COMPATIBILITY CHECK                    │")
-    log.info("└─────────────────────────────────────────┘")
 
+    Returns None when the pair is compatible, otherwise the reason code of the first failed check:
+    'gender', 'age', 'distance' or 'extra:<field>'.
+    """
     # ========== CORE PREFERENCES ==========
-    log.info("📋 Core Preferences Check:")
     
     # Extract core preferences
     host_age_min = host_prefs.get('age_min', 18)
@@ -345,121 +513,57 @@ def _are_preferences_compatible(host_prefs: dict, guest_prefs: dict, host_profil
     guest_max_distance = guest_prefs.get('max_distance', 999999)
 
     # Extract profile info
-    host_dob = host_profile.get('birthdate')
-    guest_dob = guest_profile.get('birthdate')
-    host_location = host_profile.get('location')
-    guest_location = guest_profile.get('location')
-
-    # Calculate ages
-    host_age = _calculate_age_from_dob(host_dob) if host_dob else 0
-    guest_age = _calculate_age_from_dob(guest_dob) if guest_dob else 0
-
-    log.info(f"  Host: age={host_age}, wants ages [{host_age_min}-{host_age_max}], max_distance={host_max_distance}")
-    log.info(f"  Guest: age={guest_age}, wants ages [{guest_age_min}-{guest_age_max}], max_distance={guest_max_distance}")
+    host_age = _profile_age(host_profile)
+    guest_age = _profile_age(guest_profile)
 
     # Gender compatibility (both ways)
-    log.info("🚻 Gender Check:")
     host_gender_name = _normalize_value(host_profile.get("gender"))
     guest_gender_name = _normalize_value(guest_profile.get("gender"))
     host_target_name = _normalize_value(host_prefs.get("target_gender"))
     guest_target_name = _normalize_value(guest_prefs.get("target_gender"))
 
-    log.info(f"  Host is '{host_gender_name}', wants '{host_target_name}'")
-    log.info(f"  Guest is '{guest_gender_name}', wants '{guest_target_name}'")
-
     def accepts_gender(target, actual):
         if not target or target == "any":
             return True
         return target == actual
 
     if not accepts_gender(host_target_name, guest_gender_name):
-        log.info(f"  ✗ FAIL: Host wants '{host_target_name}' but guest is '{guest_gender_name}'")
-        return False
+        return "gender"
 
     if not accepts_gender(guest_target_name, host_gender_name):
-        log.info(f"  ✗ FAIL: Guest wants '{guest_target_name}' but host is '{host_gender_name}'")
-        return False
-
-    log.info(f"  ✓ PASS: Gender compatibility OK")
+        return "gender"
 
     # Age compatibility (both ways)
-    log.info("🎂 Age Check:")
-    if guest_age > 0:
-        if not (host_age_min <= guest_age <= host_age_max):
-            log.info(f"  ✗ FAIL: Guest age {guest_age} not in host range [{host_age_min}, {host_age_max}]")
-            return False
-        log.info(f"  ✓ Host accepts guest age {guest_age}")
+    if guest_age > 0 and not (host_age_min <= guest_age <= host_age_max):
+        return "age"
 
-    if host_age > 0:
-        if not (guest_age_min <= host_age <= guest_age_max):
-            log.info(f"  ✗ FAIL: Host age {host_age} not in guest range [{guest_age_min}, {guest_age_max}]")
-            return False
-        log.info(f"  ✓ Guest accepts host age {host_age}")
-
-    log.info(f"  ✓ PASS: Age compatibility OK")
+    if host_age > 0 and not (guest_age_min <= host_age <= guest_age_max):
+        return "age"
 
     # Distance compatibility (both ways)
-    log.info("📍 Distance Check:")
-    host_coords = _parse_location(host_location)
-    guest_coords = _parse_location(guest_location)
+    host_coords = _profile_coords(host_profile)
+    guest_coords = _profile_coords(guest_profile)
 
     if host_coords and guest_coords:
         host_lat, host_lon = host_coords
         guest_lat, guest_lon = guest_coords
 
         distance_miles = _calculate_distance_miles(host_lat, host_lon, guest_lat, guest_lon)
-        log.info(f"  Distance between users: {distance_miles:.1f} miles")
 
         if distance_miles > host_max_distance:
-            log.info(f"  ✗ FAIL: {distance_miles:.1f} miles > host max {host_max_distance}")
-            return False
-        log.info(f"  ✓ Host accepts distance {distance_miles:.1f} miles")
+            return "distance"
 
         if distance_miles > guest_max_distance:
-            log.info(f"  ✗ FAIL: {distance_miles:.1f} miles > guest max {guest_max_distance}")
-            return False
-        log.info(f"  ✓ Guest accepts distance {distance_miles:.1f} miles")
-
-        log.info(f"  ✓ PASS: Distance compatibility OK")
-    else:
-        log.info(f"  ⚠ WARNING: Location data missing, skipping distance check")
+            return "distance"
 
     # ========== EXTRA OPTIONS PREFERENCES ==========
     
     host_extra = host_prefs.get('extra_options', {}) or {}
     guest_extra = guest_prefs.get('extra_options', {}) or {}
     
-    log.info("🎯 Extra Preferences Check:")
-    
-    if not host_extra and not guest_extra:
-        log.info("  ℹ No extra preferences set by either user")
-    
-    # Define preference fields to check
-    preference_fields = [
-        ('relationship_goal', 'relationship_goal'),
-        ('personality_type', 'personality_type'),
-        ('love_language', 'love_language'),
-        ('attachment_style', 'attachment_style'),
-        ('political_view', 'political_view'),
-        ('zodiac_sign', 'zodiac_sign'),
-        ('religion', 'religion'),
-        ('diet', 'diet'),
-        ('exercise_frequency', 'exercise_frequency'),
-        ('smoke_frequency', 'smoke_frequency'),
-        ('drink_frequency', 'drink_frequency'),
-        ('sleep_schedule', 'sleep_schedule'),
-        ('weed_use', 'weed_use'),
-        ('drug_use', 'drug_use'),
-        ('interests', 'interests'),
-        ('languages_spoken', 'languages_spoken'),
-        ('pets', 'pets'),
-        ('school', 'school'),
-    ]
-    
     # Check HOST preferences against GUEST profile
     if host_extra:
-        log.info("  🔍 Checking HOST preferences against GUEST profile:")
-        for pref_key, profile_key in preference_fields:
+        for pref_key, profile_key in PREFERENCE_FIELDS:
             host_pref_filter = host_extra.get(pref_key)
             
             # Skip if host has no preference for this field
@@ -472,18 +576,12 @@ def _are_preferences_compatible(host_prefs: dict, guest_prefs: dict, host_profil
             
             guest_profile_value = guest_profile.get(profile_key)
             
-            log.info(f"    • {pref_key}: host wants {host_pref_filter}, guest has {guest_profile_value}")
-            
             if not _check_preference_match(guest_profile_value, host_pref_filter):
-                log.info(f"    ✗ FAIL: No match found")
-                return False
-            
-            log.info(f"    ✓ PASS: Match found")
+                return f"extra:{pref_key}"
     
     # Check GUEST preferences against HOST profile
     if guest_extra:
-        log.info("  🔍 Checking GUEST preferences against HOST profile:")
-        for pref_key, profile_key in preference_fields:
+        for pref_key, profile_key in PREFERENCE_FIELDS:
             guest_pref_filter = guest_extra.get(pref_key)
             
             # Skip if guest has no preference for this field
@@ -496,146 +594,416 @@ def _are_preferences_compatible(host_prefs: dict, guest_prefs: dict, host_profil
             
             host_profile_value = host_profile.get(profile_key)
             
-            log.info(f"    • {pref_key}: guest wants {guest_pref_filter}, host has {host_profile_value}")
-            
             if not _check_preference_match(host_profile_value, guest_pref_filter):
-                log.info(f"    ✗ FAIL: No match found")
-                return False
-            
-            log.info(f"    ✓ PASS: Match found")
+                return f"extra:{pref_key}"
 
-    log.info("┌─────────────────────────────────────────┐")
-    log.info("│  ✅ USERS ARE COMPATIBLE!               │")
-    log.info("└─────────────────────────────────────────┘")
-    return True
+    return None
+
+
+_verdict_cache = TTLCache(
+    "matchmaking_verdicts",
+    maxsize=settings.matchmaking_verdict_cache_size,
+    ttl_seconds=settings.matchmaking_verdict_cache_ttl_seconds,
+)
+_UNCACHED = object()
+
+
+def _verdict_key(host_uid, guest_uid) -> Optional[tuple]:
+    """Cache key for a pair's verdict, None (don't cache) when a uid is missing or the cache is off."""
+    if not host_uid or not guest_uid or _verdict_cache.maxsize <= 0:
+        return None
+    return (
+        str(host_uid), versions.get("prefs", host_uid), versions.get("profile_match", host_uid),
+        str(guest_uid), versions.get("prefs", guest_uid), versions.get("profile_match", guest_uid),
+    )
 
 
-def _find_compatible_queue_peer(guest_uid: str, guest_prefs: dict, guest_profile: dict, db: Session) -> Optional[str]:
+def _are_preferences_compatible(host_prefs: dict, guest_prefs: dict, host_profile: dict, guest_profile: dict) -> bool:
     """
-    Find a compatible peer directly from the matchmaking_queue.
-    Returns the UID of the peer if found, or None.
+    _compatibility_rejection as a bool, counting the outcome (services.matchmaking_rejections) on the way.
+    The verdict is memoized per pair and per prefs / profile version of both sides, so re-checking the same
+    pair on every poll costs a dict lookup until one of them edits their prefs or profile.
     """
-    log = logging.getLogger("matchmaking")
-    log.info(f"🔍 Searching queue for compatible peer for user {guest_uid}...")
-    
-    stmt = text("""
-        SELECT 
-            q.uid,
-            q.prefs_snapshot,
-            q.location_snapshot,
-            q.enqueued_at
-        FROM sessions.matchmaking_queue q
-        WHERE q.uid != :guest_uid
-          AND q.expires_at > NOW()
-        ORDER BY q.enqueued_at ASC
-        LIMIT 20
-    """)
+    key = _verdict_key(host_profile.get("uid"), guest_profile.get("uid"))
+    reason = _verdict_cache.get(key, _UNCACHED) if key else _UNCACHED
+    if reason is _UNCACHED:
+        reason = _compatibility_rejection(host_prefs, guest_prefs, host_profile, guest_profile)
+        if key:
+            _verdict_cache.set(key, reason)
+    record_outcome(reason)
+    if explain_match_enabled(host_profile.get("uid"), guest_profile.get("uid")):
+        explain_log.info(
+            "Compatibility host=%s guest=%s: %s",
+            host_profile.get("uid"), guest_profile.get("uid"), reason or "compatible",
+        )
+    return reason is None
 
-    rows = db.execute(stmt, {"guest_uid": guest_uid}).mappings().all()
-    log.info(f"  Found {len(rows)} users in queue (excluding self)")
 
-    for idx, row in enumerate(rows, 1):
-        host_uid = row["uid"]
-        log.info(f"  Candidate {idx}/{len(rows)}: User {host_uid}")
-        
-        if _have_matched_before(guest_uid, host_uid, db):
-            log.info(f"    ⏭ Skip: Already matched before")
-            continue
-            
-        if _has_recent_session(guest_uid, host_uid, db):
-            log.info(f"    ⏭ Skip: Recent session cooldown")
+def _candidate_features(uid: str, profile: dict, distance_miles: Optional[float] = None, waited_seconds: float = 0.0) -> CandidateFeatures:
+    return CandidateFeatures(
+        uid=str(uid),
+        interests=frozenset(profile.get("interests") or ()),
+        languages=frozenset(profile.get("languages_spoken") or ()),
+        distance_miles=distance_miles,
+        waited_seconds=waited_seconds,
+    )
+
+
+def _rank_candidates(
+    guest_uid: str,
+    guest_prefs: dict,
+    guest_profile: dict,
+    rows: List[Dict[str, Any]],
+    prefs_key: str,
+    db: Session,
+    k: int = 1,
+    guest_enqueued_at: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Hard filters, then ranking, over candidate rows (each with 'host_uid', prefs under prefs_key, 'enqueued_at'
+    and optionally 'location_snapshot'). Exclusions are checked in memory, candidate profiles are loaded in one
+    batch and the compatible ones are scored by services.matchmaking_scoring. Returns the k best rows, best first.
+    """
+    log = logging.getLogger("matchmaking")
+
+    exclusions = _exclusion_set(guest_uid, guest_enqueued_at, db)
+    candidates = []
+    for row in rows:
+        if _excludes(exclusions, row["host_uid"]):
+            log.debug("Skip %s for %s: matched before or in session cooldown", row["host_uid"], guest_uid)
+            record_outcome("excluded")
             continue
-    
-        host_prefs = row["prefs_snapshot"]
+        candidates.append(row)
+
+    profiles = _get_profiles([row["host_uid"] for row in candidates], db)
 
-        host_profile = _get_profile(uid=host_uid, db=db)
+    compatible = []
+    for row in candidates:
+        host_uid = str(row["host_uid"])
+        host_profile = profiles.get(host_uid)
         if not host_profile:
-            log.info(f"    ⏭ Skip: No profile found")
+            log.debug("Skip %s for %s: no profile found", host_uid, guest_uid)
+            record_outcome("no_profile")
             continue
 
         # If location is not present fall back to snapshot if needed
-        if not host_profile.get("location") and row.get("location_snapshot"):
-            host_profile = dict(host_profile)
-            host_profile["location"] = row["location_snapshot"]
+        _fill_location_from_queue(host_profile, row)
 
-        if _are_preferences_compatible(
-            host_prefs=host_prefs,
+        if not _are_preferences_compatible(
+            host_prefs=row[prefs_key],
             guest_prefs=guest_prefs,
             host_profile=host_profile,
             guest_profile=guest_profile,
         ):
-            log.info(f"  ✅ Found compatible peer: {host_uid}")
-            return host_uid
-        else:
-            log.info(f"    ❌ Not compatible")
+            log.debug("Skip %s for %s: not compatible", host_uid, guest_uid)
+            continue
 
-    log.info(f"  ❌ No compatible peers found in queue")
-    return None
+        compatible.append((row, host_profile))
 
+    return _top_ranked(guest_uid, guest_profile, compatible, k)
 
-def _find_compatible_session(guest_uid: str, guest_prefs: dict, guest_profile: dict, db: Session) -> Optional[str]:
+
+def _top_ranked(guest_uid: str, guest_profile: dict, compatible: List[tuple], k: int = 1) -> List[Dict[str, Any]]:
+    """Score (row, host_profile) pairs that passed the hard filters and return the k best rows, best first."""
     log = logging.getLogger("matchmaking")
-    log.info(f"🔍 Searching for compatible existing sessions for user {guest_uid}...")
-    
+    guest_coords = _profile_coords(guest_profile)
+    now = datetime.utcnow()
+
+    by_uid = {}
+    features = []
+    for row, host_profile in compatible:
+        host_uid = str(row["host_uid"])
+        host_coords = _profile_coords(host_profile)
+        distance = _calculate_distance_miles(*guest_coords, *host_coords) if guest_coords and host_coords else None
+        waited = (now - row["enqueued_at"]).total_seconds() if row.get("enqueued_at") else 0.0
+
+        by_uid[host_uid] = row
+        features.append(_candidate_features(host_uid, host_profile, distance, waited))
+
+    ranked = top_candidates(
+        _candidate_features(guest_uid, guest_profile),
+        features,
+        k=k,
+        wait_horizon=MATCHMAKING_TIMEOUT_SECONDS,
+    )
+    if ranked:
+        score, chosen = ranked[0]
+        log.debug("Best of %s compatible candidates for %s: %s (score %.3f)", len(features), guest_uid, chosen.uid, score)
+    return [by_uid[chosen.uid] for _, chosen in ranked]
+
+
+def _claim_queue_row(uid: str, db: Session) -> bool:
+    """
+    Row-lock a queue entry for this transaction, without waiting. False means another poll or a batch round is
+    already matching that user (ranking sends concurrent guests to the same best host, they must not queue up on its
+    row lock). Every path that puts a queued user in a session claims their row first, the rounds included
+    (services.matchmaking_rounds._lock_queue), so only one of them can.
+    """
     stmt = text("""
-        SELECT 
-            s.id,
-            s.host_uid,
-            q.prefs_snapshot AS host_prefs,
-            u.birthdate AS host_birthdate,
-            pr.gender_id AS host_gender_id,
-            pr.location AS host_location
-        FROM sessions.sessions s
-        JOIN sessions.matchmaking_queue q
-            ON q.uid = s.host_uid
-            AND q.expires_at > NOW()
-        JOIN users.users u
-            ON u.id = s.host_uid
-            AND u.deleted_at IS NULL
-            AND u.paused = FALSE
-        LEFT JOIN profiles.profiles pr
-            ON pr.uid = s.host_uid
-        WHERE s.status = 'open'
-          AND s.guest_uid IS NULL
-          AND s.closed_at IS NULL
-          AND s.host_uid != :guest_uid
-        ORDER BY q.enqueued_at ASC
-        LIMIT 20
+        SELECT uid
+        FROM sessions.matchmaking_queue
+        WHERE uid = :uid
+          AND expires_at > NOW()
+        FOR UPDATE SKIP LOCKED
     """)
+    return db.execute(stmt, {"uid": uid}).first() is not None
+
+
+# _find_compatible_queue_peer: the oldest live queue entries
+QUEUE_PEER_SCAN_SQL = """
+    SELECT 
+        q.uid AS host_uid,
+        q.prefs_snapshot,
+        q.location_snapshot,
+        q.lat,
+        q.lng,
+        q.enqueued_at
+    FROM sessions.matchmaking_queue q
+    WHERE q.uid != :guest_uid
+      AND q.expires_at > NOW()
+    ORDER BY q.enqueued_at ASC
+    LIMIT :limit
+"""
+
+
+def _find_compatible_queue_peer(
+    guest_uid: str, guest_prefs: dict, guest_profile: dict, db: Session, guest_enqueued_at: Optional[datetime] = None
+) -> Optional[str]:
+    """
+    Find the best compatible peer in the matchmaking_queue (see _rank_candidates).
+    Returns the UID of the peer if found, or None.
 
-    potential_sessions = db.execute(stmt, {"guest_uid": guest_uid}).mappings().all()
-    log.info(f"  Found {len(potential_sessions)} open sessions")
+    Both queue rows are claimed (_claim_queue_row) before returning: the guest's own first, then the best of the
+    top MATCHMAKING_CLAIM_ATTEMPTS candidates that no concurrent poll holds.
+    """
+    log = logging.getLogger("matchmaking")
+    stmt = text(QUEUE_PEER_SCAN_SQL)
 
-    for idx, row in enumerate(potential_sessions, 1):
-        host_uid = row["host_uid"]
-        session_id = row["id"]
-        log.info(f"  Candidate {idx}/{len(potential_sessions)}: Session {session_id} (host: {host_uid})")
-        
-        if _have_matched_before(guest_uid, host_uid, db):
-            log.info(f"    ⏭ Skip: Already matched before")
-            continue
-            
-        if _has_recent_session(guest_uid, host_uid, db):
-            log.info(f"    ⏭ Skip: Recent session cooldown")
-            continue
-    
-        host_prefs = row["host_prefs"]
-        
-        # Get full host profile for preference matching
-        host_profile = _get_profile(uid=host_uid, db=db)
-        if not host_profile:
-            log.info(f"    ⏭ Skip: No profile found")
-            continue
+    rows = db.execute(stmt, {"guest_uid": guest_uid, "limit": MATCHMAKING_CANDIDATE_LIMIT}).mappings().all()
+    log.debug("Queue scan for %s: %s other users queued", guest_uid, len(rows))
 
-        if _are_preferences_compatible(host_prefs, guest_prefs, host_profile, guest_profile):
-            log.info(f"  ✅ Found compatible session: {session_id}")
-            return row["id"]
-        else:
-            log.info(f"    ❌ Not compatible")
+    ranked = _rank_candidates(
+        guest_uid, guest_prefs, guest_profile, [dict(row) for row in rows], "prefs_snapshot", db,
+        k=MATCHMAKING_CLAIM_ATTEMPTS, guest_enqueued_at=guest_enqueued_at,
+    )
+    return _claim_best_peer(guest_uid, ranked, db)
+
+
+def _claim_best_peer(guest_uid: str, ranked: List[Dict[str, Any]], db: Session) -> Optional[str]:
+    """Claim the guest's own queue row, then the first of the ranked rows no concurrent poll holds."""
+    log = logging.getLogger("matchmaking")
+    if ranked and not _claim_queue_row(guest_uid, db):
+        log.debug("User %s is already being matched by another poll", guest_uid)
+        return None
 
-    log.info(f"  ❌ No compatible sessions found")
+    for row in ranked:
+        if _claim_queue_row(row["host_uid"], db):
+            return row["host_uid"]
+        log.debug("Skip %s for %s: being matched by another poll", row["host_uid"], guest_uid)
     return None
 
+
+# --- CANDIDATE POOLS (services/matchmaking_pools.py) ---
+
+versions.add_listener(matchmaking_pools.mark_stale)
+
+
+def _pools_active() -> bool:
+    # With batch rounds the poll never looks for a peer, nothing would read the pools
+    return not rounds_enabled()
+
+
+def _shard_key(prefs: dict, profile: dict) -> ShardKey:
+    return make_shard_key(
+        _profile_coords(profile),
+        _normalize_value(profile.get("gender")),
+        _normalize_value(prefs.get("target_gender")),
+    )
+
+
+def _pool_entry(queue_row, profile: dict) -> PoolEntry:
+    profile = dict(profile)
+    # Same location fallback as the queue scan
+    _fill_location_from_queue(profile, queue_row)
+    prefs = queue_row["prefs_snapshot"] or {}
+    return PoolEntry(
+        uid=str(queue_row["uid"]),
+        prefs=prefs,
+        profile=profile,
+        enqueued_at=queue_row["enqueued_at"],
+        shard=_shard_key(prefs, profile),
+        coords=_profile_coords(profile),
+        max_distance=prefs.get("max_distance", 999999),
+    )
+
+
+def _add_to_candidate_pools(entry: PoolEntry, db: Session):
+    """
+    One batch compatibility pass of an entrant against the pooled users of every shard that can hold a
+    compatible user (services.matchmaking_shards.shard_accepts), then insert it. The entrant's exclusion set
+    is loaded before taking the process-wide pools lock, which only covers in-memory checks.
+    """
+    exclusions = _exclusion_set(entry.uid, entry.enqueued_at, db)
+    unbounded = is_unbounded(entry.coords, entry.max_distance)
+    metrics.inc_counter(
+        "matchmaking_shard_scans_total",
+        description="Candidate pool passes, 'all_cells' when the entrant has no location or an unbounded radius",
+        scope="all_cells" if unbounded else "nearby_cells",
+    )
+
+    with matchmaking_pools.lock:
+        others = []
+        skipped = 0
+        for shard, members in matchmaking_pools.by_shard().items():
+            if shard_accepts(entry.shard, entry.coords, entry.max_distance, shard):
+                others.extend(members)
+            else:
+                skipped += len(members)
+        if skipped:
+            metrics.inc_counter(
+                "matchmaking_shard_skipped_total", skipped,
+                description="Queued users never compared with an entrant because their shard could not match",
+            )
+
+        compatible = []
+        for other in others:
+            if other.uid == entry.uid:
+                continue
+            if _excludes(exclusions, other.uid):
+                record_outcome("excluded")
+                continue
+            if _are_preferences_compatible(
+                host_prefs=other.prefs,
+                guest_prefs=entry.prefs,
+                host_profile=other.profile,
+                guest_profile=entry.profile,
+            ):
+                compatible.append(other.uid)
+        matchmaking_pools.add(entry, compatible)
+
+
+def _sync_candidate_pools(db: Session):
+    """
+    Reconcile this worker's pools with the queue table (throttled to SYNC_INTERVAL_SECONDS) and redo the pass
+    for entries whose profile changed. Users enqueued through another worker (or before a restart) are loaded
+    here, users gone from the queue are dropped.
+    """
+    reload = matchmaking_pools.take_stale()
+
+    if matchmaking_pools.sync_due():
+        rows = db.execute(text("""
+            SELECT uid, enqueued_at
+            FROM sessions.matchmaking_queue
+            WHERE expires_at > NOW()
+        """)).all()
+        queued = {str(row.uid): row.enqueued_at for row in rows}
+        for uid, enqueued_at in matchmaking_pools.known().items():
+            if queued.get(uid) != enqueued_at:
+                matchmaking_pools.remove(uid)
+                reload.discard(uid)
+        known = matchmaking_pools.known()
+        reload |= {uid for uid, enqueued_at in queued.items() if known.get(uid) != enqueued_at}
+
+    if not reload:
+        return
+
+    rows = db.execute(text("""
+        SELECT uid, prefs_snapshot, location_snapshot, lat, lng, enqueued_at
+        FROM sessions.matchmaking_queue
+        WHERE uid = ANY(CAST(:uids AS uuid[]))
+          AND expires_at > NOW()
+    """), {"uids": sorted(reload)}).mappings().all()
+    profiles = _get_profiles([row["uid"] for row in rows], db)
+
+    for row in rows:
+        profile = profiles.get(str(row["uid"]))
+        if not profile:
+            matchmaking_pools.remove(row["uid"])
+            continue
+        _add_to_candidate_pools(_pool_entry(row, profile), db)
+
+
+def _get_queue_shards(db: Session) -> Dict[str, Any]:
+    """Queued users per shard across all workers (the pool gauges only see one worker)."""
+    rows = db.execute(text("""
+        SELECT COALESCE(shard_key, 'unsharded') AS shard_key, COUNT(*) AS users
+        FROM sessions.matchmaking_queue
+        WHERE expires_at > NOW()
+        GROUP BY 1
+        ORDER BY users DESC
+    """)).mappings().all()
+    return {
+        "shards": len(rows),
+        "users": sum(row["users"] for row in rows),
+        "sizes": {row["shard_key"]: row["users"] for row in rows},
+    }
+
+
+def _find_pooled_peer(guest_uid: str, guest_prefs: dict, db: Session, enqueued_at: Optional[datetime] = None) -> Optional[str]:
+    """
+    Best compatible peer from the guest's candidate pool: no queue scan and no compatibility checks, only the
+    exclusions (which can change while queued) are re-checked before ranking and claiming.
+    Falls back to the queue scan when the guest has no pool entry (e.g. no profile).
+    """
+    log = logging.getLogger("matchmaking")
+    _sync_candidate_pools(db)
+
+    entry = matchmaking_pools.get(guest_uid)
+    if entry is None:
+        return _find_compatible_queue_peer(guest_uid, guest_prefs, _get_profile(uid=guest_uid, db=db), db, enqueued_at)
+
+    exclusions = _exclusion_set(guest_uid, entry.enqueued_at, db)
+    peers = [peer for peer in matchmaking_pools.peers(guest_uid) if not _excludes(exclusions, peer.uid)]
+    log.debug("%s compatible users in the candidate pool of %s", len(peers), guest_uid)
+
+    ranked = _top_ranked(
+        guest_uid,
+        entry.profile,
+        [({"host_uid": peer.uid, "enqueued_at": peer.enqueued_at}, peer.profile) for peer in peers],
+        k=MATCHMAKING_CLAIM_ATTEMPTS,
+    )
+    return _claim_best_peer(guest_uid, ranked, db)
+
+
+# _find_compatible_session: open sessions of queued hosts still waiting for a guest
+WAITING_SESSIONS_SQL = """
+    SELECT 
+        s.id,
+        s.host_uid,
+        q.prefs_snapshot AS host_prefs,
+        q.enqueued_at,
+        u.birthdate AS host_birthdate,
+        pr.gender_id AS host_gender_id,
+        pr.location AS host_location
+    FROM sessions.sessions s
+    JOIN sessions.matchmaking_queue q
+        ON q.uid = s.host_uid
+        AND q.expires_at > NOW()
+    JOIN users.users u
+        ON u.id = s.host_uid
+        AND u.deleted_at IS NULL
+        AND u.paused = FALSE
+    LEFT JOIN profiles.profiles pr
+        ON pr.uid = s.host_uid
+    WHERE s.status = 'open'
+      AND s.guest_uid IS NULL
+      AND s.closed_at IS NULL
+      AND s.host_uid != :guest_uid
+    ORDER BY q.enqueued_at ASC
+    LIMIT :limit
+"""
+
+
+def _find_compatible_session(guest_uid: str, guest_prefs: dict, guest_profile: dict, db: Session) -> Optional[str]:
+    log = logging.getLogger("matchmaking")
+    stmt = text(WAITING_SESSIONS_SQL)
+
+    potential_sessions = db.execute(stmt, {"guest_uid": guest_uid, "limit": MATCHMAKING_CANDIDATE_LIMIT}).mappings().all()
+    log.debug("Open session scan for %s: %s sessions waiting for a guest", guest_uid, len(potential_sessions))
+
+    ranked = _rank_candidates(guest_uid, guest_prefs, guest_profile, [dict(row) for row in potential_sessions], "host_prefs", db)
+    return ranked[0]["id"] if ranked else None
+
 def _get_user_first_name(uid: str, db: Session) -> Optional[str]:
     """Helper to fetch a user's first name."""
     user_row = db.execute(
@@ -681,7 +1049,7 @@ def _get_active_session_by_host(host_uid: str, db: Session) -> Optional[Dict[str
     has not been ended (closed_at IS NULL).
     """
     log = logging.getLogger("matchmaking") 
-    log.info(f"Checking for active session hosted by {host_uid}.")
+    log.debug("Checking for active session hosted by %s.", host_uid)
     
     stmt = text("""
         SELECT *
@@ -736,6 +1104,7 @@ def _create_session_from_timeout(
     if not result:
         # This should theoretically not happen with RETURNING *, but good practice
         raise Exception("Failed to create session on timeout.")
+    matchmaking_state.touch(db, host_uid)
 
     # 2. Remove the user from the matchmaking queue
     _leave_queue(uid=host_uid, db=db)
@@ -743,85 +1112,211 @@ def _create_session_from_timeout(
     # 3. Return the created session data
     return dict(result)
 
-# --- MAIN POLL FUNCTION (Corrected Sequential Logic) ---
+def _become_host(uid: str, mode_id: Optional[str], prefs_snapshot: Dict[str, Any], time_elapsed: float, db: Session) -> Dict[str, Any]:
+    """
+    Timeout reached: make the user the host of their own session (or return the one they already host).
+    Shared by the poll fallback and the server-side timeout timer.
+    """
+    from controllers.session import _create_session_from_queue
+    log = logging.getLogger("matchmaking")
 
-async def _poll_for_match(uid: str, db: Session) -> Dict[str, Any]:
-    from controllers.session import _get_active_session, _join_session_by_id, _create_session_from_queue, _get_active_session_by_id
-    log = logging.getLogger("matchmaking") 
-    log.info(f"=== POLL FOR MATCH: User {uid} ===")
-    
-    # 0. Check if user already has a session
-    # Assuming _get_active_session returns a session object/dict or None
-    session = _get_active_session(uid=uid, db=db) 
-    if session:
-        log.info(f"User {uid} already has an active session")
-        session_dict = dict(session)
+    # Check if a session was created previously and is still open (e.g., failed to leave queue previously)
+    if not _get_active_session_by_host(host_uid=uid, db=db):
+        
+        session = _create_session_from_queue(
+            host_uid=uid,
+            mode_id=mode_id,
+            prefs_snapshot=prefs_snapshot,
+            db=db
+        )
 
-        host_uid = str(session_dict.get("host_uid"))
-        guest_uid = str(session_dict.get("guest_uid"))
-        current_uid = str(uid)
+        log.info("Poll outcome uid=%s: timeout, hosting session %s", uid, session['id'])
+        return {
+            "status": "timeout",
+            "role": "host",
+            "session": dict(session),
+            "message": "No matches found. Created session as host. Waiting for a compatible user...",
+        }
+    else:
+        # Session already exists (user polled after creating session, before guest joined)
+        session = _get_active_session_by_host(host_uid=uid, db=db)
+        log.debug("Session already exists (%s) for host %s. Returning timeout status.", session['id'], uid)
+        return {
+            "status": "timeout",
+            "role": "host",
+            "session": dict(session),
+            "message": "Session created, waiting for partner.",
+            "time_elapsed": int(time_elapsed),
+            "time_remaining": 0,
+        }
 
-        # Determine role and partner info for early return
-        if current_uid == guest_uid:
-            role = "guest"
-            partner_uid = host_uid
-        else:
-            role = "host"
-            partner_uid = guest_uid
-        
-        partner_name = _get_user_first_name(partner_uid, db) if partner_uid else "Partner"
 
-        session_dict["other_user_uid"] = partner_uid
-        session_dict["other_user_first_name"] = partner_name
+def _promote_to_host_on_timeout(uid: str, db: Session) -> Optional[Dict[str, Any]]:
+    """
+    Called by the server-side timer when a queued user's timeout expires.
+    Returns the 'timeout' poll response, or None if the user was matched / left / re-enqueued meanwhile.
+    """
+    from controllers.session import _get_active_session
+
+    if _get_active_session(uid=uid, db=db) or not _user_in_queue(uid=uid, db=db):
+        return None
+
+    queue_entry = _get_queue(uid=uid, db=db)
+    timeout_seconds = _get_mode_timeout_seconds(mode_id=queue_entry["mode_id"], db=db)
+    time_elapsed = (datetime.utcnow() - queue_entry["enqueued_at"]).total_seconds()
 
+    if time_elapsed < timeout_seconds:
+        # Re-enqueued after this timer was scheduled, wait for the remainder
+        schedule_host_promotion(uid=uid, delay_seconds=timeout_seconds - time_elapsed)
+        return None
+
+    if not _claim_queue_row(uid, db):
+        # A batch round (or a peer's poll) holds the queue row: check again once it is done
+        schedule_host_promotion(uid=uid, delay_seconds=MATCHMAKING_POLL_INTERVAL_SECONDS)
+        return None
+
+    return _become_host(
+        uid=uid,
+        mode_id=queue_entry["mode_id"],
+        prefs_snapshot=queue_entry["prefs_snapshot"],
+        time_elapsed=time_elapsed,
+        db=db,
+    )
+
+# --- MAIN POLL FUNCTION (Corrected Sequential Logic) ---
+
+def _matchmaking_snapshot(uid: str, db: Session) -> Dict[str, Any]:
+    """
+    The user's matchmaking state (services/matchmaking_state.py): from memory when no transition happened since it
+    was loaded, otherwise from the session / queue tables (and the partner's first name), then remembered.
+    """
+    from controllers.session import _get_active_session
+
+    snapshot = matchmaking_state.get(uid)
+    if snapshot is not None:
+        return snapshot
+
+    loaded_at = matchmaking_state.version(uid)
+    session = _get_active_session(uid=uid, db=db)
+    if session:
         if _user_in_queue(uid=uid, db=db):
-            log.info(f"Removing user {uid} from queue (already in session)")
+            logging.getLogger("matchmaking").info("Removing user %s from queue (already in session)", uid)
             _leave_queue(uid=uid, db=db)
-            
+
+        snapshot = matchmaking_state.in_session(uid, dict(session), None)
+        other_uid = snapshot["other_user_uid"]
+        snapshot["other_user_first_name"] = _get_user_first_name(other_uid, db) if other_uid else None
+    else:
+        queue_entry = _find_queue(uid=uid, db=db)
+        if queue_entry:
+            timeout_seconds = _get_mode_timeout_seconds(mode_id=queue_entry["mode_id"], db=db)
+            snapshot = matchmaking_state.searching(queue_entry, timeout_seconds)
+        else:
+            snapshot = matchmaking_state.IDLE
+
+    matchmaking_state.put(uid, loaded_at, snapshot)
+    return snapshot
+
+
+def _in_session_poll_result(state: Dict[str, Any]) -> Dict[str, Any]:
+    session_dict = dict(state["session"])
+
+    # Host promoted by the server-side timeout timer, still waiting for a guest
+    if state["role"] == "host" and not state["other_user_uid"]:
         return {
-            "status": "found",
-            "role": role,
+            "status": "timeout",
+            "role": "host",
             "session": session_dict,
-            "message": "Match found!",
+            "message": "Session created, waiting for partner.",
+            "time_remaining": 0,
         }
 
+    session_dict["other_user_uid"] = state["other_user_uid"]
+    session_dict["other_user_first_name"] = state["other_user_first_name"]
+
+    return {
+        "status": "found",
+        "role": state["role"],
+        "session": session_dict,
+        "message": "Match found!",
+    }
+
+
+def _claimed_since_snapshot(uid: str, db: Session) -> Optional[Dict[str, Any]]:
+    """
+    The poll result when the user is in a session although their snapshot said 'searching', None otherwise.
+
+    A snapshot can be MATCHMAKING_STATE_TTL_SECONDS old when another worker did the transition (a peer claimed
+    the user, a batch round, the host-promotion timer): checked in the DB before any write step of the poll,
+    whose 'already in a session' guards would raise 409 instead of reporting the match.
+    """
+    from controllers.session import _get_active_session
+
+    if _get_active_session(uid=uid, db=db) is None:
+        return None
+    matchmaking_state.drop(uid)
+    state = _matchmaking_snapshot(uid=uid, db=db)
+    if state["state"] != "in_session":
+        return None
+    logging.getLogger("matchmaking").info("User %s was put in a session since their last snapshot", uid)
+    return _in_session_poll_result(state)
+
+
+def _searching_poll_result(time_elapsed: float, timeout_seconds: int) -> Dict[str, Any]:
+    time_remaining = max(0, timeout_seconds - time_elapsed)
+    return {
+        "status": "searching",
+        "message": "Still searching for a match...",
+        "time_elapsed": int(time_elapsed),
+        "time_remaining": int(time_remaining),
+        "poll_again_in": MATCHMAKING_POLL_INTERVAL_SECONDS,
+    }
+
+
+async def _poll_for_match(uid: str, db: Session) -> Dict[str, Any]:
+    from controllers.session import _join_session_by_id, _create_session_from_queue
+    log = logging.getLogger("matchmaking") 
+    log.debug("Poll for match: user %s", uid)
+    
+    # 0. Check if user already has a session (in memory unless something changed since the last poll)
+    state = _matchmaking_snapshot(uid=uid, db=db)
+    if state["state"] == "in_session":
+        log.debug("User %s already has an active session", uid)
+        return _in_session_poll_result(state)
+
     # Check if user is in queue (must be here for all subsequent steps)
-    if not _user_in_queue(uid=uid, db=db):
-        log.info(f"User {uid} not in queue and not in session")
+    if state["state"] != "searching":
+        log.debug("User %s not in queue and not in session", uid)
         return {
             "status": "cancelled",
             "message": "User not in queue and not in session",
         }
 
-    # Get queue entry and calculate time elapsed
-    queue_entry = _get_queue(uid=uid, db=db)
-    time_elapsed = (datetime.utcnow() - queue_entry.enqueued_at).total_seconds()
-    log.info(f"User {uid} has been in queue for {time_elapsed:.1f} seconds")
-    mode_id = queue_entry["mode_id"]
-    prefs_snapshot = queue_entry["prefs_snapshot"]
-    # time_elapsed = queue_entry["time_elapsed"]
-    
-    # log.info(f"User {uid} has been in queue for {time_elapsed:.1f} seconds")
+    # Time in queue from the queue entry the snapshot was taken from
+    time_elapsed = (datetime.utcnow() - state["enqueued_at"]).total_seconds()
+    log.debug("User %s has been in queue for %.1f seconds", uid, time_elapsed)
+    mode_id = state["mode_id"]
+    prefs_snapshot = state["prefs_snapshot"]
+    timeout_seconds = state["timeout_seconds"]
     
     # --- STEP 1: Try to find a compatible peer in the queue (Creates NEW session) ---
-    log.info(f"STEP 1: Searching for compatible peer in queue...")
-    # Assuming _find_compatible_queue_peer handles all preference/compatibility checks
-    peer_uid = _find_compatible_queue_peer(
-        guest_uid=uid,
-        guest_prefs=prefs_snapshot,
-        guest_profile=_get_profile(uid=uid, db=db), # Assuming _get_profile is available
-        db=db,
-    )
+    if rounds_enabled():
+        # Queued users are paired by the batch rounds (services.matchmaking_rounds), the poll reports the outcome
+        peer_uid = None
+    else:
+        log.debug("STEP 1: Searching for compatible peer in queue")
+        peer_uid = _find_pooled_peer(guest_uid=uid, guest_prefs=prefs_snapshot, db=db, enqueued_at=state["enqueued_at"])
 
     if peer_uid:
-        log.info(f"✓ Found compatible peer in queue: {peer_uid}")
+        claimed = _claimed_since_snapshot(uid=uid, db=db)
+        if claimed:
+            return claimed
         
         host_uid = peer_uid
         host_queue = _get_queue(uid=host_uid, db=db)
         host_mode_id = host_queue.get("mode_id")
         host_prefs_snapshot = host_queue["prefs_snapshot"]
 
-        log.info(f"Creating session with host={host_uid}, guest={uid}")
         # Assuming _create_session_from_queue is available
         session = _create_session_from_queue( 
             host_uid=host_uid,
@@ -842,23 +1337,27 @@ async def _poll_for_match(uid: str, db: Session) -> Dict[str, Any]:
         session_dict["other_user_uid"] = host_uid
         session_dict["other_user_first_name"] = partner_name
         
-        log.info(f"✓ Successfully matched {uid} with {peer_uid} from queue")
+        log.info("Poll outcome uid=%s: found, guest of queued peer %s in session %s", uid, peer_uid, session_dict["id"])
         return {
             "status": "found",
             "role": "guest",
             "session": session_dict,
             "message": "Match found!",
         }
-    else:
-        log.info(f"✗ No compatible peers found in queue")
 
     # --- STEP 2: Try to find a compatible existing session to join (Joins EXISTING session) ---
-    log.info(f"STEP 2: Searching for compatible existing open sessions...")
+    log.debug("STEP 2: Searching for compatible existing open sessions")
     # Using the simpler mode_id check from the user's provided _find_open_session definition
     open_session_info = _find_open_session(db, uid, mode_id)
 
     if open_session_info:
-        log.info(f"✓ Found compatible session: {open_session_info['session_id']}")
+        claimed = _claimed_since_snapshot(uid=uid, db=db)
+        if claimed:
+            return claimed
+        if not _claim_queue_row(uid, db):
+            # A batch round (or a peer's poll) is pairing this user right now, its outcome shows on the next poll
+            log.info("User %s is being matched elsewhere, not joining session %s", uid, open_session_info['session_id'])
+            return _searching_poll_result(time_elapsed, timeout_seconds)
         
         session_id = open_session_info["session_id"]
         host_uid = open_session_info["host_uid"]
@@ -871,7 +1370,7 @@ async def _poll_for_match(uid: str, db: Session) -> Dict[str, Any]:
         # Notify BOTH host and guest that they're now matched
         await _notify_users_of_session_found(host_uid=host_uid, session_id=session_id, guest_uid=uid)
 
-        log.info(f"✓ Successfully joined user {uid} to session {session_id}")
+        log.info("Poll outcome uid=%s: found, guest of host %s in session %s", uid, host_uid, session_id)
         
         # Construct session data to return to the polling user (the Guest)
         session_dict = dict(session)
@@ -884,106 +1383,46 @@ async def _poll_for_match(uid: str, db: Session) -> Dict[str, Any]:
             "session": session_dict,
             "message": "Match found!",
         }
-    else:
-        log.info(f"✗ No compatible open sessions found")
 
 
     # --- STEP 3: Check if timeout reached - if so, create own session (Becomes HOST) ---
-    if time_elapsed >= MATCHMAKING_TIMEOUT_SECONDS:
-        log.info(f"STEP 3: Timeout reached ({time_elapsed:.1f}s >= {MATCHMAKING_TIMEOUT_SECONDS}s)")
-        
-        # Check if a session was created previously and is still open (e.g., failed to leave queue previously)
-        if not _get_active_session_by_host(host_uid=uid, db=db):
-            
-            log.info(f"Creating session as host for user {uid}")
-            # Assuming _create_session_from_timeout is available
-            session = _create_session_from_queue(
-                host_uid=uid,
-                mode_id=mode_id,
-                prefs_snapshot=prefs_snapshot,
-                db=db
-            )
-
-            log.info(f"✓ Created session {session['id']} with user {uid} as host, waiting for guest...")
-            return {
-                "status": "timeout",
-                "role": "host",
-                "session": dict(session),
-                "message": "No matches found. Created session as host. Waiting for a compatible user...",
-            }
-        else:
-            # Session already exists (user polled after creating session, before guest joined)
-            session = _get_active_session_by_host(host_uid=uid, db=db)
-            log.info(f"Session already exists ({session['id']}) for host {uid}. Returning timeout status.")
-            return {
-                "status": "timeout",
-                "role": "host",
-                "session": dict(session),
-                "message": "Session created, waiting for partner.",
-                "time_elapsed": int(time_elapsed),
-                "time_remaining": 0,
-            }
+    if time_elapsed >= timeout_seconds:
+        log.debug("STEP 3: Timeout reached (%.1fs >= %ss)", time_elapsed, timeout_seconds)
+        claimed = _claimed_since_snapshot(uid=uid, db=db)
+        if claimed:
+            return claimed
+        if not _claim_queue_row(uid, db):
+            log.info("User %s is being matched elsewhere, not becoming a host", uid)
+            return _searching_poll_result(time_elapsed, timeout_seconds)
+        return _become_host(uid=uid, mode_id=mode_id, prefs_snapshot=prefs_snapshot, time_elapsed=time_elapsed, db=db)
 
     # --- STEP 4: Still searching, return status ---
-    time_remaining = MATCHMAKING_TIMEOUT_SECONDS - time_elapsed
-    log.info(f"Still searching... {time_remaining:.1f}s remaining")
-    return {
-        "status": "searching",
-        "message": "Still searching for a match...",
-        "time_elapsed": int(time_elapsed),
-        "time_remaining": int(time_remaining),
-        "poll_again_in": MATCHMAKING_POLL_INTERVAL_SECONDS,
-    }
+    log.debug("Still searching, %.1fs remaining", timeout_seconds - time_elapsed)
+    return _searching_poll_result(time_elapsed, timeout_seconds)
     
 def _get_matchmaking_state(uid: str, db: Session) -> dict:
-    from controllers.session import _get_active_session
-
-    session = _get_active_session(uid=uid, db=db)
+    state = _matchmaking_snapshot(uid=uid, db=db)
     config = {
-        "timeout_seconds": MATCHMAKING_TIMEOUT_SECONDS,
+        # the timeout of the mode being searched, once queued
+        "timeout_seconds": state.get("timeout_seconds", MATCHMAKING_TIMEOUT_SECONDS),
         "poll_interval_seconds": MATCHMAKING_POLL_INTERVAL_SECONDS,
     }
 
-    if session:
-        if _user_in_queue(uid=uid, db=db):
-            _leave_queue(uid=uid, db=db)
-
-        session_dict = dict(session)
-
-        host_uid = str(session_dict.get("host_uid")) if session_dict.get("host_uid") else None
-        guest_uid = str(session_dict.get("guest_uid")) if session_dict.get("guest_uid") else None
-        current_uid = str(uid)
-
-        other_uid = None
-        if current_uid == host_uid:
-            other_uid = guest_uid
-        elif current_uid == guest_uid:
-            other_uid = host_uid
-
-        other_first_name = None
-        if other_uid:
-            row = db.execute(
-                text("SELECT first_name FROM users.users WHERE id = :id LIMIT 1"),
-                {"id": other_uid},
-            ).mappings().first()
-            if row:
-                other_first_name = row["first_name"]
-
-        session_dict["other_user_uid"] = other_uid
-        session_dict["other_user_first_name"] = other_first_name
+    if state["state"] == "in_session":
+        session_dict = dict(state["session"])
+        session_dict["other_user_uid"] = state["other_user_uid"]
+        session_dict["other_user_first_name"] = state["other_user_first_name"]
 
         return {
             "state": "in_session",
-            "role": "guest" if guest_uid == current_uid else "host",
+            "role": state["role"],
             "session": session_dict,
             "config": config,
         }
 
-    if _user_in_queue(uid=uid, db=db):
-        queue_entry = _get_queue(uid=uid, db=db)
-        enqueued_at = queue_entry["enqueued_at"]
-        time_elapsed = (datetime.utcnow() - enqueued_at).total_seconds()
-        time_remaining = max(0, MATCHMAKING_TIMEOUT_SECONDS - time_elapsed)
+    if state["state"] == "searching":
+        time_elapsed = (datetime.utcnow() - state["enqueued_at"]).total_seconds()
+        time_remaining = max(0, state["timeout_seconds"] - time_elapsed)
 
         return {
             "state": "searching",
@@ -1000,15 +1439,10 @@ def _get_matchmaking_state(uid: str, db: Session) -> dict:
 async def _notify_users_of_session_found(host_uid: str, session_id: str, guest_uid: str):
     log = logging.getLogger("matchmaking")
     
-    log.info(f"🔔 Notifying users of session found:")
-    log.info(f"   Session ID: {session_id}")
-    log.info(f"   Host UID: {host_uid}")
-    log.info(f"   Guest UID: {guest_uid}")
-    
     from services.sockets import user_sid_map, socket_manager
 
     if socket_manager is None:
-        log.warning("⚠ Socket manager is None, cannot send notifications")
+        log.warning("Socket manager is None, cannot notify session %s", session_id)
         return
 
     # Get both users' names
@@ -1029,9 +1463,6 @@ async def _notify_users_of_session_found(host_uid: str, session_id: str, guest_u
         
         host_first_name = host_name_row["first_name"] if host_name_row else None
         guest_first_name = guest_name_row["first_name"] if guest_name_row else None
-        
-        log.info(f"   Host name: {host_first_name}")
-        log.info(f"   Guest name: {guest_first_name}")
     finally:
         db.close()
 
@@ -1039,6 +1470,7 @@ async def _notify_users_of_session_found(host_uid: str, session_id: str, guest_u
         (host_uid, guest_uid, guest_first_name, "host"),  # Tell host about guest
         (guest_uid, host_uid, host_first_name, "guest"),   # Tell guest about host
     ]
+    notified = []
     
     for recipient_uid, partner_uid, partner_first_name, role in notifications:
         try:
@@ -1047,7 +1479,7 @@ async def _notify_users_of_session_found(host_uid: str, session_id: str, guest_u
             recipient_sid = user_sid_map.get(recipient_uid_str)
 
             if not recipient_sid:
-                log.warning(f"⚠ Recipient {recipient_uid_str} ({role}) not connected, skipping socket notification.")
+                log.warning("Recipient %s (%s) not connected, skipping socket notification.", recipient_uid_str, role)
                 continue
 
             payload = {
@@ -1058,243 +1490,242 @@ async def _notify_users_of_session_found(host_uid: str, session_id: str, guest_u
                 "message": "A match has been found!",
             }
 
+            # in the session room right away: _match_user's events go to the room, not to sids
+            await socket_manager.enter_room(recipient_sid, f"session:{session_id}")
             await socket_manager.emit(
                 "session_found",
                 payload,
                 room=recipient_sid,
             )
-            log.info(f"✅ Match notification sent to {recipient_uid_str} ({role}, SID={recipient_sid})")
-            log.info(f"   Partner: {partner_uid_str} (name: {partner_first_name})")
-            log.info(f"   Payload: {payload}")
+            notified.append(role)
+            log.debug("session_found payload for %s: %s", recipient_sid, payload)
 
         except Exception as e:
-            log.error(f"❌ Failed to send WebSocket notification to {recipient_uid_str}: {e}")
-
-async def _match_user(uid: str, db: Session):
-    log = logging.getLogger("matchmaking")
-    from controllers.session import _get_active_session
-    
-    session = _get_active_session(uid=uid, db=db)
-    if not session:
-        raise HTTPException(status_code=404, detail="User is not in an active session")
+            log.error("Failed to send WebSocket notification to %s: %s", recipient_uid_str, e)
 
-    session_dict = dict(session)
-    host_uid = str(session_dict.get("host_uid")) if session_dict.get("host_uid") else None
-    guest_uid = str(session_dict.get("guest_uid")) if session_dict.get("guest_uid") else None
-    current_uid = str(uid)
+    log.info("Session %s found: host=%s guest=%s, notified %s", session_id, host_uid, guest_uid, ",".join(notified) or "nobody")
 
-    if current_uid == host_uid:
-        other_uid = guest_uid
-    elif current_uid == guest_uid:
-        other_uid = host_uid
-    else:
-        raise HTTPException(status_code=400, detail="User is not part of this session")
-
-    if not other_uid:
-        raise HTTPException(status_code=400, detail="No partner in this session")
+# The open session of :uid and its partner (NULL other_uid while the host waits for a guest)
+_ACTIVE_PAIR_CTE = """
+    s AS (
+        SELECT id, CASE WHEN host_uid = CAST(:uid AS uuid) THEN guest_uid ELSE host_uid END AS other_uid
+        FROM sessions.sessions
+        WHERE (host_uid = CAST(:uid AS uuid) OR guest_uid = CAST(:uid AS uuid)) AND status = 'open'
+        LIMIT 1
+    )
+"""
+
+INTERACTION_COLUMNS = ("id", "kind", "from_uid", "to_uid", "session_id", "created_at")
+MUTUAL_CHAT_COLUMNS = ("id", "user_a_uid", "user_b_uid", "match_session_id", "last_message_at", "status", "created_at")
+SESSION_MESSAGE_COLUMNS = ("id", "session_id", "author_uid", "content", "is_system", "created_at")
+
+
+def _select_prefixed(alias: str, prefix: str, columns) -> str:
+    return ", ".join(f"{alias}.{column} AS {prefix}{column}" for column in columns)
+
+
+def _prefixed_columns(row, prefix: str, columns) -> Dict[str, Any]:
+    return {column: row[f"{prefix}{column}"] for column in columns}
+
+
+# _match_user in one round trip: record the interaction (idempotent thanks to
+# interactions_kind_from_to_session_uidx), look for the reciprocal one, post the system message and, on a
+# mutual match, create the pair's chat (chats_user_a_uid_user_b_uid_uidx, sorted pair). The data-modifying
+# CTEs all see the snapshot from before the statement, which is why the interaction / chat that already
+# existed are read next to the INSERTs' RETURNING. With no session / no partner nothing is written.
+MATCH_USER_SQL = f"""
+    WITH {_ACTIVE_PAIR_CTE},
+    pair AS (
+        SELECT id AS session_id, other_uid,
+               LEAST(CAST(:uid AS uuid), other_uid) AS user_a_uid,
+               GREATEST(CAST(:uid AS uuid), other_uid) AS user_b_uid
+        FROM s
+        WHERE other_uid IS NOT NULL
+    ),
+    new_interaction AS (
+        INSERT INTO sessions.interactions (kind, created_at, from_uid, to_uid, session_id)
+        SELECT 'match', NOW(), CAST(:uid AS uuid), other_uid, session_id FROM pair
+        ON CONFLICT (kind, from_uid, to_uid, session_id) DO NOTHING
+        RETURNING {", ".join(INTERACTION_COLUMNS)}
+    ),
+    interaction AS (
+        SELECT {", ".join(INTERACTION_COLUMNS)} FROM new_interaction
+        UNION ALL
+        SELECT {_select_prefixed("i", "", INTERACTION_COLUMNS)}
+        FROM sessions.interactions i
+        JOIN pair ON i.kind = 'match'
+                 AND i.from_uid = CAST(:uid AS uuid)
+                 AND i.to_uid = pair.other_uid
+                 AND i.session_id = pair.session_id
+    ),
+    reciprocal AS (
+        SELECT EXISTS (
+            SELECT 1
+            FROM sessions.interactions i
+            JOIN pair ON i.kind = 'match'
+                     AND i.from_uid = pair.other_uid
+                     AND i.to_uid = CAST(:uid AS uuid)
+                     AND i.session_id = pair.session_id
+        ) AS is_mutual
+    ),
+    message AS (
+        INSERT INTO sessions.chats (session_id, author_uid, content, is_system, created_at)
+        SELECT pair.session_id,
+               CAST(:uid AS uuid),
+               COALESCE((SELECT NULLIF(first_name, '') FROM users.users WHERE id = CAST(:uid AS uuid)), 'Someone')
+                   || ' is interested!',
+               true,
+               NOW()
+        FROM pair
+        RETURNING {", ".join(SESSION_MESSAGE_COLUMNS)}
+    ),
+    new_chat AS (
+        INSERT INTO users.chats (user_a_uid, user_b_uid, match_session_id, last_message_at, status)
+        SELECT pair.user_a_uid, pair.user_b_uid, pair.session_id, NOW(), 'active'
+        FROM pair, reciprocal
+        WHERE reciprocal.is_mutual
+        ON CONFLICT (user_a_uid, user_b_uid) DO NOTHING
+        RETURNING {", ".join(MUTUAL_CHAT_COLUMNS)}
+    ),
+    chat AS (
+        SELECT {", ".join(MUTUAL_CHAT_COLUMNS)} FROM new_chat
+        UNION ALL
+        SELECT {_select_prefixed("c", "", MUTUAL_CHAT_COLUMNS)}
+        FROM users.chats c
+        JOIN pair ON c.user_a_uid = pair.user_a_uid AND c.user_b_uid = pair.user_b_uid
+        JOIN reciprocal ON reciprocal.is_mutual
+    )
+    SELECT s.id AS session_id,
+           s.other_uid,
+           reciprocal.is_mutual,
+           EXISTS (SELECT 1 FROM new_chat) AS chat_created,
+           {_select_prefixed("i", "interaction_", INTERACTION_COLUMNS)},
+           {_select_prefixed("m", "message_", SESSION_MESSAGE_COLUMNS)},
+           {_select_prefixed("c", "chat_", MUTUAL_CHAT_COLUMNS)}
+    FROM (SELECT 1) one
+    LEFT JOIN s ON true
+    LEFT JOIN (SELECT * FROM interaction LIMIT 1) i ON true
+    LEFT JOIN message m ON true
+    LEFT JOIN (SELECT * FROM chat LIMIT 1) c ON true
+    CROSS JOIN reciprocal
+"""
+
+# _get_match_status: the open session, its partner and both directions of the 'match' interaction
+MATCH_STATUS_SQL = f"""
+    WITH {_ACTIVE_PAIR_CTE}
+    SELECT s.id AS session_id,
+           s.other_uid,
+           EXISTS (
+               SELECT 1 FROM sessions.interactions i
+               WHERE i.kind = 'match' AND i.from_uid = CAST(:uid AS uuid) AND i.to_uid = s.other_uid AND i.session_id = s.id
+           ) AS you_matched,
+           EXISTS (
+               SELECT 1 FROM sessions.interactions i
+               WHERE i.kind = 'match' AND i.from_uid = s.other_uid AND i.to_uid = CAST(:uid AS uuid) AND i.session_id = s.id
+           ) AS they_matched
+    FROM s
+"""
+
+
+async def _emit_match_events(
+    session_id: str,
+    uid: str,
+    other_uid: str,
+    msg_payload: dict,
+    message: str,
+    is_mutual: bool,
+    chat_id: Optional[str],
+):
+    """
+    Socket side of _match_user, after its writes are committed. The system message and the interaction concern
+    the session, so they go once to its room (both participants joined it, see join_session). mutual_match differs
+    per user (partner_uid), it goes to each 'user:{uid}' room; the emits run concurrently.
+    """
+    log = logging.getLogger("matchmaking")
+    from services.sockets import socket_manager
 
-    session_id = session_dict["id"]
-
-    # Check if interaction already exists
-    existing = db.execute(
-        text(
-            """
-            SELECT *
-            FROM sessions.interactions
-            WHERE kind = 'match'
-              AND from_uid = :from_uid
-              AND to_uid = :to_uid
-              AND session_id = :session_id
-            LIMIT 1
-            """
-        ),
-        {
-            "from_uid": uid,
-            "to_uid": other_uid,
-            "session_id": session_id,
-        },
-    ).mappings().first()
+    if socket_manager is None:
+        return
 
-    if existing:
-        interaction_row = existing
-    else:
-        interaction_row = db.execute(
-            text(
-                """
-                INSERT INTO sessions.interactions (kind, created_at, from_uid, to_uid, session_id)
-                VALUES ('match', NOW(), :from_uid, :to_uid, :session_id)
-                RETURNING *
-                """
-            ),
+    session_room = f"session:{session_id}"
+    emits = [
+        ("chat_received", msg_payload, session_room),
+        (
+            "match_interaction",
             {
                 "from_uid": uid,
                 "to_uid": other_uid,
                 "session_id": session_id,
+                "is_mutual": is_mutual,
+                "message": message,
             },
-        ).mappings().first()
-
-    # Check if the other user has also matched (reciprocal)
-    reciprocal = db.execute(
-        text(
-            """
-            SELECT 1
-            FROM sessions.interactions
-            WHERE kind = 'match'
-              AND from_uid = :other_uid
-              AND to_uid = :from_uid
-              AND session_id = :session_id
-            LIMIT 1
-            """
+            session_room,
         ),
-        {
-            "from_uid": uid,
-            "other_uid": other_uid,
-            "session_id": session_id,
-        },
-    ).mappings().first()
+    ]
+    if is_mutual:
+        for target_uid, partner_uid in ((uid, other_uid), (other_uid, uid)):
+            emits.append((
+                "mutual_match",
+                {
+                    "session_id": session_id,
+                    "chat_id": chat_id,
+                    "partner_uid": partner_uid,
+                    "message": "It's a mutual match!",
+                },
+                f"user:{target_uid}",
+            ))
+
+    results = await asyncio.gather(
+        *(socket_manager.emit(event, payload, room=room) for event, payload, room in emits),
+        return_exceptions=True,
+    )
+    for (event, _, room), result in zip(emits, results):
+        if isinstance(result, Exception):
+            log.error("Failed to emit %s to %s: %s", event, room, result)
+        else:
+            log.info("%s sent to %s for session %s.", event, room, session_id)
 
-    is_mutual = reciprocal is not None
+async def _match_user(uid: str, db: Session):
+    log = logging.getLogger("matchmaking")
 
-    # Get user's display name
-    user_row = db.execute(
-        text("SELECT first_name FROM users.users WHERE id = :id LIMIT 1"),
-        {"id": uid},
-    ).mappings().first()
+    row = db.execute(text(MATCH_USER_SQL), {"uid": uid}).mappings().first()
+    if row["session_id"] is None:
+        raise HTTPException(status_code=404, detail="User is not in an active session")
+    if row["other_uid"] is None:
+        raise HTTPException(status_code=400, detail="No partner in this session")
 
-    display_name = user_row["first_name"] if user_row and user_row["first_name"] else "Someone"
-    content = f"{display_name} is interested!"
-
-    # Create system message in session chat
-    session_message_row = db.execute(
-        text(
-            """
-            INSERT INTO sessions.chats (
-                session_id,
-                author_uid,
-                content,
-                is_system,
-                created_at
-            )
-            VALUES (:session_id, :author_uid, :content, true, NOW())
-            RETURNING id, session_id, author_uid, content, is_system, created_at
-            """
-        ),
-        {
-            "session_id": session_id,
-            "author_uid": uid,
-            "content": content,
-        },
-    ).mappings().first()
+    session_id = row["session_id"]
+    other_uid = row["other_uid"]
+    is_mutual = bool(row["is_mutual"])
+    interaction_row = _prefixed_columns(row, "interaction_", INTERACTION_COLUMNS)
+    mutual_chat_row = _prefixed_columns(row, "chat_", MUTUAL_CHAT_COLUMNS) if row["chat_id"] is not None else None
+    content = row["message_content"]
+
+    if row["chat_created"]:
+        a, b = sorted([str(uid), str(other_uid)])
+        log.info("Created mutual chat between %s and %s.", a, b)
+        _record_matched_pair(a, b)
 
     msg_payload = {
-        "id": str(session_message_row["id"]),
-        "session_id": str(session_message_row["session_id"]),
-        "author_uid": str(session_message_row["author_uid"]),
-        "content": session_message_row["content"],
-        "created_at": session_message_row["created_at"].isoformat() + "Z",
-        "system": bool(session_message_row["is_system"]),
+        "id": str(row["message_id"]),
+        "session_id": str(row["message_session_id"]),
+        "author_uid": str(row["message_author_uid"]),
+        "content": content,
+        "created_at": row["message_created_at"].isoformat() + "Z",
+        "system": bool(row["message_is_system"]),
     }
 
-    # Send WebSocket notifications to both users
-    from services.sockets import user_sid_map, socket_manager
-    
-    if socket_manager is not None:
-        notifications = [
-            (uid, other_uid),
-            (other_uid, uid)
-        ]
-        
-        for recipient_uid, from_uid in notifications:
-            try:
-                recipient_uid_str = str(recipient_uid)
-                from_uid_str = str(from_uid)
-                recipient_sid = user_sid_map.get(recipient_uid_str)
-
-                if not recipient_sid:
-                    log.info(f"User {recipient_uid_str} not connected, skipping match notification.")
-                    continue
-
-                await socket_manager.emit(
-                    "chat_received",
-                    msg_payload,
-                    room=recipient_sid,
-                )
-                log.info(f"Match chat notification sent to {recipient_uid_str} for session {session_id}.")
-
-                await socket_manager.emit(
-                    "match_interaction",
-                    {
-                        "from_uid": from_uid_str,
-                        "to_uid": recipient_uid_str,
-                        "session_id": str(session_id),
-                        "is_mutual": is_mutual,
-                        "message": f"{display_name} is interested!",
-                    },
-                    room=recipient_sid,
-                )
-                log.info(f"Match interaction event sent to {recipient_uid_str}.")
-
-            except Exception as e:
-                log.error(f"Failed to send WebSocket notification to {recipient_uid_str}: {e}")
-
-    # If mutual, create chat entry
-    mutual_chat_row = None
-    if is_mutual:
-        a, b = sorted([str(uid), str(other_uid)])
-        existing_chat = db.execute(
-            text(
-                """
-                SELECT *
-                FROM users.chats
-                WHERE user_a_uid = :a
-                  AND user_b_uid = :b
-                LIMIT 1
-                """
-            ),
-            {"a": a, "b": b},
-        ).mappings().first()
-
-        if not existing_chat:
-            mutual_chat_row = db.execute(
-                text(
-                    """
-                    INSERT INTO users.chats (
-                        user_a_uid,
-                        user_b_uid,
-                        match_session_id,
-                        last_message_at,
-                        status
-                    )
-                    VALUES (:a, :b, :session_id, NOW(), 'active')
-                    RETURNING *
-                    """
-                ),
-                {"a": a, "b": b, "session_id": session_id},
-            ).mappings().first()
-            log.info(f"Created mutual chat between {a} and {b}.")
-        else:
-            mutual_chat_row = existing_chat
-            log.info(f"Mutual chat already exists between {a} and {b}.")
-            
-        # Notify both users of mutual match
-        if socket_manager is not None:
-            for target_uid in (str(uid), str(other_uid)):
-                try:
-                    target_sid = user_sid_map.get(target_uid)
-                    if target_sid:
-                        await socket_manager.emit(
-                            "mutual_match",
-                            {
-                                "session_id": str(session_id),
-                                "chat_id": str(mutual_chat_row["id"]) if mutual_chat_row else None,
-                                "partner_uid": str(other_uid) if target_uid == str(uid) else str(uid),
-                                "message": "It's a mutual match!",
-                            },
-                            room=target_sid,
-                        )
-                        log.info(f"Mutual match notification sent to {target_uid}.")
-                except Exception as e:
-                    log.error(f"Failed to send mutual match notification to {target_uid}: {e}")
+    # Commit before anyone is told: a client reacting to the events must find the rows
+    db.commit()
+    await _emit_match_events(
+        session_id=str(session_id),
+        uid=str(uid),
+        other_uid=str(other_uid),
+        msg_payload=msg_payload,
+        message=content,
+        is_mutual=is_mutual,
+        chat_id=str(mutual_chat_row["id"]) if mutual_chat_row else None,
+    )
 
     return {
         "message": "Match recorded",
@@ -1311,81 +1742,24 @@ def _get_match_status(uid: str, db: Session):
     """
     Get the match status for the current user in their active session.
     """
-    from controllers.session import _get_active_session
-    
-    session = _get_active_session(uid=uid, db=db)
-    if not session:
+    row = db.execute(text(MATCH_STATUS_SQL), {"uid": uid}).mappings().first()
+    if not row:
         raise HTTPException(status_code=404, detail="User is not in an active session")
 
-    session_dict = dict(session)
-    host_uid = str(session_dict.get("host_uid")) if session_dict.get("host_uid") else None
-    guest_uid = str(session_dict.get("guest_uid")) if session_dict.get("guest_uid") else None
-    current_uid = str(uid)
-
-    if current_uid == host_uid:
-        other_uid = guest_uid
-    elif current_uid == guest_uid:
-        other_uid = host_uid
-    else:
-        raise HTTPException(status_code=400, detail="User is not part of this session")
-
-    if not other_uid:
+    if row["other_uid"] is None:
         return {
             "you_matched": False,
             "they_matched": False,
             "is_mutual": False,
         }
 
-    session_id = session_dict["id"]
-
-    you_matched = db.execute(
-        text(
-            """
-            SELECT EXISTS(
-                SELECT 1
-                FROM sessions.interactions
-                WHERE kind = 'match'
-                  AND from_uid = :from_uid
-                  AND to_uid = :to_uid
-                  AND session_id = :session_id
-            ) as matched
-            """
-        ),
-        {
-            "from_uid": uid,
-            "to_uid": other_uid,
-            "session_id": session_id,
-        },
-    ).mappings().first()
-
-    they_matched = db.execute(
-        text(
-            """
-            SELECT EXISTS(
-                SELECT 1
-                FROM sessions.interactions
-                WHERE kind = 'match'
-                  AND from_uid = :from_uid
-                  AND to_uid = :to_uid
-                  AND session_id = :session_id
-            ) as matched
-            """
-        ),
-        {
-            "from_uid": other_uid,
-            "to_uid": uid,
-            "session_id": session_id,
-        },
-    ).mappings().first()
-
-    you_matched_bool = you_matched["matched"] if you_matched else False
-    they_matched_bool = they_matched["matched"] if they_matched else False
-    is_mutual = you_matched_bool and they_matched_bool
+    you_matched = bool(row["you_matched"])
+    they_matched = bool(row["they_matched"])
 
     return {
-        "you_matched": you_matched_bool,
-        "they_matched": they_matched_bool,
-        "is_mutual": is_mutual,
-        "session_id": str(session_id),
-        "other_uid": str(other_uid),
+        "you_matched": you_matched,
+        "they_matched": they_matched,
+        "is_mutual": you_matched and they_matched,
+        "session_id": str(row["session_id"]),
+        "other_uid": str(row["other_uid"]),
     }
\ No newline at end of file
@@ -3,16 +3,18 @@ from sqlalchemy import text
 from fastapi import HTTPException
 
 from controllers.profile import _profile_exists
+from services.cache import versions
+from services import lookups
 
 def _orientation_name_to_id(name: str, db: Session):
-    id = db.execute(text("SELECT id FROM public.orientations WHERE name = :name LIMIT 1"), {"name": name}).scalar()
+    id = lookups.name_to_id("orientations", name, db)
     if id:
         return id
     else:
         raise HTTPException(status_code=400, detail=f"Orientation '{name}' is not registered in the database!")
 
 def _orientation_id_to_name(id: str, db: Session):
-    name = db.execute(text("SELECT name FROM public.orientations WHERE id = :id LIMIT 1"), {"id": id}).scalar()
+    name = lookups.id_to_name("orientations", id, db)
     if name:
         return name
     else:
@@ -43,4 +45,5 @@ def _update_profile_orientation(orientation_id: str, uid: str, db: Session):
     """)
 
     db.execute(stmt, {"orientation_id": orientation_id, "uid": uid})
+    versions.bump("profile", uid, db=db)
     return {"ok": True}
@@ -7,6 +7,10 @@ from schemas.preferences import UserProfilePreferencesSchema
 from controllers.user import _user_exists
 from controllers.profile_options import _name_to_id, _id_to_name
 from json import dumps
+from services.cache import versions
+import logging
+
+log = logging.getLogger("preferences")
 
 
 def _to_list(value):
@@ -99,6 +103,7 @@ def _create_user_prefs(payload: UserProfilePreferencesSchema, uid: str, db: Sess
         "extra_options": dumps(extra_options) if extra_options else None
     })
     
+    versions.bump("prefs", uid, db=db)
     return {"ok": True}
 
 
@@ -114,14 +119,11 @@ def _update_user_prefs(payload: UserProfilePreferencesSchema, uid: str, db: Sess
 
     extra_options = payload_dict.get("extra_options")
 
-    print(f"\n{'='*80}")
-    print(f"DEBUG: Updating preferences for uid={uid}")
-    print(f"DEBUG: target_gender={target_gender_name} → {target_gender_id}")
-    print(f"DEBUG: age_min={payload_dict.get('age_min')}")
-    print(f"DEBUG: age_max={payload_dict.get('age_max')}")
-    print(f"DEBUG: max_distance={payload_dict.get('max_distance')}")
-    print(f"DEBUG: extra_options={extra_options}")
-    print(f"{'='*80}\n")
+    log.debug(
+        "Updating preferences for uid=%s: target_gender=%s (%s), age_min=%s, age_max=%s, max_distance=%s, extra_options=%s",
+        uid, target_gender_name, target_gender_id, payload_dict.get("age_min"), payload_dict.get("age_max"),
+        payload_dict.get("max_distance"), extra_options,
+    )
 
     stmt = text("""
         UPDATE users.preferences
@@ -148,15 +150,12 @@ def _update_user_prefs(payload: UserProfilePreferencesSchema, uid: str, db: Sess
             },
         )
         
-        print(f"DEBUG: UPDATE executed, rowcount={result.rowcount}")
-        
         if result.rowcount == 0:
-            print(f"WARNING: No rows updated for uid={uid}")
-        else:
-            print(f"Preferences updated successfully!")
+            log.warning("No preference rows updated for uid=%s", uid)
             
-    except Exception as e:
-        print(f"ERROR updating preferences: {e}")
+    except Exception:
+        log.exception("Error updating preferences for uid=%s", uid)
         raise
 
+    versions.bump("prefs", uid, db=db)
     return {"ok": True}
\ No newline at end of file
@@ -3,8 +3,111 @@ from sqlalchemy import text
 from fastapi import HTTPException
 from sqlalchemy.exc import SQLAlchemyError
 from typing import Dict, Any, List, Optional
+import json
 from controllers.user import _user_exists
 from schemas.profile import UserProfileSchema
+from services.cache import versions
+from services import lookups
+
+# profiles.profiles FK column -> public lookup table it points at ('gender_id' is exposed as 'gender', ...)
+PROFILE_FK_LOOKUPS = {
+    "gender_id": "genders",
+    "orientation_id": "orientations",
+    "pronoun_id": "pronouns",
+    "relationship_goal_id": "relationship_goals",
+    "personality_type_id": "personality_types",
+    "love_language_id": "love_languages",
+    "attachment_style_id": "attachment_styles",
+    "political_view_id": "political_views",
+    "zodiac_sign_id": "zodiac_signs",
+    "religion_id": "religions",
+    "diet_id": "diets",
+    "exercise_frequency_id": "exercise_frequencies",
+    "smoke_frequency_id": "smoke_frequencies",
+    "drink_frequency_id": "drink_frequencies",
+    "sleep_schedule_id": "sleep_schedules",
+}
+
+# Age in whole years as of today (UTC), computed by Postgres when the profile is read: a stored column
+# could not stay correct (generated columns cannot depend on the current date)
+PROFILE_AGE_SQL = "EXTRACT(YEAR FROM age(timezone('utc', now())::date, u.birthdate))::int AS age"
+
+# profiles.<junction table> -> (FK column, public lookup table)
+PROFILE_JUNCTION_LOOKUPS = {
+    "interests": ("interest_id", "interests"),
+    "pets": ("pet_id", "pets"),
+    "languages_spoken": ("language_id", "languages"),
+}
+
+# UserProfileSchema field holding the option name of an FK column, where it is not the column minus '_id'
+PROFILE_FK_PAYLOAD_KEYS = {
+    "pronoun_id": "pronouns",
+}
+
+# profiles.profiles columns written as-is from the payload -> SQL type (the upsert casts every parameter)
+PROFILE_VALUE_COLUMNS = {
+    "bio": "text",
+    "drug_use": "text",
+    "weed_use": "text",
+    "location": "text",
+    "lat": "double precision",
+    "lng": "double precision",
+    "location_label": "text",
+    "show_precise_location": "boolean",
+    "school": "text",
+    "occupation": "text",
+}
+
+
+def _parse_location(location_text: str) -> Optional[tuple[float, float]]:
+    """
+    Parse location text to extract latitude and longitude.
+    
+    Supports formats:
+    - JSON string: '{"lat": 40.7128, "lng": -74.0060}'
+    - Comma-separated: '40.7128,-74.0060'
+    - Dict (if already parsed): {'lat': 40.7128, 'lng': -74.0060}
+    
+    Returns tuple of (latitude, longitude) or None if parsing fails.
+    """
+    if not location_text:
+        return None
+    
+    try:
+        # If it's a string, try to parse as JSON first
+        if isinstance(location_text, str):
+            # Try JSON format
+            if location_text.strip().startswith('{'):
+                loc_dict = json.loads(location_text)
+                lat = loc_dict.get('lat') or loc_dict.get('latitude')
+                lng = loc_dict.get('lng') or loc_dict.get('longitude') or loc_dict.get('lon')
+                if lat is not None and lng is not None:
+                    return (float(lat), float(lng))
+            
+            # Try comma-separated format
+            if ',' in location_text:
+                parts = location_text.split(',')
+                if len(parts) == 2:
+                    return (float(parts[0].strip()), float(parts[1].strip()))
+        
+        # If it's already a dict
+        elif isinstance(location_text, dict):
+            lat = location_text.get('lat') or location_text.get('latitude')
+            lng = location_text.get('lng') or location_text.get('longitude') or location_text.get('lon')
+            if lat is not None and lng is not None:
+                return (float(lat), float(lng))
+    
+    except (ValueError, json.JSONDecodeError, KeyError, AttributeError):
+        return None
+    
+    return None
+
+
+def _location_columns(location) -> Dict[str, Optional[float]]:
+    """Typed lat / lng written next to the location text, so readers never have to parse it."""
+    coords = _parse_location(location)
+    return {"lat": coords[0], "lng": coords[1]} if coords else {"lat": None, "lng": None}
+
 
 def _profile_exists(uid: str, db: Session) -> bool:
     if not _user_exists(uid=uid, db=db):
@@ -23,10 +126,7 @@ def _name_to_id(name: str, table_name: str, db: Session) -> str:
     if not name:
         return None
         
-    id_result = db.execute(
-        text(f"SELECT id FROM public.{table_name} WHERE name = :name LIMIT 1"), 
-        {"name": name}
-    ).scalar()
+    id_result = lookups.name_to_id(table_name, name, db)
     
     if id_result:
         return id_result
@@ -42,46 +142,54 @@ def _id_to_name(id: str, table_name: str, db: Session) -> Optional[str]:
     if not id:
         return None
         
-    name = db.execute(
-        text(f"SELECT name FROM public.{table_name} WHERE id = :id LIMIT 1"), 
-        {"id": id}
-    ).scalar()
-    
-    return name
+    return lookups.id_to_name(table_name, id, db)
 
 
 def _names_to_ids(names: List[str], table_name: str, db: Session) -> List[str]:
-    """Convert a list of names to IDs."""
+    """Convert a list of names to IDs (unknown names are skipped)."""
     if not names:
         return []
     
-    placeholders = ', '.join([f':name_{i}' for i in range(len(names))])
-    query = text(f"SELECT id FROM public.{table_name} WHERE name IN ({placeholders})")
-    params = {f'name_{i}': val for i, val in enumerate(names)}
-    
-    return list(db.execute(query, params).scalars().all())
+    return list(lookups.names_to_ids(table_name, names, db).values())
 
 
-def _update_junction_table(uid: str, table_name: str, fk_column: str, values: List[str], lookup_table: str, db: Session):
-    """Update a junction table (delete old, insert new)."""
-    # Delete existing
-    db.execute(
-        text(f"DELETE FROM profiles.{table_name} WHERE uid = :uid"),
-        {"uid": uid}
-    )
-    
-    if not values:
-        return
-    
-    # Convert names to IDs
-    ids = _names_to_ids(values, lookup_table, db)
-    
-    # Insert new
-    for id_val in ids:
-        db.execute(
-            text(f"INSERT INTO profiles.{table_name} (uid, {fk_column}) VALUES (:uid, :id)"),
-            {"uid": uid, "id": id_val}
-        )
+def _write_junction_ids(uid: str, table_name: str, fk_column: str, ids: List[Any], db: Session) -> bool:
+    """
+    Make profiles.<table_name> hold exactly these ids for the user, touching only the rows that change:
+    one DELETE of the rows no longer wanted and one INSERT of the missing ones, whatever the number of values.
+    ON CONFLICT relies on the unique (uid, fk) indexes of migration 0004 (concurrent saves of the same value).
+    Returns whether any row changed.
+    """
+    params = {"uid": str(uid), "ids": sorted({str(id_val) for id_val in ids})}
+    deleted = db.execute(
+        text(f"""
+            DELETE FROM profiles.{table_name}
+            WHERE uid = :uid
+              AND {fk_column} <> ALL(CAST(:ids AS uuid[]))
+        """),
+        params,
+    ).rowcount
+    if not params["ids"]:
+        return deleted > 0
+    inserted = db.execute(
+        text(f"""
+            INSERT INTO profiles.{table_name} (uid, {fk_column})
+            SELECT CAST(:uid AS uuid), wanted.id
+            FROM unnest(CAST(:ids AS uuid[])) AS wanted(id)
+            WHERE NOT EXISTS (
+                SELECT 1 FROM profiles.{table_name} j
+                WHERE j.uid = CAST(:uid AS uuid) AND j.{fk_column} = wanted.id
+            )
+            ON CONFLICT DO NOTHING
+        """),
+        params,
+    ).rowcount
+    return deleted > 0 or inserted > 0
+
+
+def _update_junction_table(uid: str, table_name: str, fk_column: str, values: List[str], lookup_table: str, db: Session) -> bool:
+    """Update a junction table to hold exactly these option names (diff-based, see _write_junction_ids)."""
+    return _write_junction_ids(uid, table_name, fk_column, _names_to_ids(values, lookup_table, db), db)
 
 
 def _get_junction_values(uid: str, table_name: str, fk_column: str, lookup_table: str, db: Session) -> List[str]:
@@ -95,11 +203,7 @@ def _get_junction_values(uid: str, table_name: str, fk_column: str, lookup_table
         return []
     
     # Convert IDs to names
-    names = []
-    for row in rows:
-        name = _id_to_name(row[0], lookup_table, db)
-        if name:
-            names.append(name)
+    names = lookups.ids_to_names(lookup_table, [row[0] for row in rows], db)
     
     return names
 
@@ -110,10 +214,11 @@ def _get_profile(uid: str, db: Session) -> Dict[str, Any]:
     Also loads junction table data (interests, pets, languages_spoken).
     """
     
-    stmt = text("""
+    stmt = text(f"""
         SELECT 
             p.*,
-            u.birthdate
+            u.birthdate,
+            {PROFILE_AGE_SQL}
         FROM profiles.profiles p
         JOIN users.users u
           ON u.id = p.uid
@@ -129,25 +234,7 @@ def _get_profile(uid: str, db: Session) -> Dict[str, Any]:
     profile = dict(profile_result)
 
     # Convert all FK IDs to names
-    fk_mappings = {
-        "gender_id": "genders",
-        "orientation_id": "orientations",
-        "pronoun_id": "pronouns",
-        "relationship_goal_id": "relationship_goals",
-        "personality_type_id": "personality_types",
-        "love_language_id": "love_languages",
-        "attachment_style_id": "attachment_styles",
-        "political_view_id": "political_views",
-        "zodiac_sign_id": "zodiac_signs",
-        "religion_id": "religions",
-        "diet_id": "diets",
-        "exercise_frequency_id": "exercise_frequencies",
-        "smoke_frequency_id": "smoke_frequencies",
-        "drink_frequency_id": "drink_frequencies",
-        "sleep_schedule_id": "sleep_schedules",
-    }
-    
-    for fk_field, lookup_table in fk_mappings.items():
+    for fk_field, lookup_table in PROFILE_FK_LOOKUPS.items():
         fk_id = profile.get(fk_field)
         field_name = fk_field.replace('_id', '')
         if fk_id:
@@ -156,99 +243,165 @@ def _get_profile(uid: str, db: Session) -> Dict[str, Any]:
             profile[field_name] = None
     
     # Load junction table data
-    profile["interests"] = _get_junction_values(uid, "interests", "interest_id", "interests", db)
-    profile["pets"] = _get_junction_values(uid, "pets", "pet_id", "pets", db)
-    profile["languages_spoken"] = _get_junction_values(uid, "languages_spoken", "language_id", "languages", db)
+    for table_name, (fk_column, lookup_table) in PROFILE_JUNCTION_LOOKUPS.items():
+        profile[table_name] = _get_junction_values(uid, table_name, fk_column, lookup_table, db)
     
     return profile
 
 
+def _get_profiles(uids: List[str], db: Session) -> Dict[str, Dict[str, Any]]:
+    """
+    Batch version of _get_profile for the matchmaking candidate loops: same dict per profile, keyed by uid,
+    in 1 + len(PROFILE_JUNCTION_LOOKUPS) queries instead of ~19 per profile. Missing profiles are left out.
+    """
+    if not uids:
+        return {}
+
+    names = ",\n            ".join(
+        f"{fk_field[:-3]}_lookup.name AS {fk_field[:-3]}" for fk_field in PROFILE_FK_LOOKUPS
+    )
+    joins = "\n        ".join(
+        f"LEFT JOIN public.{lookup_table} {fk_field[:-3]}_lookup ON {fk_field[:-3]}_lookup.id = p.{fk_field}"
+        for fk_field, lookup_table in PROFILE_FK_LOOKUPS.items()
+    )
+    stmt = text(f"""
+        SELECT
+            p.*,
+            u.birthdate,
+            {PROFILE_AGE_SQL},
+            {names}
+        FROM profiles.profiles p
+        JOIN users.users u
+          ON u.id = p.uid
+        {joins}
+        WHERE p.uid = ANY(CAST(:uids AS uuid[]))
+    """)
+    uid_list = [str(uid) for uid in uids]
+
+    profiles = {}
+    for row in db.execute(stmt, {"uids": uid_list}).mappings():
+        profile = dict(row)
+        for table_name in PROFILE_JUNCTION_LOOKUPS:
+            profile[table_name] = []
+        profiles[str(row["uid"])] = profile
+
+    for table_name, (fk_column, lookup_table) in PROFILE_JUNCTION_LOOKUPS.items():
+        rows = db.execute(
+            text(f"""
+                SELECT j.uid, l.name
+                FROM profiles.{table_name} j
+                JOIN public.{lookup_table} l ON l.id = j.{fk_column}
+                WHERE j.uid = ANY(CAST(:uids AS uuid[]))
+            """),
+            {"uids": uid_list},
+        ).fetchall()
+        for uid, name in rows:
+            profile = profiles.get(str(uid))
+            if profile is not None:
+                profile[table_name].append(name)
+
+    return profiles
+
+
+def _fk_payload_key(fk_field: str) -> str:
+    return PROFILE_FK_PAYLOAD_KEYS.get(fk_field, fk_field[:-3])
+
+
+def _profile_row_params(uid: str, payload: Dict[str, Any], db: Session) -> Dict[str, Any]:
+    """
+    Parameters of _upsert_profile: every profiles.profiles column plus the junction id arrays.
+    Option names become ids through the in-memory lookup registry (no query once the tables are loaded),
+    an unknown single option is a 400 (_name_to_id), unknown list values are skipped (_names_to_ids).
+    """
+    params = {column: payload.get(column) for column in PROFILE_VALUE_COLUMNS}
+    params.update(_location_columns(payload.get("location")))
+    for fk_field, lookup_table in PROFILE_FK_LOOKUPS.items():
+        name = payload.get(_fk_payload_key(fk_field))
+        params[fk_field] = str(_name_to_id(name, lookup_table, db)) if name else None
+    for table_name, (_, lookup_table) in PROFILE_JUNCTION_LOOKUPS.items():
+        params[f"{table_name}_ids"] = sorted({str(id_val) for id_val in _names_to_ids(payload.get(table_name) or [], lookup_table, db)})
+    params["uid"] = str(uid)
+    return params
+
+
+def _upsert_profile_sql(overwrite: bool) -> str:
+    """
+    One statement for the whole save: the profile row (INSERT ... ON CONFLICT (uid)) and, as data-modifying
+    CTEs of the same statement, the diff of each junction table (see _write_junction_ids).
+
+    - 'account' makes a missing user an empty insert instead of an FK error, the caller answers 404
+    - overwrite=False is the POST path: ON CONFLICT DO NOTHING, an existing profile writes nothing (409)
+    - junction rows are only inserted when the profile row was written, and only deleted when it already
+      existed ('inserted' is xmax = 0), so creating a profile never drops values saved before it existed
+    """
+    columns = list(PROFILE_VALUE_COLUMNS) + list(PROFILE_FK_LOOKUPS)
+    types = {**PROFILE_VALUE_COLUMNS, **{fk_field: "uuid" for fk_field in PROFILE_FK_LOOKUPS}}
+    values = ", ".join(f"CAST(:{column} AS {types[column]})" for column in columns)
+    if overwrite:
+        assignments = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns)
+        on_conflict = f"DO UPDATE SET {assignments}, updated_at = now()"
+    else:
+        on_conflict = "DO NOTHING"
+
+    junctions = "".join(f"""
+        , {table_name}_deleted AS (
+            DELETE FROM profiles.{table_name}
+            WHERE uid = CAST(:uid AS uuid)
+              AND EXISTS (SELECT 1 FROM saved WHERE NOT saved.inserted)
+              AND {fk_column} <> ALL(CAST(:{table_name}_ids AS uuid[]))
+        )
+        , {table_name}_inserted AS (
+            INSERT INTO profiles.{table_name} (uid, {fk_column})
+            SELECT CAST(:uid AS uuid), wanted.id
+            FROM unnest(CAST(:{table_name}_ids AS uuid[])) AS wanted(id)
+            WHERE EXISTS (SELECT 1 FROM saved)
+              AND NOT EXISTS (
+                  SELECT 1 FROM profiles.{table_name} j
+                  WHERE j.uid = CAST(:uid AS uuid) AND j.{fk_column} = wanted.id
+              )
+            ON CONFLICT DO NOTHING
+        )"""
+        for table_name, (fk_column, _) in PROFILE_JUNCTION_LOOKUPS.items()
+    )
+
+    return f"""
+        WITH account AS (
+            SELECT id FROM users.users WHERE id = CAST(:uid AS uuid)
+        )
+        , saved AS (
+            INSERT INTO profiles.profiles (uid, {", ".join(columns)})
+            SELECT account.id, {values}
+            FROM account
+            ON CONFLICT (uid) {on_conflict}
+            RETURNING (xmax = 0) AS inserted
+        ){junctions}
+        SELECT
+            EXISTS (SELECT 1 FROM account) AS user_exists,
+            (SELECT inserted FROM saved) AS inserted
+    """
+
+
+def _upsert_profile(uid: str, payload: Dict[str, Any], db: Session, overwrite: bool) -> bool:
+    """Write the whole profile (row + junction tables) in one round trip, returns True when it was created."""
+    params = _profile_row_params(uid, payload, db)
+    result = db.execute(text(_upsert_profile_sql(overwrite)), params).one()
+
+    if not result.user_exists:
+        raise HTTPException(status_code=404, detail=f"User with id '{uid}' does not exist!")
+    if result.inserted is None:
+        raise HTTPException(status_code=409, detail=f"Profile for user with uid '{uid}' is already created! Use 'PUT' to update it.")
+
+    versions.bump("profile", uid, db=db)
+    return result.inserted
+
+
 def _create_profile(uid: str, payload: Dict[str, Any], db: Session) -> Dict[str, Any]:
     """
     Inserts a new profile record for the user.
     Converts all enum names to FK IDs.
     """
-    if _profile_exists(uid=uid, db=db): 
-        raise HTTPException(status_code=409, detail=f"Profile for user with uid '{uid}' is already created! Use 'PUT' to update it.")
-
     try:
-        # Convert names to IDs for FK fields
-        gender_id = _name_to_id(payload.get("gender"), "genders", db) if payload.get("gender") else None
-        orientation_id = _name_to_id(payload.get("orientation"), "orientations", db) if payload.get("orientation") else None
-        pronoun_id = _name_to_id(payload.get("pronouns"), "pronouns", db) if payload.get("pronouns") else None
-        relationship_goal_id = _name_to_id(payload.get("relationship_goal"), "relationship_goals", db) if payload.get("relationship_goal") else None
-        personality_type_id = _name_to_id(payload.get("personality_type"), "personality_types", db) if payload.get("personality_type") else None
-        love_language_id = _name_to_id(payload.get("love_language"), "love_languages", db) if payload.get("love_language") else None
-        attachment_style_id = _name_to_id(payload.get("attachment_style"), "attachment_styles", db) if payload.get("attachment_style") else None
-        political_view_id = _name_to_id(payload.get("political_view"), "political_views", db) if payload.get("political_view") else None
-        zodiac_sign_id = _name_to_id(payload.get("zodiac_sign"), "zodiac_signs", db) if payload.get("zodiac_sign") else None
-        religion_id = _name_to_id(payload.get("religion"), "religions", db) if payload.get("religion") else None
-        diet_id = _name_to_id(payload.get("diet"), "diets", db) if payload.get("diet") else None
-        exercise_frequency_id = _name_to_id(payload.get("exercise_frequency"), "exercise_frequencies", db) if payload.get("exercise_frequency") else None
-        smoke_frequency_id = _name_to_id(payload.get("smoke_frequency"), "smoke_frequencies", db) if payload.get("smoke_frequency") else None
-        drink_frequency_id = _name_to_id(payload.get("drink_frequency"), "drink_frequencies", db) if payload.get("drink_frequency") else None
-        sleep_schedule_id = _name_to_id(payload.get("sleep_schedule"), "sleep_schedules", db) if payload.get("sleep_schedule") else None
-        
-        # drug_use and weed_use: Store enum names directly (not FKs)
-        drug_use = payload.get("drug_use")
-        weed_use = payload.get("weed_use")
-
-        stmt = text("""
-        INSERT INTO profiles.profiles (
-            uid, bio, drug_use, weed_use, gender_id, orientation_id, 
-            location, location_label, show_precise_location, pronoun_id, 
-            school, occupation, relationship_goal_id, 
-            personality_type_id, love_language_id, attachment_style_id, political_view_id, 
-            zodiac_sign_id, religion_id, diet_id, exercise_frequency_id, 
-            smoke_frequency_id, drink_frequency_id, sleep_schedule_id
-        )
-        VALUES (
-            :uid, :bio, :drug_use, :weed_use, :gender_id, :orientation_id,
-            :location, :location_label, :show_precise_location, :pronoun_id,
-            :school, :occupation, :relationship_goal_id,
-            :personality_type_id, :love_language_id, :attachment_style_id, :political_view_id,
-            :zodiac_sign_id, :religion_id, :diet_id, :exercise_frequency_id,
-            :smoke_frequency_id, :drink_frequency_id, :sleep_schedule_id
-        ) RETURNING uid
-        """)
-
-        params = {
-            "uid": uid,
-            "bio": payload.get("bio"),
-            "drug_use": drug_use,
-            "weed_use": weed_use,
-            "gender_id": gender_id,
-            "orientation_id": orientation_id,
-            "location": payload.get("location"),
-            "location_label": payload.get("location_label"),
-            "show_precise_location": payload.get("show_precise_location"),
-            "pronoun_id": pronoun_id,
-            "school": payload.get("school"),
-            "occupation": payload.get("occupation"),
-            "relationship_goal_id": relationship_goal_id,
-            "personality_type_id": personality_type_id,
-            "love_language_id": love_language_id,
-            "attachment_style_id": attachment_style_id,
-            "political_view_id": political_view_id,
-            "zodiac_sign_id": zodiac_sign_id,
-            "religion_id": religion_id,
-            "diet_id": diet_id,
-            "exercise_frequency_id": exercise_frequency_id,
-            "smoke_frequency_id": smoke_frequency_id,
-            "drink_frequency_id": drink_frequency_id,
-            "sleep_schedule_id": sleep_schedule_id,
-        }
-        
-        db.execute(stmt, params)
-        
-        # Handle junction tables
-        if payload.get("interests"):
-            _update_junction_table(uid, "interests", "interest_id", payload["interests"], "interests", db)
-        if payload.get("pets"):
-            _update_junction_table(uid, "pets", "pet_id", payload["pets"], "pets", db)
-        if payload.get("languages_spoken"):
-            _update_junction_table(uid, "languages_spoken", "language_id", payload["languages_spoken"], "languages", db)
-        
+        _upsert_profile(uid, payload, db, overwrite=False)
         return {"ok": True, "detail": f"Profile for user '{uid}' created."}
     
     except SQLAlchemyError as e:
@@ -259,89 +412,72 @@ def _create_profile(uid: str, payload: Dict[str, Any], db: Session) -> Dict[str,
 def _update_profile(uid: str, payload: Dict[str, Any], db: Session) -> Dict[str, Any]:
     """
     Updates an existing profile record for the user.
-    Converts all enum names to FK IDs.
+    Converts all enum names to FK IDs. Creates the profile if it doesn't exist.
     """
-    if not _profile_exists(uid=uid, db=db):
-        # Fallback to creation if profile doesn't exist
-        return _create_profile(uid=uid, payload=payload, db=db)
-    
     try:
-        # Convert names to IDs for FK fields
-        gender_id = _name_to_id(payload.get("gender"), "genders", db) if payload.get("gender") else None
-        orientation_id = _name_to_id(payload.get("orientation"), "orientations", db) if payload.get("orientation") else None
-        pronoun_id = _name_to_id(payload.get("pronouns"), "pronouns", db) if payload.get("pronouns") else None
-        relationship_goal_id = _name_to_id(payload.get("relationship_goal"), "relationship_goals", db) if payload.get("relationship_goal") else None
-        personality_type_id = _name_to_id(payload.get("personality_type"), "personality_types", db) if payload.get("personality_type") else None
-        love_language_id = _name_to_id(payload.get("love_language"), "love_languages", db) if payload.get("love_language") else None
-        attachment_style_id = _name_to_id(payload.get("attachment_style"), "attachment_styles", db) if payload.get("attachment_style") else None
-        political_view_id = _name_to_id(payload.get("political_view"), "political_views", db) if payload.get("political_view") else None
-        zodiac_sign_id = _name_to_id(payload.get("zodiac_sign"), "zodiac_signs", db) if payload.get("zodiac_sign") else None
-        religion_id = _name_to_id(payload.get("religion"), "religions", db) if payload.get("religion") else None
-        diet_id = _name_to_id(payload.get("diet"), "diets", db) if payload.get("diet") else None
-        exercise_frequency_id = _name_to_id(payload.get("exercise_frequency"), "exercise_frequencies", db) if payload.get("exercise_frequency") else None
-        smoke_frequency_id = _name_to_id(payload.get("smoke_frequency"), "smoke_frequencies", db) if payload.get("smoke_frequency") else None
-        drink_frequency_id = _name_to_id(payload.get("drink_frequency"), "drink_frequencies", db) if payload.get("drink_frequency") else None
-        sleep_schedule_id = _name_to_id(payload.get("sleep_schedule"), "sleep_schedules", db) if payload.get("sleep_schedule") else None
+        created = _upsert_profile(uid, payload, db, overwrite=True)
+        db.commit()
+        return {"ok": True, "detail": f"Profile for user '{uid}' {'created' if created else 'updated'}."}
         
-        # drug_use and weed_use: Store enum names directly (not FKs)
-        drug_use = payload.get("drug_use")
-        weed_use = payload.get("weed_use")
-
-        stmt = text("""
-            UPDATE profiles.profiles
-            SET
-                bio = :bio, drug_use = :drug_use, weed_use = :weed_use,
-                gender_id = :gender_id, orientation_id = :orientation_id,
-                location = :location, location_label = :location_label,
-                show_precise_location = :show_precise_location, pronoun_id = :pronoun_id,
-                school = :school, occupation = :occupation, relationship_goal_id = :relationship_goal_id,
-                personality_type_id = :personality_type_id, love_language_id = :love_language_id,
-                attachment_style_id = :attachment_style_id, political_view_id = :political_view_id,
-                zodiac_sign_id = :zodiac_sign_id, religion_id = :religion_id,
-                diet_id = :diet_id, exercise_frequency_id = :exercise_frequency_id,
-                smoke_frequency_id = :smoke_frequency_id, drink_frequency_id = :drink_frequency_id,
-                sleep_schedule_id = :sleep_schedule_id,
-                updated_at = now()
-            WHERE uid = :uid
-        """)
-
-        params = {
-            "uid": uid,
-            "bio": payload.get("bio"),
-            "drug_use": drug_use,
-            "weed_use": weed_use,
-            "gender_id": gender_id,
-            "orientation_id": orientation_id,
-            "location": payload.get("location"),
-            "location_label": payload.get("location_label"),
-            "show_precise_location": payload.get("show_precise_location"),
-            "pronoun_id": pronoun_id,
-            "school": payload.get("school"),
-            "occupation": payload.get("occupation"),
-            "relationship_goal_id": relationship_goal_id,
-            "personality_type_id": personality_type_id,
-            "love_language_id": love_language_id,
-            "attachment_style_id": attachment_style_id,
-            "political_view_id": political_view_id,
-            "zodiac_sign_id": zodiac_sign_id,
-            "religion_id": religion_id,
-            "diet_id": diet_id,
-            "exercise_frequency_id": exercise_frequency_id,
-            "smoke_frequency_id": smoke_frequency_id,
-            "drink_frequency_id": drink_frequency_id,
-            "sleep_schedule_id": sleep_schedule_id,
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error during profile update: {e}")
+
+
+def _patch_profile(uid: str, payload: Dict[str, Any], db: Session) -> Dict[str, Any]:
+    """
+    Partial update: 'payload' only holds the fields the client sent (None clears a field, [] empties a list).
+    Only the columns whose stored value differs are written, junction tables are diffed (_write_junction_ids),
+    and the profile version is bumped with the changed fields only, so caches that depend on other fields
+    (services.cache scopes, e.g. the matchmaking verdicts) stay valid. Does not create a missing profile.
+    """
+    fk_fields = {_fk_payload_key(fk_field): fk_field for fk_field in PROFILE_FK_LOOKUPS}
+
+    # column -> (new value, payload field it comes from)
+    wanted: Dict[str, tuple] = {}
+    for field, value in payload.items():
+        if field in fk_fields:
+            fk_id = _name_to_id(value, PROFILE_FK_LOOKUPS[fk_fields[field]], db) if value else None
+            wanted[fk_fields[field]] = (str(fk_id) if fk_id else None, field)
+        elif field in PROFILE_VALUE_COLUMNS:
+            wanted[field] = (value, field)
+    if "location" in wanted:
+        for column, coord in _location_columns(payload.get("location")).items():
+            wanted[column] = (coord, "location")
+
+    try:
+        # Locks the row, so two concurrent PATCHes diff against each other's result
+        stored = db.execute(
+            text(f"SELECT {', '.join(wanted) or 'uid'} FROM profiles.profiles WHERE uid = :uid FOR UPDATE"),
+            {"uid": uid},
+        ).mappings().one_or_none()
+        if stored is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+
+        # FK ids come back as UUID objects, the wanted ones are strings
+        dirty_columns = {
+            column: value for column, (value, _) in wanted.items()
+            if (str(stored[column]) if column in PROFILE_FK_LOOKUPS and stored[column] is not None else stored[column]) != value
         }
-        
-        db.execute(stmt, params)
-        
-        # Handle junction tables
-        _update_junction_table(uid, "interests", "interest_id", payload.get("interests", []), "interests", db)
-        _update_junction_table(uid, "pets", "pet_id", payload.get("pets", []), "pets", db)
-        _update_junction_table(uid, "languages_spoken", "language_id", payload.get("languages_spoken", []), "languages", db)
-        
+        changed = {wanted[column][1] for column in dirty_columns}
+
+        if dirty_columns:
+            types = {**PROFILE_VALUE_COLUMNS, **{fk_field: "uuid" for fk_field in PROFILE_FK_LOOKUPS}}
+            assignments = ", ".join(f"{column} = CAST(:{column} AS {types[column]})" for column in dirty_columns)
+            db.execute(
+                text(f"UPDATE profiles.profiles SET {assignments}, updated_at = now() WHERE uid = :uid"),
+                {**dirty_columns, "uid": uid},
+            )
+
+        for table_name, (fk_column, lookup_table) in PROFILE_JUNCTION_LOOKUPS.items():
+            if table_name in payload and _update_junction_table(uid, table_name, fk_column, payload[table_name] or [], lookup_table, db):
+                changed.add(table_name)
+
         db.commit()
-        return {"ok": True, "detail": f"Profile for user '{uid}' updated."}
-        
+        if changed:
+            versions.bump("profile", uid, fields=changed, db=db)
+        return {"ok": True, "detail": f"Profile for user '{uid}' updated.", "changed": sorted(changed)}
+
     except SQLAlchemyError as e:
         db.rollback()
-        raise HTTPException(status_code=500, detail=f"Database error during profile update: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Database error during profile update: {e}")
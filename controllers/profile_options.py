@@ -3,6 +3,12 @@ from sqlalchemy import text
 from fastapi.encoders import jsonable_encoder
 from fastapi import HTTPException
 from typing import List, Any, Optional, Union
+import logging
+from services.cache import versions
+from services import lookups
+from controllers.profile import _write_junction_ids
+
+log = logging.getLogger("profile_options")
 
 # --- Utility Functions (unchanged) ---
 
@@ -26,32 +32,20 @@ def _name_to_id(name: Union[str, List[str]], table_name: str, db: Session) -> Un
         if not name:
             return []  # Return empty list if input is empty
         
-        # CRITICAL FIX: Create individual placeholders for each name
-        # SQLAlchemy's text() cannot bind Python lists directly to IN clauses
-        placeholders = ', '.join([f':name_{i}' for i in range(len(name))])
-        query = text(f"SELECT id FROM public.{table_name} WHERE name IN ({placeholders})")
-        
-        # Create parameter dict with individual parameters
-        params = {f'name_{i}': val for i, val in enumerate(name)}
-        
-        result = db.execute(query, params).scalars().all()
+        ids = lookups.names_to_ids(table_name, name, db)
         
         # Check if all names were found - warn but don't fail
-        if len(result) != len(name):
-            found_count = len(result)
-            expected_count = len(name)
-            missing = set(name) - set([params[f'name_{i}'] for i in range(len(name)) if f'name_{i}' in params])
-            print(f"Warning: Only found {found_count} out of {expected_count} options in table '{table_name}'")
-            print(f"Missing values: {missing}")
+        if len(ids) != len(set(name)):
+            log.warning(
+                "Only found %s out of %s options in table '%s', missing values: %s",
+                len(ids), len(set(name)), table_name, set(name) - set(ids),
+            )
         
-        return list(result)
+        return list(ids.values())
     
     # 2. Handle single name (Single-Select - original logic)
     else:
-        id_result = db.execute(
-            text(f"SELECT id FROM public.{table_name} WHERE name = :name LIMIT 1"), 
-            {"name": name}
-        ).scalar()
+        id_result = lookups.name_to_id(table_name, name, db)
         
         if id_result:
             return id_result
@@ -64,10 +58,7 @@ def _name_to_id(name: Union[str, List[str]], table_name: str, db: Session) -> Un
 
 def _id_to_name(id: str, table_name: str, db: Session) -> str:
     """Convert an ID to its name from a lookup table."""
-    name = db.execute(
-        text(f"SELECT name FROM public.{table_name} WHERE id = :id LIMIT 1"), 
-        {"id": id}
-    ).scalar()
+    name = lookups.id_to_name(table_name, id, db)
     
     if name:
         return name
@@ -126,6 +117,11 @@ TABLE_MAPPING = {
 # GET IMPLEMENTATIONS
 # ----------------------------------------------------------------------
 
+def _junction_fk_column(lookup_table: str) -> str:
+    """FK column of a junction table, named after its lookup table ('interests' -> 'interest_id')."""
+    return f"{lookup_table[:-1]}_id"
+
+
 def _get_single_value(uid: str, db: Session, lookup_table: str, column_name: str, storage_type: str) -> Optional[dict]:
     """Get a single FK value from profiles.profiles or users.preferences."""
     
@@ -165,7 +161,8 @@ def _get_multi_value(uid: str, db: Session, lookup_table: str, junction_table: s
         raise HTTPException(status_code=404, detail=f"Profile with id '{uid}' not found.")
     
     # Query junction table for IDs
-    stmt = text(f"SELECT {lookup_table[:-1]}_id FROM profiles.{junction_table} WHERE uid = :uid")
+    fk_column = _junction_fk_column(lookup_table)
+    stmt = text(f"SELECT {fk_column} FROM profiles.{junction_table} WHERE uid = :uid")
     rows = db.execute(stmt, {"uid": uid}).mappings().all()
     
     if not rows:
@@ -174,13 +171,58 @@ def _get_multi_value(uid: str, db: Session, lookup_table: str, junction_table: s
     # Get names for each ID
     result = []
     for row in rows:
-        option_id = row[f"{lookup_table[:-1]}_id"]
+        option_id = row[fk_column]
         name = _id_to_name(option_id, lookup_table, db)
         result.append({"name": name, "id": option_id})
     
     return result
 
 
+def _get_many_values(uid: str, db: Session, keys: List[str]) -> dict:
+    """
+    Several keys at once, as {key: what the single-key 'get' answers}, from one statement: the profile row
+    (SINGLE_FK columns), one array per junction table and the preferences FK as scalar subqueries.
+    The ids are turned into names by the in-memory lookup registry, so nothing else hits the database.
+    """
+    columns = []
+    for key in keys:
+        lookup_table, target_key, storage_type = TABLE_MAPPING[key]
+        if storage_type == 'SINGLE_FK':
+            columns.append(f"p.{target_key} AS {key}")
+        elif storage_type == 'JUNCTION':
+            fk_column = _junction_fk_column(lookup_table)
+            columns.append(f"ARRAY(SELECT j.{fk_column} FROM profiles.{target_key} j WHERE j.uid = u.uid) AS {key}")
+        elif storage_type == 'PREF_FK':
+            columns.append(f"(SELECT pr.{target_key} FROM users.preferences pr WHERE pr.uid = u.uid) AS {key}")
+
+    row = db.execute(
+        text(f"""
+            SELECT p.uid IS NOT NULL AS profile_found, {", ".join(columns)}
+            FROM (SELECT CAST(:uid AS uuid) AS uid) u
+            LEFT JOIN profiles.profiles p ON p.uid = u.uid
+        """),
+        {"uid": uid},
+    ).mappings().one()
+
+    # Same 404 as the single-key reads: everything but the preferences FK needs a profile
+    if not row["profile_found"] and any(TABLE_MAPPING[key][2] != 'PREF_FK' for key in keys):
+        raise HTTPException(status_code=404, detail=f"Profile with id '{uid}' not found.")
+
+    result = {}
+    for key in keys:
+        lookup_table, _, storage_type = TABLE_MAPPING[key]
+        if storage_type == 'JUNCTION':
+            result[key] = [
+                {"name": _id_to_name(option_id, lookup_table, db), "id": option_id}
+                for option_id in row[key] or []
+            ]
+        elif row[key] is None:
+            result[key] = None
+        else:
+            result[key] = {"name": _id_to_name(row[key], lookup_table, db), "id": row[key]}
+    return result
+
+
 # ----------------------------------------------------------------------
 # UPDATE IMPLEMENTATIONS
 # ----------------------------------------------------------------------
@@ -230,18 +272,9 @@ def _update_multi_value(uid: str, db: Session, lookup_table: str, junction_table
     option_names = [str(item) for item in payload]
     option_ids = _list_to_id_arr(option_names, lookup_table, db)
     
-    # Delete existing entries
-    _delete_multi_value(uid, db, junction_table)
-    
-    # Insert new entries
+    # Only the added / removed rows are written
     column_name = f"{lookup_table[:-1]}_id"  # e.g., "interest_id" from "interests"
-    
-    for option_id in option_ids:
-        stmt = text(f"""
-            INSERT INTO profiles.{junction_table} (uid, {column_name})
-            VALUES (:uid, :option_id)
-        """)
-        db.execute(stmt, {"uid": uid, "option_id": option_id})
+    _write_junction_ids(uid, junction_table, column_name, option_ids, db)
     return {"ok": True, "count": len(option_ids)}
 
 
@@ -327,7 +360,7 @@ def _ensure_preferences_row(uid: str, db: Session):
 
 def dispatch_preference_action(
     action: str, 
-    key: str, 
+    key: Union[str, List[str]], 
     uid: str, 
     db: Session, 
     payload: Optional[Any] = None
@@ -337,19 +370,32 @@ def dispatch_preference_action(
     
     Args:
         action: 'get', 'update', or 'delete'
-        key: The preference key (e.g., 'interests', 'relationship_goals')
+        key: The preference key (e.g., 'interests', 'relationship_goals'), or a list of keys ('get' only)
         uid: User ID
         db: Database session
         payload: Data for update actions
     
     Returns:
-        Result of the action (dict or list)
+        Result of the action (dict or list), {key: result} for a list of keys
     """
     
+    if isinstance(key, list):
+        unsupported = [k for k in key if k not in TABLE_MAPPING]
+        if unsupported:
+            raise HTTPException(status_code=404, detail=f"Preference type(s) {', '.join(map(repr, unsupported))} not supported.")
+        if action != "get":
+            raise HTTPException(status_code=422, detail="Only 'get' accepts several preference types at once.")
+        # No key means every key (e.g. a whole profile editor screen)
+        return _get_many_values(uid, db, list(dict.fromkeys(key)) or list(TABLE_MAPPING))
+
     if key not in TABLE_MAPPING:
         raise HTTPException(status_code=404, detail=f"Preference type '{key}' not supported.")
     
     lookup_table, target_key, storage_type = TABLE_MAPPING[key]
+
+    # Invalidates the memoized matchmaking verdicts involving this user
+    if action in ("update", "delete"):
+        versions.bump("prefs" if storage_type == "PREF_FK" else "profile", uid, db=db)
     
     # Handle multi-value (junction table) preferences
     if storage_type == 'JUNCTION':
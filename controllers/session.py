@@ -6,7 +6,8 @@ from typing import Mapping, Optional
 
 from schemas.session import SessionSchema, CreateSessionSchema
 from schemas.session.status import SessionStatusEnum
-from controllers.matchmaking import _user_in_queue, _leave_queue, _join_queue
+from controllers.matchmaking import _user_in_queue, _leave_queue, _join_queue, _record_session_closed
+from services import matchmaking_state
 
 import logging
 
@@ -39,15 +40,19 @@ def _get_active_session_by_id(session_id: str, db: Session) -> Mapping | None:
     session = db.execute(stmt, {"session_id": session_id}).mappings().first()
     return session
 
+# _get_active_session: the user's open session, as host or guest
+ACTIVE_SESSION_SQL = """
+    SELECT *
+    FROM sessions.sessions
+    WHERE (
+        host_uid = :uid OR guest_uid = :uid
+    ) AND status = 'open'
+    LIMIT 1
+"""
+
+
 def _get_active_session(uid: str, db: Session):
-    stmt = text("""
-        SELECT *
-        FROM sessions.sessions
-        WHERE (
-            host_uid = :uid OR guest_uid = :uid
-        ) AND status = 'open'
-        LIMIT 1
-    """)
+    stmt = text(ACTIVE_SESSION_SQL)
     session = db.execute(stmt, {"uid": uid}).mappings().first()
     return session
 
@@ -72,6 +77,7 @@ def _create_session(payload: CreateSessionSchema, host_uid: str, db: Session):
         RETURNING *
     """)
     res = db.execute(stmt, {"status": SessionStatusEnum.open.value, "host_uid": host_uid, "mode_id": mode_id}).mappings().first()
+    matchmaking_state.touch(db, host_uid)
     return res
 
 
@@ -100,6 +106,7 @@ def _join_session(guest_uid: str, db: Session):
     
     if not res:
         raise HTTPException(status_code=404, detail="No available open session found to join")
+    matchmaking_state.touch(db, guest_uid, res["host_uid"])
     
     # Remove from queue after successfully joining
     _leave_queue(uid=guest_uid, db=db)
@@ -130,6 +137,7 @@ def _join_session_by_id(session_id: str, guest_uid: str, db: Session):
     
     if not res:
         raise HTTPException(status_code=404, detail="Session not available")
+    matchmaking_state.touch(db, guest_uid, res["host_uid"])
     
     return res
 
@@ -158,6 +166,7 @@ def _create_session_from_queue(
         "host_uid": host_uid,
         "mode_id": mode_id
     }).mappings().first()
+    matchmaking_state.touch(db, host_uid)
     
     # Keep user in queue so their session can be found by others
     # They'll be removed from queue when someone joins
@@ -201,11 +210,13 @@ def _leave_session(uid: str, db: Session):
     
     if not res:
         raise HTTPException(status_code=404, detail="No active session found to leave")
+    matchmaking_state.touch(db, res["host_uid"], res["guest_uid"])
     
     # If host left and there was a guest (abandoned), re-queue the guest
     if res['status'] == 'abandoned' and res['guest_uid']:
+        _record_session_closed(res['host_uid'], res['guest_uid'])
         try:
-            _join_queue(uid=res['guest_uid'], db=db)
+            _join_queue(uid=res['guest_uid'], db=db, mode_id=res['mode_id'])
         except:
             pass
     
@@ -276,8 +287,7 @@ def _add_chat_message(session_id: str, author_uid: str, content: str, db: Sessio
 
     if not res:
         logging.error(
-            f"Chat insert returned no row for session_id={session_id}, "
-            f"author_uid={author_uid_str}"
+            "Chat insert returned no row for session_id=%s, author_uid=%s", session_id, author_uid_str
         )
         raise HTTPException(
             status_code=500,
@@ -286,6 +296,16 @@ def _add_chat_message(session_id: str, author_uid: str, content: str, db: Sessio
 
     return res
 
+# _get_session_chats: a session's chat history, oldest first
+SESSION_CHATS_SQL = """
+    SELECT *
+    FROM sessions.chats
+    WHERE session_id = :session_id
+    ORDER BY created_at ASC
+    LIMIT :limit
+"""
+
+
 def _get_session_chats(uid: str, db: Session, limit: int = 100):
     session = _get_active_session(uid=uid, db=db)
     if not session:
@@ -296,13 +316,7 @@ def _get_session_chats(uid: str, db: Session, limit: int = 100):
 
     session_id = str(session["id"])
 
-    stmt = text("""
-        SELECT *
-        FROM sessions.chats
-        WHERE session_id = :session_id
-        ORDER BY created_at ASC
-        LIMIT :limit
-    """)
+    stmt = text(SESSION_CHATS_SQL)
 
     rows = db.execute(
         stmt,
@@ -4,6 +4,7 @@ from fastapi import HTTPException
 from fastapi.encoders import jsonable_encoder
 
 from schemas.user import UserInfoSchema
+from services.cache import versions
 
 def _user_exists(uid: str, db: Session) -> bool:
     return bool(
@@ -43,6 +44,7 @@ def _set_user_online(uid: str, db: Session):
         RETURNING id
     """)
     res = db.execute(stmt, {"uid": uid}).mappings().first()
+    versions.bump("user", uid, fields=("is_online", "last_seen_at"), db=db)
     return res
 
 def _set_user_offline(uid: str, db: Session):
@@ -57,6 +59,7 @@ def _set_user_offline(uid: str, db: Session):
         RETURNING id
     """)
     res = db.execute(stmt, {"uid": uid}).mappings().first()
+    versions.bump("user", uid, fields=("is_online", "last_seen_at"), db=db)
     return res
 
 def _toggle_user_pause(uid: str, db: Session):
@@ -70,7 +73,9 @@ def _toggle_user_pause(uid: str, db: Session):
         WHERE id = :uid
         RETURNING *
     """)
-    return db.execute(stmt, {"uid": uid}).mappings().first()
+    user = db.execute(stmt, {"uid": uid}).mappings().first()
+    versions.bump("user", uid, fields=("paused",), db=db)
+    return user
 
 
 def _update_user_info(payload: UserInfoSchema, uid: str, db: Session):
@@ -95,6 +100,7 @@ def _update_user_info(payload: UserInfoSchema, uid: str, db: Session):
     """)
     
     db.execute(stmt, {"fn": payload.get("first_name"), "ln": payload.get("last_name"), "dob": payload.get("birthdate"), "uid": uid})
+    versions.bump("user", uid, fields=("first_name", "last_name", "birthdate"), db=db)
     return _get_user_by_id(uid, db)
 
 def _soft_delete_user(uid: str, db: Session):
@@ -108,5 +114,7 @@ def _soft_delete_user(uid: str, db: Session):
         WHERE id = :uid
         RETURNING *
     """)
-    return db.execute(stmt, {"uid": uid}).mappings().first()
+    user = db.execute(stmt, {"uid": uid}).mappings().first()
+    versions.bump("user", uid, fields=("deleted_at",), db=db)
+    return user
 
@@ -3,6 +3,7 @@ from fastapi import FastAPI, APIRouter
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 
 # Import routers
 from routers.open.auth import router as open_auth_router
@@ -13,14 +14,36 @@ from routers.private.profile import router as private_profile_router
 from routers.private.user import router as private_user_router
 from routers.private.matchmaking import router as private_matchmaking_router
 
+from routers.internal import router as internal_router
+
 from config import settings
+from services.log import setup_logging, stop_logging
+from services.serializers import FastJSONResponse
+setup_logging()
+
+from models.db import engine
+from middleware.instrumentation import QueryInstrumentationMiddleware, install_query_instrumentation
 from services.sockets import register_socket_handlers
+from services.socket_protocol import server_options as socket_server_options
+from services.janitor import run_janitor
+from services.matchmaking_timers import bind_loop, unbind_loop
+from services.matchmaking_rounds import rounds_enabled, run_matchmaking_rounds
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # startup
+    bind_loop(asyncio.get_running_loop())
+    background_stop = asyncio.Event()
+    janitor_task = asyncio.create_task(run_janitor(background_stop))
+    rounds_task = asyncio.create_task(run_matchmaking_rounds(background_stop)) if rounds_enabled() else None
     yield
     # shutdown
+    background_stop.set()
+    await janitor_task
+    if rounds_task:
+        await rounds_task
+    unbind_loop()
+    stop_logging()
 
 open_router = APIRouter(tags=["Public"])
 open_router.include_router(open_auth_router) 
@@ -41,15 +64,19 @@ origins = [
 ]
 
 
-app = FastAPI(title="Spark Dating API", lifespan=lifespan)
+app = FastAPI(title="Spark Dating API", lifespan=lifespan, default_response_class=FastJSONResponse)
 socket_manager = SocketManager(
     app=app, 
     cors_allowed_origins=origins,
     async_mode='asgi',
-    mount_location='/socket.io'
+    mount_location='/socket.io',
+    **socket_server_options()
 )
 
 register_socket_handlers(socket_manager)
+install_query_instrumentation(engine)
+
+app.add_middleware(QueryInstrumentationMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -60,5 +87,6 @@ app.add_middleware(
 )
 
 
+app.include_router(internal_router)
 app.include_router(private_router) # private needs to be mounted before open
 app.include_router(open_router)
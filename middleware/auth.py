@@ -2,6 +2,8 @@ from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from config import settings
+import hmac
+import logging
 
 
 from typing import Annotated
@@ -14,6 +16,8 @@ AND DECODE THEIR JWT AGAINST OUR "SOURCE OF TRUTH" SECRET FROM SUPABASE
 THIS IS USED IN EVERY API ENDPOINT THAT INTERACTS WITH A USER PROFILE WITH THE PARAMS 'def foo(uid: str = Depends(auth_user))'
 """
 
+log = logging.getLogger("auth")
+
 SECRET = settings.supabase_jwt_secret
 SECURITY = HTTPBearer(auto_error=True)
 
@@ -23,10 +27,10 @@ def auth_user(creds: Annotated[HTTPAuthorizationCredentials, Depends(SECURITY)])
         sub = payload.get("sub")
         if not sub:
             raise ValueError("Missing sub")
-        print("User authenticated successfully!")
+        log.debug("User %s authenticated", sub)
         return sub # user_id (UUID)
-    except (JWTError, ValueError):
-        print("User failed to authenticate!")
+    except (JWTError, ValueError) as e:
+        log.info("User failed to authenticate: %s", e)
         raise HTTPException(status_code=401, detail="Invalid or expired authorization token")
 
 def get_user_jwt(creds: Annotated[HTTPAuthorizationCredentials, Depends(SECURITY)]) -> str:
@@ -38,6 +42,17 @@ def get_user_jwt(creds: Annotated[HTTPAuthorizationCredentials, Depends(SECURITY
             audience="authenticated",
         )
         return creds.credentials
-    except (JWTError, ValueError):
-        print("User failed to authenticate!")
-        raise HTTPException(status_code=401, detail="Invalid or expired authorization token")
\ No newline at end of file
+    except (JWTError, ValueError) as e:
+        log.info("User failed to authenticate: %s", e)
+        raise HTTPException(status_code=401, detail="Invalid or expired authorization token")
+
+INTERNAL_SECURITY = HTTPBearer(auto_error=False)
+
+def auth_internal(creds: Annotated[HTTPAuthorizationCredentials | None, Depends(INTERNAL_SECURITY)]) -> None:
+    """Guards /metrics and other internal endpoints with INTERNAL_API_TOKEN, they don't exist without one."""
+    token = settings.internal_api_token
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not creds or not hmac.compare_digest(creds.credentials, token):
+        raise HTTPException(status_code=401, detail="Invalid internal API token")
+    return None
@@ -0,0 +1,179 @@
+import logging
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import settings
+from services import metrics
+
+"""
+THE PURPOSE OF THIS FILE IS TO ATTRIBUTE SQL WORK TO THE ROUTE THAT CAUSED IT. SQLALCHEMY CURSOR HOOKS ON THE
+ENGINE TIME EVERY STATEMENT AND ADD IT TO THE 'QueryStats' OF THE CURRENT REQUEST (A CONTEXTVAR, WHICH FOLLOWS
+SYNC ROUTES INTO THE THREADPOOL), AND A PURE ASGI MIDDLEWARE TURNS THOSE STATS INTO:
+- PROMETHEUS METRICS PER ROUTE TEMPLATE (QUERY COUNT, DB TIME, SLOWEST STATEMENT, REQUEST LATENCY)
+- A 'Server-Timing' RESPONSE HEADER (db / app), VISIBLE IN THE BROWSER DEVTOOLS
+STATEMENTS SLOWER THAN SLOW_QUERY_MS ARE LOGGED WITH THEIR NORMALIZED SQL TEXT, INSIDE OR OUTSIDE A REQUEST.
+
+WIRED UP IN main.py WITH 'install_query_instrumentation(engine)' AND 'app.add_middleware(QueryInstrumentationMiddleware)'
+"""
+
+log = logging.getLogger("db")
+
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    db_seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_sql: Optional[str] = None
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+_whitespace = re.compile(r"\s+")
+_string_literal = re.compile(r"'(?:[^']|'')*'")
+_number_literal = re.compile(r"\b\d+(?:\.\d+)?\b")
+_in_list = re.compile(r"\(\s*(?:\?\s*,\s*)+\?\s*\)")
+
+
+def normalize_sql(statement: str) -> str:
+    """Collapse whitespace and replace literals so the same query always logs the same text."""
+    sql = _whitespace.sub(" ", statement).strip()
+    sql = _string_literal.sub("?", sql)
+    sql = _number_literal.sub("?", sql)
+    sql = _in_list.sub("(?)", sql)
+    return sql
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started_at"].pop()
+    elapsed = time.perf_counter() - started
+
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.db_seconds += elapsed
+        if elapsed > stats.slowest_seconds:
+            stats.slowest_seconds = elapsed
+            stats.slowest_sql = statement
+
+    slow_query_ms = settings.slow_query_ms
+    if slow_query_ms > 0 and elapsed * 1000 >= slow_query_ms:
+        metrics.inc_counter("db_slow_queries_total", description="Statements slower than SLOW_QUERY_MS")
+        log.warning("Slow query (%.1f ms): %s", elapsed * 1000, normalize_sql(statement))
+
+
+def install_query_instrumentation(engine: Engine):
+    """Register the cursor hooks on the engine (idempotent)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def track_queries() -> tuple:
+    """Start collecting QueryStats for the current context, returns (stats, token) for 'stop_tracking_queries'."""
+    stats = QueryStats()
+    return stats, current_query_stats.set(stats)
+
+
+def stop_tracking_queries(token):
+    current_query_stats.reset(token)
+
+
+def _route_template(scope) -> str:
+    # Newer FastAPI keeps included routers nested, the full template is then on the effective route context
+    route = (scope.get("fastapi") or {}).get("effective_route_context") or scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+
+
+def _server_timing(stats: QueryStats, app_seconds: float) -> bytes:
+    return (
+        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.count} queries", '
+        f"app;dur={app_seconds * 1000:.1f}"
+    ).encode("latin-1")
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware, so streaming and background tasks are untouched).
+    Only HTTP requests are instrumented, the Socket.IO mount and websockets pass straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = track_queries()
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(stats, time.perf_counter() - started)))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            stop_tracking_queries(token)
+            self._record(scope, stats, time.perf_counter() - started, status_code)
+
+    @staticmethod
+    def _record(scope, stats: QueryStats, elapsed: float, status_code: int):
+        route = _route_template(scope)
+        method = scope.get("method", "")
+
+        metrics.inc_counter(
+            "http_requests_total",
+            description="HTTP requests by route template, method and status",
+            route=route, method=method, status=status_code,
+        )
+        metrics.observe(
+            "http_request_duration_seconds", elapsed,
+            description="HTTP request latency by route template",
+            route=route, method=method,
+        )
+        metrics.observe(
+            "http_request_db_queries", stats.count,
+            description="SQL statements issued per request",
+            buckets=QUERY_COUNT_BUCKETS, route=route, method=method,
+        )
+        metrics.observe(
+            "http_request_db_seconds", stats.db_seconds,
+            description="Total time spent in SQL statements per request",
+            route=route, method=method,
+        )
+        if not stats.count:
+            return
+        metrics.observe(
+            "http_request_slowest_query_seconds", stats.slowest_seconds,
+            description="Slowest single SQL statement per request",
+            route=route, method=method,
+        )
+
+        slow_query_ms = settings.slow_query_ms
+        if slow_query_ms > 0 and stats.db_seconds * 1000 >= slow_query_ms:
+            log.warning(
+                "Slow DB request %s %s: %d queries, %.1f ms in DB, slowest %.1f ms: %s",
+                method, route, stats.count, stats.db_seconds * 1000,
+                stats.slowest_seconds * 1000, normalize_sql(stats.slowest_sql),
+            )
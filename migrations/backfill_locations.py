@@ -0,0 +1,72 @@
+"""
+Fills profiles.profiles.lat / lng (migration 0003) for rows written before the columns existed.
+
+The location text comes in several formats (JSON object, "lat,lng", ...) so it is parsed in Python with
+the same parser the API uses (controllers.profile._parse_location), in batches of --batch-size rows, each
+batch in its own transaction. Rows whose location cannot be parsed are left NULL and skipped on the next
+batch, so the script can be stopped and re-run at any time.
+
+Usage (from the api root, with the usual .env, after python -m migrations.migrate):
+    python -m migrations.backfill_locations
+    python -m migrations.backfill_locations --batch-size 500 --dry-run
+"""
+import argparse
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger("migrations")
+
+
+def backfill_locations(engine: Engine, batch_size: int = 1000, dry_run: bool = False) -> dict:
+    from controllers.profile import _location_columns
+
+    updated = unparseable = 0
+    last_uid = None
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text("""
+                SELECT uid, location
+                FROM profiles.profiles
+                WHERE location IS NOT NULL
+                  AND location <> ''
+                  AND (lat IS NULL OR lng IS NULL)
+                  AND (CAST(:last_uid AS uuid) IS NULL OR uid > CAST(:last_uid AS uuid))
+                ORDER BY uid
+                LIMIT :limit
+            """), {"last_uid": last_uid, "limit": batch_size}).mappings().all()
+            if not rows:
+                break
+
+            params = []
+            for row in rows:
+                columns = _location_columns(row["location"])
+                if columns["lat"] is None:
+                    unparseable += 1
+                    continue
+                params.append({"uid": row["uid"], **columns})
+
+            if params and not dry_run:
+                conn.execute(text("UPDATE profiles.profiles SET lat = :lat, lng = :lng WHERE uid = :uid"), params)
+            updated += len(params)
+            last_uid = str(rows[-1]["uid"])
+
+        log.info("Backfilled %s profile locations so far (%s unparseable)", updated, unparseable)
+
+    return {"updated": updated, "unparseable": unparseable, "dry_run": dry_run}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Backfill profiles.profiles lat / lng from the location text")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="Parse and count, do not write")
+    args = parser.parse_args()
+
+    from models.db import engine
+
+    result = backfill_locations(engine, batch_size=args.batch_size, dry_run=args.dry_run)
+    print(f"Updated {result['updated']} profile(s), {result['unparseable']} unparseable location(s)"
+          f"{' (dry run)' if result['dry_run'] else ''}")
@@ -0,0 +1,242 @@
+"""
+EXPLAIN ANALYZE regression check for the hot queries in controllers/*.py.
+
+Creates the local stand-in schema (migrations/local/schema.sql), seeds it with synthetic
+users / sessions / queue rows / chats, applies the versioned migrations and then runs
+EXPLAIN (ANALYZE, FORMAT JSON) for each hot query, failing if the plan does not use the
+index the migration added for it.
+
+ONLY run this against a throwaway local Postgres, it writes a lot of junk rows:
+    DB_HOST=localhost DB_SSLMODE=disable python -m migrations.explain_hot_queries --seed
+"""
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Set
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from controllers.chats import LAST_DIRECT_MESSAGE_SQL, USER_CHATS_SQL
+from controllers.matchmaking import (
+    EXCLUSION_SET_SQL,
+    FIND_QUEUE_SQL,
+    MATCH_STATUS_SQL,
+    QUEUE_PEER_SCAN_SQL,
+    WAITING_SESSIONS_SQL,
+)
+from controllers.session import ACTIVE_SESSION_SQL, SESSION_CHATS_SQL
+from migrations.migrate import apply_migrations, _split_statements
+
+LOCAL_SCHEMA = Path(__file__).parent / "local" / "schema.sql"
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1", "postgres", "db"}
+
+
+# Each entry: (name, sql, index names that must ALL appear in the plan). The SQL is the controllers' own, so a
+# change to a hot query is checked as it ships
+HOT_QUERIES = [
+    (
+        "queue entry (_find_queue / _get_queue)",
+        FIND_QUEUE_SQL,
+        {"matchmaking_queue_pkey"},  # uid is the primary key, no extra index needed
+    ),
+    (
+        "queue peer scan (_find_compatible_queue_peer)",
+        QUEUE_PEER_SCAN_SQL,
+        {"matchmaking_queue_enqueued_at_expires_at_idx"},
+    ),
+    (
+        "active session (_get_active_session)",
+        ACTIVE_SESSION_SQL,
+        {"sessions_open_host_uid_idx", "sessions_open_guest_uid_idx"},
+    ),
+    (
+        "sessions waiting for a guest (_find_compatible_session)",
+        WAITING_SESSIONS_SQL,
+        {"sessions_waiting_for_guest_idx"},
+    ),
+    (
+        "exclusion set (_load_exclusion_set)",
+        EXCLUSION_SET_SQL,
+        {"sessions_host_uid_closed_at_idx", "sessions_guest_uid_closed_at_idx"},
+    ),
+    (
+        "match status (_get_match_status)",
+        MATCH_STATUS_SQL,
+        {"interactions_kind_from_to_session_uidx"},
+    ),
+    (
+        "user chats (_get_user_chats)",
+        USER_CHATS_SQL,
+        {"chats_user_a_uid_user_b_uid_uidx", "chats_user_b_uid_idx"},
+    ),
+    (
+        "last direct message for pair (_get_last_message_for_pair)",
+        LAST_DIRECT_MESSAGE_SQL,
+        {"chat_messages_pair_created_at_idx"},
+    ),
+    (
+        "session chat history (_get_session_chats)",
+        SESSION_CHATS_SQL,
+        {"session_chats_session_id_created_at_idx"},
+    ),
+]
+
+
+SEED_STATEMENTS = [
+    """
+    INSERT INTO users.users (id, phone, first_name, last_name, birthdate, is_online)
+    SELECT gen_random_uuid(), '+1555' || lpad(g::text, 7, '0'), 'User' || g, 'Seed',
+           DATE '1970-01-01' + (random() * 12000)::int, random() < 0.3
+    FROM generate_series(1, :n) g
+    """,
+    """
+    CREATE TEMP TABLE seed_uids AS
+    SELECT row_number() OVER () AS n, id FROM users.users
+    """,
+    """
+    INSERT INTO sessions.matchmaking_queue (uid, prefs_snapshot, location_snapshot, enqueued_at, expires_at)
+    SELECT id, '{}'::jsonb, '""'::jsonb,
+           timezone('utc', now()) - random() * interval '2 hours',
+           timezone('utc', now()) + (random() - 0.5) * interval '2 hours'
+    FROM seed_uids
+    WHERE random() < 0.1
+    """,
+    """
+    INSERT INTO sessions.sessions (status, host_uid, guest_uid, started_at, closed_at)
+    SELECT
+        CASE WHEN r < 0.02 THEN 'open' WHEN r < 0.5 THEN 'closed' ELSE 'abandoned' END,
+        h.id,
+        CASE WHEN r < 0.01 THEN NULL ELSE gs.id END,
+        timezone('utc', now()) - random() * interval '30 days',
+        CASE WHEN r < 0.02 THEN NULL ELSE timezone('utc', now()) - random() * interval '30 days' END
+    FROM (
+        SELECT random() AS r, 1 + floor(random() * :n)::int AS hn, 1 + floor(random() * :n)::int AS gn
+        FROM generate_series(1, :n * 5)
+    ) x
+    JOIN seed_uids h ON h.n = x.hn
+    JOIN seed_uids gs ON gs.n = x.gn
+    WHERE h.id <> gs.id
+    """,
+    """
+    INSERT INTO sessions.interactions (kind, from_uid, to_uid, session_id)
+    SELECT 'match', host_uid, guest_uid, id
+    FROM sessions.sessions
+    WHERE guest_uid IS NOT NULL AND random() < 0.5
+    """,
+    """
+    INSERT INTO sessions.chats (session_id, author_uid, receiver_uid, content)
+    SELECT s.id, s.host_uid, s.guest_uid, 'hello ' || g
+    FROM sessions.sessions s, generate_series(1, 3) g
+    WHERE s.guest_uid IS NOT NULL
+    """,
+    """
+    INSERT INTO users.chats (user_a_uid, user_b_uid, match_session_id, last_message_at)
+    SELECT DISTINCT ON (LEAST(host_uid, guest_uid), GREATEST(host_uid, guest_uid))
+           LEAST(host_uid, guest_uid), GREATEST(host_uid, guest_uid), id, closed_at
+    FROM sessions.sessions
+    WHERE guest_uid IS NOT NULL AND random() < 0.2
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO users.chat_messages (author_uid, receiver_uid, content, created_at)
+    SELECT CASE WHEN g % 2 = 0 THEN c.user_a_uid ELSE c.user_b_uid END,
+           CASE WHEN g % 2 = 0 THEN c.user_b_uid ELSE c.user_a_uid END,
+           'message ' || g,
+           timezone('utc', now()) - g * interval '1 minute'
+    FROM users.chats c, generate_series(1, 20) g
+    """,
+]
+
+
+def _is_local(host: str) -> bool:
+    return host in LOCAL_HOSTS
+
+
+def _create_local_schema(engine: Engine):
+    with engine.begin() as conn:
+        for stmt in _split_statements(LOCAL_SCHEMA.read_text()):
+            conn.exec_driver_sql(stmt)
+
+
+def _seed(engine: Engine, n: int):
+    with engine.begin() as conn:
+        for stmt in SEED_STATEMENTS:
+            conn.execute(text(stmt), {"n": n})
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+
+def _sample_params(conn: Connection) -> Dict[str, Any]:
+    row = conn.execute(text("""
+        SELECT host_uid AS uid, guest_uid AS other_uid, id AS session_id
+        FROM sessions.sessions
+        WHERE guest_uid IS NOT NULL
+        ORDER BY random()
+        LIMIT 1
+    """)).mappings().first()
+    if not row:
+        raise RuntimeError("No seeded sessions found, run with --seed first")
+    params = {k: str(v) for k, v in row.items()}
+    # the other parameter names the hot queries use
+    params.update(guest_uid=params["uid"], a=params["uid"], b=params["other_uid"], limit=50, cooldown_seconds=3600)
+    return params
+
+
+def _index_names(plan: Dict[str, Any]) -> Iterable[str]:
+    if "Index Name" in plan:
+        yield plan["Index Name"]
+    for child in plan.get("Plans", []):
+        yield from _index_names(child)
+
+
+def check_hot_queries(engine: Engine) -> List[str]:
+    """Run EXPLAIN ANALYZE for every hot query and return a list of failures."""
+    failures = []
+    with engine.connect() as conn:
+        params = _sample_params(conn)
+        for name, sql, expected in HOT_QUERIES:
+            result = conn.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}"), params).scalar()
+            explain = result if isinstance(result, list) else json.loads(result)
+            plan = explain[0]["Plan"]
+            used: Set[str] = set(_index_names(plan))
+            missing = expected - used
+            status = "FAIL" if missing else "ok"
+            print(f"[{status:>4}] {explain[0]['Execution Time']:8.3f} ms  {name}")
+            print(f"         indexes used: {', '.join(sorted(used)) or '(none, sequential scan)'}")
+            if missing:
+                failures.append(f"{name}: expected {', '.join(sorted(missing))}")
+        conn.rollback()
+    return failures
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE regression check for hot queries")
+    parser.add_argument("--seed", action="store_true", help="Create the local schema and seed synthetic rows first")
+    parser.add_argument("--users", type=int, default=20000, help="Number of synthetic users to seed")
+    parser.add_argument("--allow-remote", action="store_true", help="Allow running against a non-local DB_HOST")
+    args = parser.parse_args()
+
+    from config import settings
+    from models.db import engine
+
+    if not args.allow_remote and not _is_local(settings.db_host):
+        sys.exit(f"Refusing to run against non-local DB_HOST '{settings.db_host}' (use --allow-remote)")
+
+    if args.seed:
+        _create_local_schema(engine)
+        _seed(engine, args.users)
+
+    apply_migrations(engine)
+
+    failures = check_hot_queries(engine)
+    if failures:
+        print("\nIndex regressions:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\nAll hot queries use their indexes.")
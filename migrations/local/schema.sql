@@ -0,0 +1,156 @@
+-- Minimal local stand-in for the Supabase schema, used only by the local tooling
+-- (migrations/explain_hot_queries.py and bench/). It mirrors the columns the
+-- controllers read and write; it is NOT applied to the real database.
+-- Requires Postgres 13+ (built-in gen_random_uuid()).
+
+CREATE SCHEMA IF NOT EXISTS users;
+CREATE SCHEMA IF NOT EXISTS profiles;
+CREATE SCHEMA IF NOT EXISTS sessions;
+
+-- Lookup tables (public.<name>(id, name))
+CREATE TABLE IF NOT EXISTS public.genders (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS public.orientations (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS public.pronouns (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS public.relationship_goals (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS public.personality_types (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS public.love_languages (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS public.attachment_styles (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS public.political_views (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS public.zodiac_signs (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS public.religions (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS public.diets (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS public.exercise_frequencies (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS public.smoke_frequencies (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS public.drink_frequencies (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS public.sleep_schedules (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS public.interests (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS public.pets (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS public.languages (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name TEXT UNIQUE NOT NULL);
+
+CREATE TABLE IF NOT EXISTS users.users (
+    id UUID PRIMARY KEY,
+    phone TEXT,
+    first_name TEXT,
+    last_name TEXT,
+    birthdate DATE,
+    is_online BOOLEAN NOT NULL DEFAULT FALSE,
+    last_seen_at TIMESTAMP,
+    paused BOOLEAN NOT NULL DEFAULT FALSE,
+    deleted_at TIMESTAMP,
+    created_at TIMESTAMP NOT NULL DEFAULT timezone('utc', now())
+);
+
+CREATE TABLE IF NOT EXISTS users.preferences (
+    uid UUID PRIMARY KEY REFERENCES users.users (id),
+    age_min INT,
+    age_max INT,
+    max_distance INT,
+    target_gender_id UUID REFERENCES public.genders (id),
+    extra_options JSONB,
+    updated_at TIMESTAMP NOT NULL DEFAULT timezone('utc', now())
+);
+
+CREATE TABLE IF NOT EXISTS profiles.profiles (
+    uid UUID PRIMARY KEY REFERENCES users.users (id),
+    bio TEXT,
+    drug_use TEXT,
+    weed_use TEXT,
+    gender_id UUID REFERENCES public.genders (id),
+    orientation_id UUID REFERENCES public.orientations (id),
+    location TEXT,
+    lat DOUBLE PRECISION,
+    lng DOUBLE PRECISION,
+    location_label TEXT,
+    show_precise_location BOOLEAN,
+    pronoun_id UUID REFERENCES public.pronouns (id),
+    school TEXT,
+    occupation TEXT,
+    relationship_goal_id UUID REFERENCES public.relationship_goals (id),
+    personality_type_id UUID REFERENCES public.personality_types (id),
+    love_language_id UUID REFERENCES public.love_languages (id),
+    attachment_style_id UUID REFERENCES public.attachment_styles (id),
+    political_view_id UUID REFERENCES public.political_views (id),
+    zodiac_sign_id UUID REFERENCES public.zodiac_signs (id),
+    religion_id UUID REFERENCES public.religions (id),
+    diet_id UUID REFERENCES public.diets (id),
+    exercise_frequency_id UUID REFERENCES public.exercise_frequencies (id),
+    smoke_frequency_id UUID REFERENCES public.smoke_frequencies (id),
+    drink_frequency_id UUID REFERENCES public.drink_frequencies (id),
+    sleep_schedule_id UUID REFERENCES public.sleep_schedules (id),
+    created_at TIMESTAMP NOT NULL DEFAULT timezone('utc', now()),
+    updated_at TIMESTAMP NOT NULL DEFAULT timezone('utc', now())
+);
+
+CREATE TABLE IF NOT EXISTS profiles.interests (uid UUID NOT NULL REFERENCES users.users (id), interest_id UUID NOT NULL REFERENCES public.interests (id));
+CREATE TABLE IF NOT EXISTS profiles.pets (uid UUID NOT NULL REFERENCES users.users (id), pet_id UUID NOT NULL REFERENCES public.pets (id));
+CREATE TABLE IF NOT EXISTS profiles.languages_spoken (uid UUID NOT NULL REFERENCES users.users (id), language_id UUID NOT NULL REFERENCES public.languages (id));
+CREATE TABLE IF NOT EXISTS profiles.sexual_orientations (uid UUID NOT NULL REFERENCES users.users (id), orientation_id UUID NOT NULL REFERENCES public.orientations (id));
+
+CREATE TABLE IF NOT EXISTS sessions.modes (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    name TEXT NOT NULL,
+    time_limit INTEGER NOT NULL,
+    interest TEXT,
+    config JSONB
+);
+
+CREATE TABLE IF NOT EXISTS sessions.sessions (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    status TEXT NOT NULL DEFAULT 'open',
+    host_uid UUID REFERENCES users.users (id),
+    guest_uid UUID REFERENCES users.users (id),
+    mode_id UUID,
+    prompt TEXT,
+    host_prefs_snapshot JSONB,
+    started_at TIMESTAMP NOT NULL DEFAULT timezone('utc', now()),
+    closed_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS sessions.matchmaking_queue (
+    uid UUID PRIMARY KEY REFERENCES users.users (id),
+    mode_id UUID,
+    prefs_snapshot JSONB,
+    location_snapshot JSONB,
+    lat DOUBLE PRECISION,
+    lng DOUBLE PRECISION,
+    shard_key TEXT,
+    enqueued_at TIMESTAMP NOT NULL DEFAULT timezone('utc', now()),
+    expires_at TIMESTAMP NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sessions.interactions (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    kind TEXT NOT NULL,
+    from_uid UUID NOT NULL REFERENCES users.users (id),
+    to_uid UUID NOT NULL REFERENCES users.users (id),
+    session_id UUID NOT NULL REFERENCES sessions.sessions (id),
+    created_at TIMESTAMP NOT NULL DEFAULT timezone('utc', now())
+);
+
+CREATE TABLE IF NOT EXISTS sessions.chats (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    session_id UUID NOT NULL REFERENCES sessions.sessions (id),
+    author_uid UUID REFERENCES users.users (id),
+    receiver_uid UUID REFERENCES users.users (id),
+    content TEXT NOT NULL,
+    is_system BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP NOT NULL DEFAULT timezone('utc', now())
+);
+
+CREATE TABLE IF NOT EXISTS users.chats (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_a_uid UUID NOT NULL REFERENCES users.users (id),
+    user_b_uid UUID NOT NULL REFERENCES users.users (id),
+    match_session_id UUID REFERENCES sessions.sessions (id),
+    last_message_at TIMESTAMP,
+    status TEXT NOT NULL DEFAULT 'active',
+    created_at TIMESTAMP NOT NULL DEFAULT timezone('utc', now())
+);
+
+CREATE TABLE IF NOT EXISTS users.chat_messages (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    author_uid UUID NOT NULL REFERENCES users.users (id),
+    receiver_uid UUID NOT NULL REFERENCES users.users (id),
+    content TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT timezone('utc', now())
+);
@@ -0,0 +1,134 @@
+"""
+Applies the versioned SQL files in migrations/versions in order.
+
+Applied versions are recorded in public.schema_migrations so running this again only
+applies what is new. Every statement runs in autocommit mode because the index
+migrations use CREATE INDEX CONCURRENTLY, which cannot run inside a transaction block,
+so each migration file must be written to be idempotent (IF NOT EXISTS).
+
+A failed CREATE INDEX CONCURRENTLY (e.g. duplicates under a unique index) leaves an INVALID
+index behind, which IF NOT EXISTS would then skip silently: the invalid indexes a file
+declares are dropped before it is applied, and a file only counts as applied once all of
+them are valid. An applied file whose indexes went invalid is applied again.
+
+Usage (from the api root, with the usual .env):
+    python -m migrations.migrate            # apply pending migrations
+    python -m migrations.migrate --list     # show applied / pending versions
+"""
+import argparse
+import logging
+import re
+from pathlib import Path
+from typing import List, Set
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+VERSIONS_DIR = Path(__file__).parent / "versions"
+
+_INDEX_RE = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)\s+ON\s+(?:ONLY\s+)?(\w+)\.",
+    re.IGNORECASE,
+)
+
+log = logging.getLogger("migrations")
+
+
+def _split_statements(sql: str) -> List[str]:
+    """Split a migration file into statements (no function bodies / DO blocks allowed)."""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def _declared_indexes(sql: str) -> Set[str]:
+    """'schema.index' of every index a migration file builds."""
+    return {f"{schema}.{name}" for name, schema in _INDEX_RE.findall(sql)}
+
+
+def _invalid_indexes(conn: Connection, indexes: Set[str]) -> List[str]:
+    """The ones among 'indexes' left INVALID by an interrupted or failed concurrent build."""
+    if not indexes:
+        return []
+    return list(conn.execute(text("""
+        SELECT n.nspname || '.' || c.relname
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE NOT i.indisvalid
+          AND n.nspname || '.' || c.relname = ANY(:indexes)
+        ORDER BY 1
+    """), {"indexes": sorted(indexes)}).scalars().all())
+
+
+def _ensure_migrations_table(engine: Engine):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS public.schema_migrations (
+                version TEXT PRIMARY KEY,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+        """))
+
+
+def _applied_versions(engine: Engine) -> set:
+    with engine.connect() as conn:
+        return set(conn.execute(text("SELECT version FROM public.schema_migrations")).scalars().all())
+
+
+def _all_versions() -> List[Path]:
+    return sorted(VERSIONS_DIR.glob("*.sql"))
+
+
+def apply_migrations(engine: Engine) -> List[str]:
+    """Apply every pending migration file and return the versions that were applied."""
+    _ensure_migrations_table(engine)
+    applied = _applied_versions(engine)
+    newly_applied = []
+
+    for path in _all_versions():
+        version = path.stem
+        sql = path.read_text()
+        indexes = _declared_indexes(sql)
+
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            invalid = _invalid_indexes(conn, indexes)
+            if version in applied and not invalid:
+                continue
+
+            for index in invalid:
+                log.warning("Dropping invalid index %s (failed concurrent build), %s rebuilds it", index, version)
+                conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {index}")
+
+            log.info("Applying migration %s", version)
+            for stmt in _split_statements(sql):
+                conn.exec_driver_sql(stmt)
+
+            invalid = _invalid_indexes(conn, indexes)
+            if invalid:
+                raise RuntimeError(f"Migration {version} left invalid indexes: {', '.join(invalid)}")
+            conn.execute(
+                text("INSERT INTO public.schema_migrations (version) VALUES (:version) ON CONFLICT (version) DO NOTHING"),
+                {"version": version},
+            )
+        newly_applied.append(version)
+
+    return newly_applied
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Apply versioned SQL migrations")
+    parser.add_argument("--list", action="store_true", help="List applied and pending migrations")
+    args = parser.parse_args()
+
+    from models.db import engine
+
+    if args.list:
+        _ensure_migrations_table(engine)
+        applied = _applied_versions(engine)
+        for path in _all_versions():
+            print(f"{'applied' if path.stem in applied else 'pending'}  {path.stem}")
+    else:
+        versions = apply_migrations(engine)
+        print(f"Applied {len(versions)} migration(s): {', '.join(versions) or '-'}")
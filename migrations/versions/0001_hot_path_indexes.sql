@@ -0,0 +1,119 @@
+-- 0001: Composite and partial indexes for the hot queries in controllers/*.py
+--
+-- Every statement is idempotent (IF NOT EXISTS) and built CONCURRENTLY so it can
+-- be applied to the live Supabase database without locking writes.
+-- migrations/migrate.py runs each statement outside of a transaction block.
+
+
+-- ---------------------------------------------------------------------------
+-- sessions.matchmaking_queue
+-- ---------------------------------------------------------------------------
+
+-- _get_queue / _user_in_queue (WHERE uid = :uid) are already served by the uid primary key.
+
+-- _find_compatible_queue_peer: WHERE expires_at > NOW() ORDER BY enqueued_at LIMIT 20
+-- (ordered index scan, expires_at filtered from the index itself)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS matchmaking_queue_enqueued_at_expires_at_idx
+    ON sessions.matchmaking_queue (enqueued_at, expires_at);
+
+-- Expiry sweeps: WHERE expires_at <= NOW()
+CREATE INDEX CONCURRENTLY IF NOT EXISTS matchmaking_queue_expires_at_idx
+    ON sessions.matchmaking_queue (expires_at);
+
+
+-- ---------------------------------------------------------------------------
+-- sessions.sessions
+-- ---------------------------------------------------------------------------
+
+-- _get_active_session / _leave_session: (host_uid = :uid OR guest_uid = :uid) AND status = 'open'
+-- (BitmapOr over the two partial indexes)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS sessions_open_host_uid_idx
+    ON sessions.sessions (host_uid)
+    WHERE status = 'open';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS sessions_open_guest_uid_idx
+    ON sessions.sessions (guest_uid)
+    WHERE status = 'open';
+
+-- _find_compatible_session / _find_open_session: open sessions still waiting for a guest
+CREATE INDEX CONCURRENTLY IF NOT EXISTS sessions_waiting_for_guest_idx
+    ON sessions.sessions (host_uid)
+    WHERE status = 'open' AND guest_uid IS NULL AND closed_at IS NULL;
+
+-- _load_exclusion_set cooldown lookup and _get_active_session_by_host
+CREATE INDEX CONCURRENTLY IF NOT EXISTS sessions_host_uid_closed_at_idx
+    ON sessions.sessions (host_uid, closed_at);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS sessions_guest_uid_closed_at_idx
+    ON sessions.sessions (guest_uid, closed_at);
+
+
+-- ---------------------------------------------------------------------------
+-- sessions.interactions
+-- ---------------------------------------------------------------------------
+
+-- _match_user / _get_match_status: kind = 'match' AND from_uid AND to_uid AND session_id
+-- Unique so an interaction can be recorded with ON CONFLICT DO NOTHING; remove any
+-- duplicates left behind by concurrent requests first.
+DELETE FROM sessions.interactions i
+USING sessions.interactions d
+WHERE i.kind = d.kind
+  AND i.from_uid = d.from_uid
+  AND i.to_uid = d.to_uid
+  AND i.session_id = d.session_id
+  AND i.ctid > d.ctid;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS interactions_kind_from_to_session_uidx
+    ON sessions.interactions (kind, from_uid, to_uid, session_id);
+
+
+-- ---------------------------------------------------------------------------
+-- sessions.chats
+-- ---------------------------------------------------------------------------
+
+-- _get_session_chats / _get_last_message_for_pair: WHERE session_id = :id ORDER BY created_at
+CREATE INDEX CONCURRENTLY IF NOT EXISTS session_chats_session_id_created_at_idx
+    ON sessions.chats (session_id, created_at);
+
+
+-- ---------------------------------------------------------------------------
+-- users.chats
+-- ---------------------------------------------------------------------------
+
+-- Match history lookups by sorted pair (user_a_uid < user_b_uid) and
+-- _get_user_chats: WHERE user_a_uid = :uid OR user_b_uid = :uid
+-- Unique so _match_user can upsert the pair's chat (ON CONFLICT (user_a_uid, user_b_uid));
+-- duplicate pairs left behind by concurrent matches are merged into the oldest chat first
+-- (messages are stored per pair in users.chat_messages, not per chat).
+UPDATE users.chats k
+SET last_message_at = d.last_message_at
+FROM (
+    SELECT user_a_uid, user_b_uid, MAX(last_message_at) AS last_message_at
+    FROM users.chats
+    GROUP BY user_a_uid, user_b_uid
+    HAVING COUNT(*) > 1
+) d
+WHERE k.user_a_uid = d.user_a_uid
+  AND k.user_b_uid = d.user_b_uid;
+
+DELETE FROM users.chats c
+USING users.chats d
+WHERE c.user_a_uid = d.user_a_uid
+  AND c.user_b_uid = d.user_b_uid
+  AND (c.created_at, c.ctid) > (d.created_at, d.ctid);
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS chats_user_a_uid_user_b_uid_uidx
+    ON users.chats (user_a_uid, user_b_uid);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS chats_user_b_uid_idx
+    ON users.chats (user_b_uid);
+
+
+-- ---------------------------------------------------------------------------
+-- users.chat_messages
+-- ---------------------------------------------------------------------------
+
+-- _get_last_message_for_pair / _get_chat_detail:
+-- (author_uid = :a AND receiver_uid = :b) OR (author_uid = :b AND receiver_uid = :a) ORDER BY created_at
+CREATE INDEX CONCURRENTLY IF NOT EXISTS chat_messages_pair_created_at_idx
+    ON users.chat_messages (author_uid, receiver_uid, created_at DESC);
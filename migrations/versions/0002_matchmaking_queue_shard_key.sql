@@ -0,0 +1,18 @@
+-- 0002: Shard key on sessions.matchmaking_queue (services/matchmaking_shards.py)
+--
+-- '<geo cell>|<gender>><target gender>' written by _join_queue, so one shard of the queue
+-- can be read (and owned) on its own. Rows enqueued before this migration keep a NULL key,
+-- they expire within the matchmaking timeout.
+
+
+-- ---------------------------------------------------------------------------
+-- sessions.matchmaking_queue
+-- ---------------------------------------------------------------------------
+
+ALTER TABLE sessions.matchmaking_queue
+    ADD COLUMN IF NOT EXISTS shard_key TEXT;
+
+-- Per-shard scans: WHERE shard_key = ANY(:shards) AND expires_at > NOW() ORDER BY enqueued_at,
+-- and the per-shard sizes of /internal/matchmaking/shards (GROUP BY shard_key)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS matchmaking_queue_shard_key_enqueued_at_idx
+    ON sessions.matchmaking_queue (shard_key, enqueued_at);
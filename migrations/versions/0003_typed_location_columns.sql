@@ -0,0 +1,28 @@
+-- 0003: Typed coordinates next to the free-form location text
+--
+-- Written by _create_profile / _update_profile and _join_queue so the matcher reads numbers
+-- instead of parsing JSON / "lat,lng" text on every pair check. Existing rows are filled by
+-- python -m migrations.backfill_locations (until then the matcher parses the text as before).
+-- Age is not stored: it is computed by the profile query (controllers/profile.py PROFILE_AGE_SQL).
+
+
+-- ---------------------------------------------------------------------------
+-- profiles.profiles
+-- ---------------------------------------------------------------------------
+
+ALTER TABLE profiles.profiles
+    ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION;
+
+ALTER TABLE profiles.profiles
+    ADD COLUMN IF NOT EXISTS lng DOUBLE PRECISION;
+
+
+-- ---------------------------------------------------------------------------
+-- sessions.matchmaking_queue
+-- ---------------------------------------------------------------------------
+
+ALTER TABLE sessions.matchmaking_queue
+    ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION;
+
+ALTER TABLE sessions.matchmaking_queue
+    ADD COLUMN IF NOT EXISTS lng DOUBLE PRECISION;
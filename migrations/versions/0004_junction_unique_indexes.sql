@@ -0,0 +1,62 @@
+-- 0004: One row per (uid, option) in the profile junction tables
+--
+-- controllers/profile.py _write_junction_ids only inserts the missing options with
+-- INSERT ... ON CONFLICT DO NOTHING, which needs a unique index to conflict on. Duplicates
+-- written by the old delete-and-reinsert loops are removed first. The indexes also serve
+-- the per-user reads (WHERE uid = :uid / uid = ANY(:uids)).
+
+
+-- ---------------------------------------------------------------------------
+-- profiles.interests
+-- ---------------------------------------------------------------------------
+
+DELETE FROM profiles.interests i
+USING profiles.interests d
+WHERE i.uid = d.uid
+  AND i.interest_id = d.interest_id
+  AND i.ctid > d.ctid;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS interests_uid_interest_id_uidx
+    ON profiles.interests (uid, interest_id);
+
+
+-- ---------------------------------------------------------------------------
+-- profiles.pets
+-- ---------------------------------------------------------------------------
+
+DELETE FROM profiles.pets i
+USING profiles.pets d
+WHERE i.uid = d.uid
+  AND i.pet_id = d.pet_id
+  AND i.ctid > d.ctid;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS pets_uid_pet_id_uidx
+    ON profiles.pets (uid, pet_id);
+
+
+-- ---------------------------------------------------------------------------
+-- profiles.languages_spoken
+-- ---------------------------------------------------------------------------
+
+DELETE FROM profiles.languages_spoken i
+USING profiles.languages_spoken d
+WHERE i.uid = d.uid
+  AND i.language_id = d.language_id
+  AND i.ctid > d.ctid;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS languages_spoken_uid_language_id_uidx
+    ON profiles.languages_spoken (uid, language_id);
+
+
+-- ---------------------------------------------------------------------------
+-- profiles.sexual_orientations
+-- ---------------------------------------------------------------------------
+
+DELETE FROM profiles.sexual_orientations i
+USING profiles.sexual_orientations d
+WHERE i.uid = d.uid
+  AND i.orientation_id = d.orientation_id
+  AND i.ctid > d.ctid;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS sexual_orientations_uid_orientation_id_uidx
+    ON profiles.sexual_orientations (uid, orientation_id);
@@ -16,12 +16,13 @@ PASSWORD = settings.db_pass
 HOST = settings.db_host
 PORT = settings.db_port
 DBNAME = settings.db_name
+SSLMODE = settings.db_sslmode
 
 if not all([USER, PASSWORD, HOST, PORT, DBNAME]):
     raise RuntimeError("Missing DB configuration variables")
 
-# SQLAlchemy string w/ SSL required for Supabase
-DATABASE_URL = f"postgresql+psycopg2://{USER}:{PASSWORD}@{HOST}:{PORT}/{DBNAME}?sslmode=require"
+# SQLAlchemy string w/ SSL required for Supabase (DB_SSLMODE=disable for a local Postgres)
+DATABASE_URL = f"postgresql+psycopg2://{USER}:{PASSWORD}@{HOST}:{PORT}/{DBNAME}?sslmode={SSLMODE}"
 
 # An Engine, which the Session will use for connection
 # Increased pool size to match Supabase backend capacity
@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+
+from .metrics import router as metrics_router
+from .matchmaking import router as matchmaking_router
+
+router = APIRouter(tags=["Internal"])
+
+router.include_router(metrics_router)
+router.include_router(matchmaking_router)
+
+__all__=["router"]
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from middleware.auth import auth_internal
+from models.db import get_db
+
+from controllers.matchmaking import _get_queue_shards
+from services.matchmaking_rejections import rejection_report
+
+router = APIRouter(prefix="/internal/matchmaking")
+
+@router.get("/rejections")
+def get_matchmaking_rejections(
+    hours: int = Query(default=24, ge=1, le=48),
+    _: None = Depends(auth_internal),
+):
+    """
+    Why candidate pairs did not match (per worker process): compatibility checks, compatible pairs and
+    rejections by reason code ('gender', 'age', 'distance', 'extra:<field>', 'excluded', 'no_profile'),
+    in total and per hour.
+    """
+    return rejection_report(hours=hours)
+
+
+@router.get("/shards")
+def get_matchmaking_shards(db: Session = Depends(get_db), _: None = Depends(auth_internal)):
+    """
+    Queued users per matchmaking shard ('<geo cell>|<gender>><target gender>', see services/matchmaking_shards.py),
+    counted from the queue table so it covers every worker.
+    """
+    return _get_queue_shards(db=db)
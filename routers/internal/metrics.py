@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from middleware.auth import auth_internal
+
+from services.metrics import render_prometheus
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics(_: None = Depends(auth_internal)):
+    """
+    Prometheus scrape endpoint (per worker process).
+    """
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from models.db import get_db
 from middleware.auth import auth_user
-from typing import List, Any, Annotated
+from typing import List, Any, Annotated, Optional
 
 from controllers.profile_options import dispatch_preference_action
 
@@ -31,6 +31,13 @@ def get_all_options_for_table(table_name: str, db: Session):
     return [{"id": row["id"], "name": row["name"]} for row in result]
 
 
+def parse_option_keys(keys: Optional[str]) -> List[str]:
+    """'diets,religions,languages-spoken' -> dispatcher keys (path style with dashes accepted), [] for all."""
+    if not keys:
+        return []
+    return [key.strip().replace("-", "_") for key in keys.split(",") if key.strip()]
+
+
 # ==============================================================================
 # A. PUBLIC ENDPOINTS: Get all available options for each preference type
 # ==============================================================================
@@ -613,11 +620,31 @@ def get_my_sexual_orientations(
     return dispatch_preference_action("get", "sexual_orientations", uid, db)
 
 
+@router.get("/me/options", summary="Get Several Of My Options At Once")
+def get_my_options(
+    uid: Annotated[str, Depends(auth_user)],
+    db: Annotated[Session, Depends(get_db)],
+    keys: Annotated[Optional[str], Query(description="Comma-separated option keys (e.g. 'diets,religions'), all when omitted")] = None,
+):
+    """Returns {key: value} for the requested options, in one request."""
+    return dispatch_preference_action("get", parse_option_keys(keys), uid, db)
+
+
 
 # ==============================================================================
 # B. USER-SPECIFIC GET ENDPOINTS: Get another user's preferences
 # ==============================================================================
 
+@router.get("/{target_uid}/options", summary="Get Several Of A User's Options At Once")
+def get_user_options(
+    target_uid: str,
+    caller_uid: Annotated[str, Depends(auth_user)],
+    db: Annotated[Session, Depends(get_db)],
+    keys: Annotated[Optional[str], Query(description="Comma-separated option keys (e.g. 'diets,religions'), all when omitted")] = None,
+):
+    """Returns {key: value} for the requested options of a user, in one request."""
+    return dispatch_preference_action("get", parse_option_keys(keys), target_uid, db)
+
 @router.get("/{target_uid}/target-gender", summary="Get User's Target Gender Preference")
 def get_user_target_gender(
     target_uid: str, 
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from middleware.auth import auth_user
@@ -11,26 +11,31 @@ import asyncio
 from controllers.profile import _profile_exists
 from services.supabase import supabase_for_service
 from services.storage import get_user_photos
+from services import response_cache
 
 router = APIRouter(tags=["Profile: Photos"])
 
 @router.get("/{target_uid}/photos", response_model=List[PhotoMetaSchema])
 async def get_user_profile_photos(
     target_uid: str,
+    request: Request,
     caller_uid: Annotated[str, Depends(auth_user)],
     db: Annotated[Session, Depends(get_db)]
 ):
-    if not _profile_exists(target_uid, db=db):
-        raise HTTPException(status_code=404, detail="Profile not found")
-    # TODO: enforce blocks/visibility before fetching
+    # TODO: enforce blocks/visibility before fetching (and before answering from the cache)
+    entry = response_cache.get("photos", target_uid)
+    if entry is None:
+        if not _profile_exists(target_uid, db=db):
+            raise HTTPException(status_code=404, detail="Profile not found")
 
-    storage = supabase_for_service.storage
-    result = await asyncio.to_thread(
-        get_user_photos,
-        storage=storage,
-        uid=target_uid,
-        db=db,
-        ttl_seconds=500,
-        only_approved=True, 
-    )
-    return result
+        storage = supabase_for_service.storage
+        result = await asyncio.to_thread(
+            get_user_photos,
+            storage=storage,
+            uid=target_uid,
+            db=db,
+            ttl_seconds=response_cache.PHOTO_URL_TTL_SECONDS,
+            only_approved=True, 
+        )
+        entry = response_cache.put("photos", target_uid, result)
+    return response_cache.respond(request, "photos", entry)
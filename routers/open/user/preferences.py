@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 from sqlalchemy import text
@@ -9,6 +9,7 @@ from models.db import get_db
 
 from controllers.preferences import _update_user_prefs, _create_user_prefs, _get_user_prefs
 from schemas.preferences import UserProfilePreferencesSchema
+from services import response_cache
 
 router = APIRouter(tags=["User: Preferences"])
 
@@ -17,7 +18,8 @@ router = APIRouter(tags=["User: Preferences"])
 @router.get("/{target_uid}/preferences")
 def get_user_preferences(
     target_uid: str,
+    request: Request,
     caller_uid: Annotated[str, Depends(auth_user)],
     db: Annotated[Session, Depends(get_db)]
 ):
-    return _get_user_prefs(uid=target_uid, db=db)
\ No newline at end of file
+    return response_cache.cached_response(request, "user_prefs", target_uid, lambda: _get_user_prefs(uid=target_uid, db=db))
\ No newline at end of file
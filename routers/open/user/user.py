@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from models.db import get_db
@@ -6,13 +6,15 @@ from middleware.auth import auth_user
 from sqlalchemy import text
 from typing import Annotated
 from controllers.user import _get_user_by_id
+from services import response_cache
 
 router = APIRouter()
 
 @router.get("/{target_uid}")
 def get_user_info(
     target_uid: str,
+    request: Request,
     caller_uid: Annotated[str, Depends(auth_user)],
     db: Annotated[Session, Depends(get_db)]
 ):
-    return _get_user_by_id(uid=target_uid, db=db)
\ No newline at end of file
+    return response_cache.cached_response(request, "user", target_uid, lambda: _get_user_by_id(uid=target_uid, db=db))
\ No newline at end of file
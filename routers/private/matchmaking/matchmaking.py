@@ -1,13 +1,18 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from middleware.auth import auth_user
 from models.db import get_db
+from services.serializers import json_response
+from schemas.matchmaking import JoinQueueSchema
 from controllers.matchmaking import (
     _get_queue, 
     _join_queue, 
     _leave_queue, 
     _exit_matchmaking,
     _poll_for_match,
+    _get_mode_timeout_seconds,
     MATCHMAKING_TIMEOUT_SECONDS,
     MATCHMAKING_POLL_INTERVAL_SECONDS
 )
@@ -25,9 +30,13 @@ def get_user_queue(uid: str = Depends(auth_user), db: Session = Depends(get_db))
 
 
 @router.post("/join")
-def enqueue(uid: str = Depends(auth_user), db: Session = Depends(get_db)):
+def enqueue(
+    payload: Optional[JoinQueueSchema] = None,
+    uid: str = Depends(auth_user),
+    db: Session = Depends(get_db),
+):
     """
-    Join matchmaking queue.
+    Join matchmaking queue, optionally for a session mode ({"mode_id": ...}, the body can be omitted).
     
     After joining, frontend should:
     1. Start polling GET /matchmaking/me/poll every 3 seconds
@@ -36,7 +45,7 @@ def enqueue(uid: str = Depends(auth_user), db: Session = Depends(get_db)):
     
     Returns queue entry information.
     """
-    queue_entry = _join_queue(uid=uid, db=db)
+    queue_entry = _join_queue(uid=uid, db=db, mode_id=payload.mode_id if payload else None)
     
     return {
         "message": "Joined matchmaking queue",
@@ -44,7 +53,7 @@ def enqueue(uid: str = Depends(auth_user), db: Session = Depends(get_db)):
         "next_steps": {
             "poll_endpoint": "/matchmaking/me/poll",
             "poll_interval_seconds": MATCHMAKING_POLL_INTERVAL_SECONDS,
-            "timeout_seconds": MATCHMAKING_TIMEOUT_SECONDS
+            "timeout_seconds": _get_mode_timeout_seconds(mode_id=queue_entry["mode_id"], db=db)
         }
     }
 
@@ -65,7 +74,7 @@ async def poll_for_match(uid: str = Depends(auth_user), db: Session = Depends(ge
     2. If status='found' or 'timeout': Stop polling, join WebSocket session
     3. If status='cancelled': Handle error state
     """
-    return await _poll_for_match(uid=uid, db=db)
+    return json_response(await _poll_for_match(uid=uid, db=db))
 
 
 @router.delete("/queue")
@@ -6,7 +6,8 @@ from middleware.auth import auth_user
 
 from schemas.profile import UserProfileSchema
 
-from controllers.profile import _get_profile, _create_profile, _update_profile
+from controllers.profile import _get_profile, _create_profile, _update_profile, _patch_profile
+from services.serializers import json_response
 
 router = APIRouter(prefix='/me')
 
@@ -18,7 +19,7 @@ def get_my_profile(uid: str = Depends(auth_user), db: Session = Depends(get_db))
     profile = _get_profile(uid=uid, db=db)
     if not profile:
          raise HTTPException(status_code=404, detail=f"Profile for user '{uid}' not found.")
-    return profile
+    return json_response(profile)
 
 @router.post("")
 def create_profile(payload: UserProfileSchema, uid: str = Depends(auth_user), db: Session = Depends(get_db)):
@@ -35,4 +36,14 @@ def update_profile(payload: UserProfileSchema, uid: str = Depends(auth_user), db
     Used to update a user's profile information. Creates the profile if it doesn't exist.
     """
     payload_dict = jsonable_encoder(payload)
-    return _update_profile(uid=uid, payload=payload_dict, db=db)
\ No newline at end of file
+    return _update_profile(uid=uid, payload=payload_dict, db=db)
+
+
+@router.patch("")
+def patch_profile(payload: UserProfileSchema, uid: str = Depends(auth_user), db: Session = Depends(get_db)):
+    """
+    Updates only the fields sent in the body (null clears a field), leaving every other field untouched.
+    Answers the list of fields that actually changed.
+    """
+    payload_dict = jsonable_encoder(payload, exclude_unset=True)
+    return _patch_profile(uid=uid, payload=payload_dict, db=db)
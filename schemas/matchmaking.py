@@ -13,4 +13,8 @@ class MatchmakingQueueSchema(BaseModel):
     enqueued_at: str
     prefs_snapshot: UserProfilePreferencesSchema
     location_snapshot: str
-    expires_at: str
\ No newline at end of file
+    expires_at: str
+
+class JoinQueueSchema(BaseModel):
+    # sessions.modes id, its time_limit is the matchmaking timeout (default MATCHMAKING_TIMEOUT_SECONDS)
+    mode_id: Optional[UUID] = None
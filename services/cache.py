@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from services import metrics
+
+"""
+THE PURPOSE OF THIS FILE IS A SMALL, THREAD-SAFE, IN-PROCESS CACHE TOOLKIT (THE CONTROLLERS RUN IN THE THREADPOOL):
+- TTLCache: AN LRU CACHE WITH A PER-ENTRY TIME TO LIVE. HITS / MISSES ARE EXPORTED AS
+  'cache_requests_total{cache,result}' ON '/metrics'
+- versions: A REGISTRY OF PER-USER DATA VERSIONS ("prefs", "profile", ...). WRITERS BUMP THE VERSION OF WHAT THEY
+  CHANGED AND READERS PUT THE CURRENT VERSIONS IN THEIR CACHE KEYS, SO A WRITE INVALIDATES EVERY DERIVED ENTRY
+  WITHOUT HAVING TO FIND THEM. STATE DERIVED IN ANOTHER SHAPE (E.G. MATCHMAKING CANDIDATE POOLS) CAN SUBSCRIBE
+  WITH versions.add_listener(fn) AND IS CALLED WITH (kind, uid) ON EVERY BUMP
+- SCOPES: versions.add_scope(kind, scope, fields) DECLARES A VERSION THAT ONLY MOVES WHEN A BUMP OF 'kind' TOUCHES
+  ONE OF 'fields' (bump(kind, uid, fields=...) FROM A PARTIAL WRITE), OR DOES NOT SAY WHICH FIELDS IT TOUCHED.
+  CACHES THAT ONLY DEPEND ON A FEW FIELDS KEY ON THE SCOPE, SO EDITING ANY OTHER FIELD KEEPS THEM WARM
+- A WRITER PASSES ITS SESSION (bump(kind, uid, db=db)): THE BUMP IS DONE RIGHT AWAY AND AGAIN WHEN THAT TRANSACTION
+  COMMITS, SO AN ENTRY A CONCURRENT READER RE-CACHED FROM THE OLD ROWS BEFORE THE COMMIT IS DROPPED TOO
+
+THE REGISTRY IS BOUNDED (VERSIONS_MAXSIZE): A USER WHOSE VERSIONS WERE FORGOTTEN JUST HAS THEIR ENTRIES RELOADED.
+BOTH ARE PER WORKER PROCESS: A BUMP ON ONE WORKER IS NOT SEEN BY THE OTHERS, THE TTL IS WHAT BOUNDS HOW LONG THEY
+CAN SERVE A STALE ENTRY.
+"""
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, name: str, maxsize: int, ttl_seconds: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > now:
+                self._entries.move_to_end(key)
+                value = entry[1]
+            else:
+                if entry is not _MISSING:
+                    del self._entries[key]
+                value = _MISSING
+
+        hit = value is not _MISSING
+        metrics.inc_counter(
+            "cache_requests_total",
+            description="In-process cache lookups, by cache and result",
+            cache=self.name, result="hit" if hit else "miss",
+        )
+        return value if hit else default
+
+    def set(self, key: Hashable, value: Any):
+        expires = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# (kind, uid) versions kept per worker, the least recently used ones are forgotten beyond that
+VERSIONS_MAXSIZE = 200_000
+
+
+class VersionRegistry:
+    """
+    Versions are drawn from one counter shared by every (kind, uid), so a version is never handed out twice. The map
+    is an LRU of 'maxsize' entries: a forgotten (kind, uid) reads as the counter value of the last eviction, which
+    differs from anything cached under a version it had since its last bump, so readers reload instead of hitting.
+    """
+
+    def __init__(self, maxsize: int = VERSIONS_MAXSIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._versions: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._counter = 0
+        # counter value at the last eviction, the version of every (kind, uid) not in the map
+        self._floor = 0
+        self._listeners: List[Callable[[str, str], None]] = []
+        # kind -> [(scope, fields)]
+        self._scopes: Dict[str, List[Tuple[str, FrozenSet[str]]]] = {}
+
+    def add_listener(self, listener: Callable[[str, str], None]):
+        self._listeners.append(listener)
+
+    def add_scope(self, kind: str, scope: str, fields: Iterable[str]):
+        """Version 'scope' follows the bumps of 'kind' that touch one of 'fields' (or do not say what they touched)."""
+        self._scopes.setdefault(kind, []).append((scope, frozenset(fields)))
+
+    def get(self, kind: str, uid: str) -> int:
+        key = (kind, str(uid))
+        with self._lock:
+            version = self._versions.get(key)
+            if version is None:
+                return self._floor
+            self._versions.move_to_end(key)
+            return version
+
+    def bump(self, kind: str, uid: str, fields: Optional[Iterable[str]] = None, db: Optional[Session] = None) -> int:
+        """Bump 'kind' and its scopes concerned by 'fields' (all of them when None), returns the new 'kind' version.
+
+        With 'db', the same bump is done again when that session's transaction commits.
+        """
+        uid = str(uid)
+        if db is not None:
+            db.info.setdefault(_INFO_KEY, []).append((kind, uid, None if fields is None else tuple(fields)))
+        touched = None if fields is None else frozenset(fields)
+        kinds = [kind] + [
+            scope for scope, scope_fields in self._scopes.get(kind, ())
+            if touched is None or scope_fields & touched
+        ]
+        with self._lock:
+            for bumped in kinds:
+                self._counter += 1
+                self._versions[(bumped, uid)] = self._counter
+                self._versions.move_to_end((bumped, uid))
+            version = self._versions[(kind, uid)]
+            while len(self._versions) > self.maxsize:
+                self._versions.popitem(last=False)
+                self._floor = self._counter
+        for bumped in kinds:
+            for listener in self._listeners:
+                listener(bumped, uid)
+        return version
+
+
+versions = VersionRegistry()
+_INFO_KEY = "versions_bumped"
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(db: Session):
+    for kind, uid, fields in dict.fromkeys(db.info.pop(_INFO_KEY, ())):
+        versions.bump(kind, uid, fields=fields)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(db: Session):
+    # nothing was written, the bumps already done only cost a reload
+    db.info.pop(_INFO_KEY, None)
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from models.db import SessionLocal
+from services import metrics, matchmaking_state
+
+"""
+THE PURPOSE OF THIS FILE IS TO PERIODICALLY REMOVE DEAD MATCHMAKING ROWS SO THE HOT SCANS DON'T PAY FOR THEM:
+- EXPIRED ROWS IN sessions.matchmaking_queue (THEY WERE ONLY EVER FILTERED OUT BY 'expires_at > NOW()')
+- 'open' SESSIONS WITH NO GUEST WHOSE HOST WENT OFFLINE (THEY WOULD OTHERWISE STAY OPEN FOREVER)
+
+IT IS STARTED AS A BACKGROUND TASK FROM THE 'lifespan' HOOK IN main.py. EVERY WORKER RUNS ONE, THE
+BATCHES USE 'FOR UPDATE SKIP LOCKED' SO CONCURRENT SWEEPS NEVER BLOCK EACH OTHER OR THE API.
+"""
+
+JANITOR_INTERVAL_SECONDS = 30
+JANITOR_BATCH_SIZE = 500
+JANITOR_MAX_BATCHES_PER_SWEEP = 20
+ORPHANED_SESSION_GRACE_SECONDS = 120  # how long a host may be offline before their empty session is closed
+
+log = logging.getLogger("janitor")
+
+
+def _delete_expired_queue_rows(db, batch_size: int) -> list:
+    """Delete one batch of expired queue rows and return the removed uids."""
+    stmt = text("""
+        DELETE FROM sessions.matchmaking_queue
+        WHERE uid IN (
+            SELECT uid
+            FROM sessions.matchmaking_queue
+            WHERE expires_at <= NOW()
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING uid
+    """)
+    return list(db.execute(stmt, {"batch_size": batch_size}).scalars().all())
+
+
+def _close_orphaned_sessions(db, batch_size: int) -> int:
+    """Close one batch of open, guest-less sessions whose host has been offline past the grace period."""
+    stmt = text("""
+        UPDATE sessions.sessions
+        SET status = 'closed', closed_at = NOW()
+        WHERE id IN (
+            SELECT s.id
+            FROM sessions.sessions s
+            JOIN users.users u
+                ON u.id = s.host_uid
+            WHERE s.status = 'open'
+              AND s.guest_uid IS NULL
+              AND s.closed_at IS NULL
+              AND u.is_online = FALSE
+              AND (u.last_seen_at IS NULL OR u.last_seen_at < NOW() - make_interval(secs => :grace_seconds))
+            LIMIT :batch_size
+            FOR UPDATE OF s SKIP LOCKED
+        )
+        RETURNING id, host_uid
+    """)
+    rows = db.execute(stmt, {"batch_size": batch_size, "grace_seconds": ORPHANED_SESSION_GRACE_SECONDS}).all()
+    matchmaking_state.touch(db, *(row.host_uid for row in rows))
+    return len(rows)
+
+
+def _sweep_in_batches(sweep, batch_size: int) -> int:
+    """Run one sweep step in committed batches until a batch comes back short."""
+    total = 0
+    for _ in range(JANITOR_MAX_BATCHES_PER_SWEEP):
+        db = SessionLocal()
+        try:
+            result = sweep(db, batch_size)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        count = result if isinstance(result, int) else len(result)
+        total += count
+        if count < batch_size:
+            break
+    return total
+
+
+def _drop_expired_exclusion_sets(db, batch_size: int) -> list:
+    from controllers.matchmaking import _drop_exclusion_set
+    from services import matchmaking_pools
+
+    uids = _delete_expired_queue_rows(db, batch_size)
+    matchmaking_state.touch(db, *uids)
+    for uid in uids:
+        _drop_exclusion_set(uid=uid)
+        matchmaking_pools.remove(uid)
+    return uids
+
+
+def sweep_once(batch_size: int = JANITOR_BATCH_SIZE) -> dict:
+    """Run one full janitor sweep (blocking) and record its metrics."""
+    started = time.perf_counter()
+    queue_rows = _sweep_in_batches(_drop_expired_exclusion_sets, batch_size)
+    queue_done = time.perf_counter()
+    sessions_closed = _sweep_in_batches(_close_orphaned_sessions, batch_size)
+    finished = time.perf_counter()
+
+    metrics.inc_counter(
+        "janitor_queue_rows_deleted_total", queue_rows,
+        description="Expired sessions.matchmaking_queue rows deleted by the janitor",
+    )
+    metrics.inc_counter(
+        "janitor_orphaned_sessions_closed_total", sessions_closed,
+        description="Open sessions without a guest closed because their host went offline",
+    )
+    metrics.observe(
+        "janitor_sweep_duration_seconds", queue_done - started,
+        description="Duration of one janitor sweep step", step="expired_queue_rows",
+    )
+    metrics.observe(
+        "janitor_sweep_duration_seconds", finished - queue_done,
+        description="Duration of one janitor sweep step", step="orphaned_sessions",
+    )
+    metrics.set_gauge(
+        "janitor_last_sweep_timestamp_seconds", time.time(),
+        description="Unix time of the last completed janitor sweep",
+    )
+
+    return {
+        "queue_rows_deleted": queue_rows,
+        "orphaned_sessions_closed": sessions_closed,
+        "duration_seconds": finished - started,
+    }
+
+
+async def run_janitor(stop: asyncio.Event, interval_seconds: float = JANITOR_INTERVAL_SECONDS):
+    """Background loop started from the lifespan hook, runs until 'stop' is set."""
+    log.info("Queue janitor started (every %ss)", interval_seconds)
+    while not stop.is_set():
+        try:
+            stats = await asyncio.to_thread(sweep_once)
+            if stats["queue_rows_deleted"] or stats["orphaned_sessions_closed"]:
+                log.info(
+                    "Janitor sweep removed %s expired queue rows and closed %s orphaned sessions in %.3fs",
+                    stats["queue_rows_deleted"], stats["orphaned_sessions_closed"], stats["duration_seconds"],
+                )
+        except SQLAlchemyError as e:
+            metrics.inc_counter("janitor_sweep_errors_total", description="Janitor sweeps that failed")
+            log.error("DB error during janitor sweep: %s", e)
+        except Exception as e:
+            metrics.inc_counter("janitor_sweep_errors_total", description="Janitor sweeps that failed")
+            log.exception("Unexpected error during janitor sweep: %s", e)
+
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval_seconds)
+        except asyncio.TimeoutError:
+            pass
+    log.info("Queue janitor stopped")
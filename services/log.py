@@ -0,0 +1,138 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from config import settings
+
+"""
+THE PURPOSE OF THIS FILE IS TO SET UP LOGGING FOR THE WHOLE APP IN ONE PLACE (CALLED ONCE FROM main.py).
+- EVERY LOG CALL ONLY PUTS THE RECORD ON AN IN-MEMORY QUEUE (QueueHandler). A SINGLE BACKGROUND THREAD
+  (QueueListener) FORMATS IT AND WRITES IT TO STDOUT, SO THE EVENT LOOP / REQUEST THREADS NEVER BLOCK ON I/O
+- RECORDS ARE STRUCTURED: ONE JSON OBJECT PER LINE (LOG_FORMAT=json) OR 'key=value' TEXT (LOG_FORMAT=text),
+  ANYTHING PASSED AS 'extra={...}' BECOMES A FIELD
+- LEVELS COME FROM SETTINGS: LOG_LEVEL FOR THE ROOT, LOG_LEVELS FOR PER-LOGGER OVERRIDES ("matchmaking=WARNING,db=INFO")
+- THE "EXPLAIN MATCH" TRACE: THE COMPATIBILITY OUTCOME (REASON CODE) OF EACH CANDIDATE PAIR IS ONLY LOGGED FOR
+  PAIRS INVOLVING MATCHMAKING_TRACE_UID, OR FOR A MATCHMAKING_TRACE_SAMPLE_RATE SHARE OF ALL PAIRS
+
+CALL SITES SHOULD USE %-STYLE ARGS (log.info("x=%s", x)), NOT f-STRINGS, SO DISABLED LEVELS NEVER FORMAT ANYTHING.
+"""
+
+EXPLAIN_LOGGER = "matchmaking.explain"
+
+# Attributes every LogRecord has, anything else on a record came from 'extra'
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict[str, object]:
+    return {key: value for key, value in vars(record).items() if key not in _RESERVED}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    The stock QueueHandler formats the record before queueing it, on the caller's thread. We only merge the
+    %-args (cheap, and it snapshots mutable args) and render tracebacks, the formatter runs in the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    """'matchmaking=WARNING, db=INFO' -> {'matchmaking': 'WARNING', 'db': 'INFO'}"""
+    levels = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        name, level = item.split("=", 1)
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """Route every logger through the queue. Idempotent, safe to call again after stop_logging()."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if settings.log_format == "json" else TextFormatter())
+
+    records = queue.SimpleQueue()
+    _listener = QueueListener(records, stream, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.handlers = [_DeferredQueueHandler(records)]
+    root.setLevel(settings.log_level.upper())
+
+    # uvicorn installs its own stream handlers, send those through the queue as well
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logging.getLogger(name).handlers = []
+        logging.getLogger(name).propagate = True
+
+    for name, level in _parse_levels(settings.log_levels).items():
+        logging.getLogger(name).setLevel(level)
+
+    # The explain trace is gated by explain_match_enabled, its records always go through
+    logging.getLogger(EXPLAIN_LOGGER).setLevel(logging.INFO)
+
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush whatever is still queued and stop the writer thread."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+
+
+def explain_match_enabled(*uids) -> bool:
+    """Whether the compatibility check for this pair should log its reasoning (trace uid or sampled)."""
+    trace_uid = settings.matchmaking_trace_uid
+    if trace_uid and any(str(uid) == trace_uid for uid in uids if uid is not None):
+        return True
+    rate = settings.matchmaking_trace_sample_rate
+    return rate > 0 and random.random() < rate
@@ -0,0 +1,93 @@
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from services import metrics
+
+"""
+THE PURPOSE OF THIS FILE IS AN IN-MEMORY REGISTRY OF THE public.* LOOKUP TABLES (genders, interests, religions, ...),
+WHICH ARE SMALL AND ALMOST NEVER CHANGE, SO TURNING AN OPTION NAME INTO ITS ID (OR BACK) IS A DICT LOOKUP INSTEAD OF
+ONE QUERY PER VALUE.
+
+- EACH TABLE IS LOADED WHOLE (ONE 'SELECT id, name') THE FIRST TIME IT IS USED AND RELOADED AFTER REFRESH_SECONDS
+- A NAME / ID THAT IS NOT IN THE LOADED COPY TRIGGERS ONE IMMEDIATE RELOAD (AT MOST EVERY MISS_RELOAD_SECONDS),
+  SO OPTIONS ADDED BY A MIGRATION ARE PICKED UP WITHOUT A RESTART
+- 'lookup_table_loads_total{table}' COUNTS THE RELOADS
+
+THE CALLERS KEEP THEIR OWN ERROR HANDLING (404 / 400 / IGNORE) FOR UNKNOWN VALUES, THIS ONLY ANSWERS None.
+"""
+
+REFRESH_SECONDS = 300
+MISS_RELOAD_SECONDS = 5
+
+_lock = threading.Lock()
+# table -> (loaded_at, name -> id, str(id) -> name)
+_tables: Dict[str, Tuple[float, Dict[str, Any], Dict[str, str]]] = {}
+
+
+def _load(table: str, db: Session) -> Tuple[float, Dict[str, Any], Dict[str, str]]:
+    rows = db.execute(text(f"SELECT id, name FROM public.{table}")).all()
+    entry = (
+        time.monotonic(),
+        {row.name: row.id for row in rows},
+        {str(row.id): row.name for row in rows},
+    )
+    with _lock:
+        _tables[table] = entry
+    metrics.inc_counter("lookup_table_loads_total", description="Lookup tables (re)loaded into memory", table=table)
+    return entry
+
+
+def _table(table: str, db: Session) -> Tuple[float, Dict[str, Any], Dict[str, str]]:
+    entry = _tables.get(table)
+    if entry is None or time.monotonic() - entry[0] > REFRESH_SECONDS:
+        entry = _load(table, db)
+    return entry
+
+
+def _table_with(table: str, db: Session, found) -> Tuple[float, Dict[str, Any], Dict[str, str]]:
+    """The table, reloaded once if 'found(entry)' is False and the copy is older than MISS_RELOAD_SECONDS."""
+    entry = _table(table, db)
+    if not found(entry) and time.monotonic() - entry[0] > MISS_RELOAD_SECONDS:
+        entry = _load(table, db)
+    return entry
+
+
+def name_to_id(table: str, name: str, db: Session) -> Optional[Any]:
+    if not name:
+        return None
+    _, ids, _ = _table_with(table, db, lambda entry: name in entry[1])
+    return ids.get(name)
+
+
+def names_to_ids(table: str, names: Iterable[str], db: Session) -> Dict[str, Any]:
+    """{name: id} for the names that exist (unknown names are left out, in input order)."""
+    names = [name for name in names if name]
+    _, ids, _ = _table_with(table, db, lambda entry: all(name in entry[1] for name in names))
+    return {name: ids[name] for name in names if name in ids}
+
+
+def id_to_name(table: str, id: Any, db: Session) -> Optional[str]:
+    if not id:
+        return None
+    key = str(id)
+    _, _, names = _table_with(table, db, lambda entry: key in entry[2])
+    return names.get(key)
+
+
+def ids_to_names(table: str, ids: Iterable[Any], db: Session) -> List[str]:
+    """Names for the ids that exist, in input order."""
+    keys = [str(id) for id in ids if id]
+    _, _, names = _table_with(table, db, lambda entry: all(key in entry[2] for key in keys))
+    return [names[key] for key in keys if key in names]
+
+
+def invalidate(table: Optional[str] = None):
+    with _lock:
+        if table is None:
+            _tables.clear()
+        else:
+            _tables.pop(table, None)
@@ -0,0 +1,176 @@
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from services import metrics
+from services.matchmaking_shards import ShardKey
+
+"""
+THE PURPOSE OF THIS FILE IS TO KEEP, FOR EVERY QUEUED USER, THE SET OF CURRENTLY QUEUED USERS THEY ARE MUTUALLY
+COMPATIBLE WITH ("CANDIDATE POOL"), SO A POLL IS A DICT LOOKUP + RANKING + CLAIM INSTEAD OF A QUEUE SCAN.
+
+THE POOLS ARE MAINTAINED INCREMENTALLY BY controllers.matchmaking:
+- ENQUEUE: ONE BATCH COMPATIBILITY PASS OF THE NEW ENTRANT AGAINST EVERY QUEUED ENTRY, THEN add()
+- LEAVE / MATCHED / EXPIRED: remove() DROPS THE USER FROM EVERY POOL
+- PROFILE EDITS WHILE QUEUED: THE VERSION BUMP (services.cache.versions) MARKS THE ENTRY STALE, THE NEXT POLL
+  RELOADS IT AND REDOES ITS PASS
+
+THIS IS PER WORKER PROCESS, THE QUEUE TABLE STAYS THE SOURCE OF TRUTH: EACH WORKER RECONCILES ITS POOLS WITH IT AT
+MOST EVERY SYNC_INTERVAL_SECONDS (ENTRANTS FROM OTHER WORKERS, RESTARTS), AND A POOL HIT STILL HAS TO WIN THE ROW
+CLAIM (FOR UPDATE SKIP LOCKED) BEFORE A SESSION IS CREATED.
+
+ENTRIES ARE ALSO GROUPED BY SHARD (services/matchmaking_shards.py) SO THE ENTRANT'S PASS ONLY VISITS THE SHARDS
+THAT CAN HOLD A COMPATIBLE USER ('matchmaking_shard_users{shard}' EXPORTS THE SIZES).
+
+CALLERS HOLD 'lock' AROUND A COMPATIBILITY PASS + add() SO TWO CONCURRENT ENTRANTS ALWAYS SEE EACH OTHER.
+"""
+
+SYNC_INTERVAL_SECONDS = 1.0
+
+
+@dataclass
+class PoolEntry:
+    uid: str
+    prefs: dict
+    profile: dict
+    enqueued_at: datetime
+    shard: ShardKey
+    coords: Optional[Tuple[float, float]] = None
+    max_distance: Optional[float] = None
+
+
+lock = threading.RLock()
+_entries: Dict[str, PoolEntry] = {}
+_pools: Dict[str, Set[str]] = {}
+_shards: Dict[str, Set[str]] = {}
+_stale: Set[str] = set()
+_last_sync = 0.0
+
+
+def _update_shard_gauge(shard: str):
+    metrics.set_gauge(
+        "matchmaking_shard_users",
+        len(_shards.get(shard, ())),
+        description="Queued users per matchmaking shard (this worker)",
+        shard=shard,
+    )
+
+
+def _update_gauges():
+    metrics.set_gauge("matchmaking_pool_users", len(_entries), description="Queued users with a candidate pool (this worker)")
+    metrics.set_gauge(
+        "matchmaking_pool_pairs",
+        sum(len(pool) for pool in _pools.values()) // 2,
+        description="Mutually compatible queued pairs (this worker)",
+    )
+
+
+def get(uid: str) -> Optional[PoolEntry]:
+    return _entries.get(str(uid))
+
+
+def entries() -> List[PoolEntry]:
+    with lock:
+        return list(_entries.values())
+
+
+def by_shard() -> Dict[ShardKey, List[PoolEntry]]:
+    with lock:
+        return {
+            _entries[next(iter(members))].shard: [_entries[uid] for uid in members]
+            for members in _shards.values() if members
+        }
+
+
+def known() -> Dict[str, datetime]:
+    """uid -> enqueued_at of every entry, to reconcile with the queue table."""
+    with lock:
+        return {uid: entry.enqueued_at for uid, entry in _entries.items()}
+
+
+def add(entry: PoolEntry, compatible: Iterable[str]):
+    """Insert (or replace) an entry together with the uids it is mutually compatible with."""
+    with lock:
+        _remove(entry.uid)
+        pool = {uid for uid in compatible if uid in _entries}
+        _entries[entry.uid] = entry
+        _pools[entry.uid] = pool
+        shard = str(entry.shard)
+        _shards.setdefault(shard, set()).add(entry.uid)
+        _update_shard_gauge(shard)
+        for uid in pool:
+            _pools[uid].add(entry.uid)
+        _update_gauges()
+
+
+def _remove(uid: str) -> bool:
+    entry = _entries.pop(uid, None)
+    for peer in _pools.pop(uid, ()):
+        _pools.get(peer, set()).discard(uid)
+    _stale.discard(uid)
+    if entry is None:
+        return False
+    shard = str(entry.shard)
+    members = _shards.get(shard)
+    if members is not None:
+        members.discard(uid)
+        if not members:
+            del _shards[shard]
+        _update_shard_gauge(shard)
+    return True
+
+
+def remove(uid: str) -> bool:
+    with lock:
+        removed = _remove(str(uid))
+        if removed:
+            _update_gauges()
+        return removed
+
+
+def peers(uid: str) -> List[PoolEntry]:
+    with lock:
+        return [_entries[peer] for peer in _pools.get(str(uid), ()) if peer in _entries]
+
+
+def mark_stale(kind: str, uid: str):
+    """services.cache.versions listener: a queued user's profile changed, redo their pass on the next poll."""
+    # 'profile_match' (controllers.matchmaking.MATCH_PROFILE_FIELDS) only moves when a field the pass reads changed
+    if kind != "profile_match":
+        return
+    with lock:
+        if uid in _entries:
+            _stale.add(uid)
+
+
+def take_stale() -> Set[str]:
+    with lock:
+        stale = set(_stale)
+        _stale.clear()
+        return stale
+
+
+def sync_due() -> bool:
+    """True at most once per SYNC_INTERVAL_SECONDS (per worker)."""
+    global _last_sync
+    now = time.monotonic()
+    with lock:
+        if now - _last_sync < SYNC_INTERVAL_SECONDS:
+            return False
+        _last_sync = now
+        return True
+
+
+def reset():
+    global _last_sync
+    with lock:
+        _entries.clear()
+        _pools.clear()
+        for shard in list(_shards):
+            del _shards[shard]
+            _update_shard_gauge(shard)
+        _stale.clear()
+        _last_sync = 0.0
+        _update_gauges()
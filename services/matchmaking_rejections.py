@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from services import metrics
+
+"""
+THE PURPOSE OF THIS FILE IS TO ANSWER "WHY DON'T THESE USERS MATCH?" FROM DATA INSTEAD OF LOGS.
+EVERY CANDIDATE PAIR THE MATCHMAKING ENGINE LOOKS AT ENDS IN ONE OUTCOME: COMPATIBLE, OR A SHORT REASON CODE
+("gender", "age", "distance", "extra:<field>" FOR AN extra_options FILTER, "excluded" / "no_profile" FOR CANDIDATES
+SKIPPED BEFORE THE CHECK). OUTCOMES ARE COUNTED IN HOURLY BUCKETS (LAST RETENTION_HOURS KEPT, PER WORKER PROCESS)
+AND AS THE PROMETHEUS COUNTER 'matchmaking_rejections_total{reason}'.
+
+THE INTERNAL ENDPOINT '/internal/matchmaking/rejections' RETURNS THE REPORT, WHICH IS WHAT 'preference_fields'
+SHOULD BE TUNED FROM (A FILTER THAT REJECTS MOST PAIRS IS A FILTER USERS WILL WAIT ON).
+"""
+
+RETENTION_HOURS = 48
+
+_lock = threading.Lock()
+# hour bucket (epoch seconds // 3600) -> {"checks": n, "compatible": n, "rejections": Counter(reason)}
+_buckets: Dict[int, dict] = {}
+
+
+def _bucket(hour: int) -> dict:
+    bucket = _buckets.get(hour)
+    if bucket is None:
+        bucket = _buckets[hour] = {"checks": 0, "compatible": 0, "rejections": Counter()}
+        for stale in [h for h in _buckets if h <= hour - RETENTION_HOURS]:
+            del _buckets[stale]
+    return bucket
+
+
+def record_outcome(reason: Optional[str]):
+    """Count one candidate pair, reason None means compatible."""
+    hour = int(time.time()) // 3600
+    with _lock:
+        bucket = _bucket(hour)
+        bucket["checks"] += 1
+        if reason is None:
+            bucket["compatible"] += 1
+        else:
+            bucket["rejections"][reason] += 1
+
+    metrics.inc_counter("matchmaking_candidate_checks_total", description="Candidate pairs considered by the matchmaking engine")
+    if reason is not None:
+        metrics.inc_counter(
+            "matchmaking_rejections_total",
+            description="Candidate pairs rejected by the matchmaking engine, by reason code",
+            reason=reason,
+        )
+
+
+def rejection_report(hours: int = 24) -> dict:
+    """Hourly buckets (newest first) plus totals over the window, rejection reasons sorted by count."""
+    now_hour = int(time.time()) // 3600
+    with _lock:
+        window = [(hour, _buckets[hour]) for hour in sorted(_buckets, reverse=True) if hour > now_hour - hours]
+        snapshot = [
+            (hour, bucket["checks"], bucket["compatible"], Counter(bucket["rejections"]))
+            for hour, bucket in window
+        ]
+
+    totals = Counter()
+    checks = compatible = 0
+    hourly = []
+    for hour, hour_checks, hour_compatible, rejections in snapshot:
+        checks += hour_checks
+        compatible += hour_compatible
+        totals.update(rejections)
+        hourly.append({
+            "hour": datetime.fromtimestamp(hour * 3600, tz=timezone.utc).isoformat(),
+            "checks": hour_checks,
+            "compatible": hour_compatible,
+            "rejections": dict(rejections.most_common()),
+        })
+
+    rejected = checks - compatible
+    return {
+        "hours": hours,
+        "checks": checks,
+        "compatible": compatible,
+        "rejections": dict(totals.most_common()),
+        "rejection_share": {
+            reason: round(count / rejected, 4) for reason, count in totals.most_common()
+        } if rejected else {},
+        "hourly": hourly,
+    }
+
+
+def reset():
+    with _lock:
+        _buckets.clear()
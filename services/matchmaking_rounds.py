@@ -0,0 +1,340 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from config import settings
+from models.db import SessionLocal
+from services import metrics, matchmaking_state
+from services.matchmaking_scoring import CandidateFeatures, score_candidates
+
+"""
+THE PURPOSE OF THIS FILE IS AN OPTIONAL, GLOBAL ALTERNATIVE TO THE PER-POLL PEER SEARCH (STEP 1 OF
+controllers.matchmaking._poll_for_match). WITH MATCHMAKING_ROUND_INTERVAL_MS > 0 EVERY WORKER RUNS A ROUND ON THAT
+INTERVAL (STARTED FROM THE 'lifespan' HOOK, LIKE THE JANITOR) AND THE POLLS ONLY REPORT THE OUTCOME. A ROUND:
+1. LOCKS THE QUEUED USERS WHO ARE NOT IN A SESSION ('FOR UPDATE SKIP LOCKED', SO CONCURRENT ROUNDS ON OTHER
+   WORKERS SPLIT THE QUEUE INSTEAD OF FIGHTING OVER IT). THE POLL'S JOIN / BECOME-HOST STEPS AND THE HOST-PROMOTION
+   TIMER CLAIM THE SAME ROW FIRST (controllers.matchmaking._claim_queue_row), SO A USER NEVER GETS TWO SESSIONS
+2. BUILDS THE MUTUAL-COMPATIBILITY GRAPH: SAME HARD FILTERS AS THE POLL, ONLY BETWEEN USERS QUEUED FOR THE SAME
+   SESSION MODE, CANDIDATES PRUNED BY GENDER FIRST AND CAPPED AT ROUND_CANDIDATES_PER_USER PER USER, SO THE COST
+   PER QUEUED USER STAYS CONSTANT. EDGE WEIGHT = THE services.matchmaking_scoring SCORE, AVERAGED OVER BOTH
+   DIRECTIONS
+3. SOLVES A MAXIMUM-WEIGHT MATCHING: EXACT (BITMASK DP) FOR SMALL GRAPHS, OTHERWISE GREEDY BY WEIGHT FOLLOWED BY
+   ONE PASS OF LENGTH-3 AUGMENTATIONS (REPLACE a-b BY x-a + b-y WHEN THAT IS HEAVIER). BOTH WEIGH A PAIR AS ITS
+   SCORE + PAIR_WEIGHT: A COMPATIBLE PAIR SCORING 0 IS STILL BETTER THAN TWO USERS LEFT WAITING
+4. CREATES EVERY SESSION AND REMOVES EVERY MATCHED QUEUE ROW IN ONE TRANSACTION, THEN NOTIFIES BOTH SIDES
+THE USER WHO HAS WAITED LONGER BECOMES THE HOST. USERS LEFT OVER SIMPLY WAIT FOR THE NEXT ROUND OR THEIR TIMEOUT.
+"""
+
+ROUND_MAX_USERS = 2000
+ROUND_CANDIDATES_PER_USER = 50
+ROUND_EXACT_MAX_VERTICES = 16
+# Worth of a matched pair on top of its score (scores can be 0 with the default scorers)
+PAIR_WEIGHT = 1.0
+
+log = logging.getLogger("matchmaking.rounds")
+
+Edge = Tuple[int, int, float]
+
+
+@dataclass
+class QueuedUser:
+    uid: str
+    mode_id: Optional[str]
+    prefs: dict
+    profile: dict
+    coords: Optional[Tuple[float, float]]
+    waited_seconds: float
+    enqueued_at: datetime
+
+
+def rounds_enabled() -> bool:
+    return settings.matchmaking_round_interval_ms > 0
+
+
+def _lock_queue(db: Session, limit: int) -> List[dict]:
+    stmt = text("""
+        SELECT q.uid, q.mode_id, q.prefs_snapshot, q.location_snapshot, q.lat, q.lng, q.enqueued_at
+        FROM sessions.matchmaking_queue q
+        WHERE q.expires_at > NOW()
+          AND NOT EXISTS (
+              SELECT 1
+              FROM sessions.sessions s
+              WHERE (s.host_uid = q.uid OR s.guest_uid = q.uid)
+                AND s.status = 'open'
+          )
+        ORDER BY q.enqueued_at ASC
+        LIMIT :limit
+        FOR UPDATE OF q SKIP LOCKED
+    """)
+    return [dict(row) for row in db.execute(stmt, {"limit": limit}).mappings().all()]
+
+
+def _load_users(rows: List[dict], db: Session) -> List[QueuedUser]:
+    from controllers.matchmaking import _fill_location_from_queue, _profile_coords
+    from controllers.profile import _get_profiles
+
+    profiles = _get_profiles([row["uid"] for row in rows], db)
+    now = datetime.utcnow()
+    users = []
+    for row in rows:
+        profile = profiles.get(str(row["uid"]))
+        if not profile:
+            continue
+        _fill_location_from_queue(profile, row)
+        users.append(QueuedUser(
+            uid=str(row["uid"]),
+            mode_id=row["mode_id"],
+            prefs=row["prefs_snapshot"] or {},
+            profile=profile,
+            coords=_profile_coords(profile),
+            waited_seconds=(now - row["enqueued_at"]).total_seconds(),
+            enqueued_at=row["enqueued_at"],
+        ))
+    return users
+
+
+def _features(user: QueuedUser, distance_miles: Optional[float]) -> CandidateFeatures:
+    return CandidateFeatures(
+        uid=user.uid,
+        interests=frozenset(user.profile.get("interests") or ()),
+        languages=frozenset(user.profile.get("languages_spoken") or ()),
+        distance_miles=distance_miles,
+        waited_seconds=user.waited_seconds,
+    )
+
+
+def _mode_key(user: QueuedUser) -> Optional[str]:
+    return str(user.mode_id) if user.mode_id else None
+
+
+def _build_graph(users: List[QueuedUser], db: Session, wait_horizon: float) -> List[Edge]:
+    """Mutually compatible pairs (i < j) with their symmetric score."""
+    from controllers.matchmaking import (
+        _are_preferences_compatible,
+        _calculate_distance_miles,
+        _exclusion_set,
+        _excludes,
+        _normalize_value,
+    )
+
+    # Users are only paired within the mode they queued for (as the poll's _find_open_session does)
+    by_mode: Dict[Optional[str], List[int]] = {}
+    by_mode_gender: Dict[Tuple[Optional[str], Optional[str]], List[int]] = {}
+    for i, user in enumerate(users):
+        by_mode.setdefault(_mode_key(user), []).append(i)
+        by_mode_gender.setdefault((_mode_key(user), _normalize_value(user.profile.get("gender"))), []).append(i)
+
+    edges = []
+    for i, user in enumerate(users):
+        target = _normalize_value(user.prefs.get("target_gender"))
+        if not target or target == "any":
+            pool = by_mode[_mode_key(user)]
+        else:
+            pool = by_mode_gender.get((_mode_key(user), target), [])
+
+        exclusions = _exclusion_set(user.uid, user.enqueued_at, db)
+        neighbours = []
+        for j in pool:
+            if j <= i:
+                continue
+            other = users[j]
+            if _excludes(exclusions, other.uid):
+                continue
+            if not _are_preferences_compatible(user.prefs, other.prefs, user.profile, other.profile):
+                continue
+            distance = (
+                _calculate_distance_miles(*user.coords, *other.coords) if user.coords and other.coords else None
+            )
+            neighbours.append((j, distance))
+            if len(neighbours) >= ROUND_CANDIDATES_PER_USER:
+                break
+
+        if not neighbours:
+            continue
+
+        forward = score_candidates(
+            _features(user, None), [_features(users[j], d) for j, d in neighbours], wait_horizon
+        )
+        for (j, distance), score in zip(neighbours, forward):
+            backward = score_candidates(_features(users[j], None), [_features(user, distance)], wait_horizon)[0]
+            edges.append((i, j, (score + backward) / 2))
+    return edges
+
+
+def _exact_matching(edges: List[Edge]) -> List[Edge]:
+    """Maximum-weight matching by DP over vertex subsets, only for graphs up to ROUND_EXACT_MAX_VERTICES."""
+    vertices = sorted({v for i, j, _ in edges for v in (i, j)})
+    index = {v: n for n, v in enumerate(vertices)}
+    adjacency: Dict[int, List[Tuple[int, float, Edge]]] = {n: [] for n in range(len(vertices))}
+    for edge in edges:
+        a, b = index[edge[0]], index[edge[1]]
+        adjacency[a].append((b, edge[2], edge))
+        adjacency[b].append((a, edge[2], edge))
+    full = (1 << len(vertices)) - 1
+
+    @lru_cache(maxsize=None)
+    def best(used: int) -> Tuple[float, Tuple[Edge, ...]]:
+        if used == full:
+            return 0.0, ()
+        first = (~used & (used + 1)).bit_length() - 1  # lowest vertex not decided yet
+        used_first = used | (1 << first)
+        result = best(used_first)  # leave it unmatched
+        for other, weight, edge in adjacency[first]:
+            if used_first & (1 << other):
+                continue
+            rest_weight, rest = best(used_first | (1 << other))
+            if rest_weight + weight + PAIR_WEIGHT > result[0]:
+                result = (rest_weight + weight + PAIR_WEIGHT, rest + (edge,))
+        return result
+
+    return list(best(0)[1])
+
+
+def _greedy_matching(edges: List[Edge]) -> List[Edge]:
+    """Heaviest edges first, then one pass of length-3 augmentations."""
+    matched: Dict[int, Edge] = {}
+    for edge in sorted(edges, key=lambda e: e[2], reverse=True):
+        i, j, _ = edge
+        if i not in matched and j not in matched:
+            matched[i] = matched[j] = edge
+
+    adjacency: Dict[int, List[Edge]] = {}
+    for edge in edges:
+        adjacency.setdefault(edge[0], []).append(edge)
+        adjacency.setdefault(edge[1], []).append(edge)
+
+    def best_free_neighbour(vertex: int, exclude: int) -> Optional[Edge]:
+        free = [e for e in adjacency.get(vertex, ()) if (e[1] if e[0] == vertex else e[0]) not in matched
+                and (e[1] if e[0] == vertex else e[0]) != exclude]
+        return max(free, key=lambda e: e[2]) if free else None
+
+    for edge in {id(e): e for e in matched.values()}.values():
+        a, b, weight = edge
+        if matched.get(a) is not edge:
+            continue
+        left = best_free_neighbour(a, exclude=b)
+        right = best_free_neighbour(b, exclude=a)
+        if not left or not right:
+            continue
+        x = left[1] if left[0] == a else left[0]
+        y = right[1] if right[0] == b else right[0]
+        if x == y or left[2] + right[2] + PAIR_WEIGHT <= weight:
+            continue
+        for vertex, new_edge in ((a, left), (x, left), (b, right), (y, right)):
+            matched[vertex] = new_edge
+
+    return list({id(e): e for e in matched.values()}.values())
+
+
+def solve_matching(edges: List[Edge]) -> List[Edge]:
+    vertices = {v for i, j, _ in edges for v in (i, j)}
+    if len(vertices) <= ROUND_EXACT_MAX_VERTICES:
+        return _exact_matching(edges)
+    return _greedy_matching(edges)
+
+
+def _create_sessions(pairs: List[Tuple[QueuedUser, QueuedUser]], db: Session) -> List[dict]:
+    """One INSERT for every session and one DELETE for every matched queue row."""
+    stmt = text("""
+        INSERT INTO sessions.sessions (status, host_uid, guest_uid, mode_id)
+        SELECT 'open', pair.host_uid, pair.guest_uid, pair.mode_id
+        FROM unnest(
+            CAST(:hosts AS uuid[]),
+            CAST(:guests AS uuid[]),
+            CAST(:modes AS uuid[])
+        ) AS pair(host_uid, guest_uid, mode_id)
+        RETURNING id, host_uid, guest_uid
+    """)
+    sessions = db.execute(stmt, {
+        "hosts": [host.uid for host, _ in pairs],
+        "guests": [guest.uid for _, guest in pairs],
+        "modes": [str(host.mode_id) if host.mode_id else None for host, _ in pairs],
+    }).mappings().all()
+
+    db.execute(
+        text("DELETE FROM sessions.matchmaking_queue WHERE uid = ANY(CAST(:uids AS uuid[]))"),
+        {"uids": [user.uid for pair in pairs for user in pair]},
+    )
+    matchmaking_state.touch(db, *(user.uid for pair in pairs for user in pair))
+    return [dict(row) for row in sessions]
+
+
+def run_round(limit: int = ROUND_MAX_USERS) -> List[dict]:
+    """One matching round (blocking). Returns the created sessions (id, host_uid, guest_uid)."""
+    from controllers.matchmaking import MATCHMAKING_TIMEOUT_SECONDS, _drop_exclusion_set
+    from services.matchmaking_timers import cancel_host_promotion
+    from services import matchmaking_pools
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        users = _load_users(_lock_queue(db, limit), db)
+        edges = _build_graph(users, db, wait_horizon=MATCHMAKING_TIMEOUT_SECONDS)
+        matching = solve_matching(edges)
+
+        pairs = []
+        for i, j, _ in matching:
+            # Whoever has waited longer hosts
+            host, guest = (users[i], users[j]) if users[i].waited_seconds >= users[j].waited_seconds else (users[j], users[i])
+            pairs.append((host, guest))
+
+        sessions = _create_sessions(pairs, db) if pairs else []
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    for host, guest in pairs:
+        for uid in (host.uid, guest.uid):
+            _drop_exclusion_set(uid=uid)
+            matchmaking_pools.remove(uid)
+            cancel_host_promotion(uid=uid)
+
+    elapsed = time.perf_counter() - started
+    metrics.observe("matchmaking_round_duration_seconds", elapsed, description="Duration of one batch matching round")
+    metrics.set_gauge("matchmaking_round_queue_size", len(users), description="Queued users considered by the last round")
+    metrics.set_gauge("matchmaking_round_edges", len(edges), description="Compatible pairs found by the last round")
+    metrics.inc_counter("matchmaking_round_sessions_total", len(sessions), description="Sessions created by batch matching rounds")
+    if sessions:
+        log.info("Round matched %s pairs out of %s queued users (%s edges) in %.3fs",
+                 len(sessions), len(users), len(edges), elapsed)
+    return sessions
+
+
+async def run_matchmaking_rounds(stop: asyncio.Event, interval_ms: Optional[int] = None):
+    """Background loop started from the lifespan hook when MATCHMAKING_ROUND_INTERVAL_MS > 0."""
+    from controllers.matchmaking import _notify_users_of_session_found
+
+    interval_seconds = (interval_ms or settings.matchmaking_round_interval_ms) / 1000
+    log.info("Matchmaking rounds started (every %.3fs)", interval_seconds)
+    while not stop.is_set():
+        try:
+            sessions = await asyncio.to_thread(run_round)
+            for session in sessions:
+                await _notify_users_of_session_found(
+                    host_uid=str(session["host_uid"]),
+                    session_id=str(session["id"]),
+                    guest_uid=str(session["guest_uid"]),
+                )
+        except SQLAlchemyError as e:
+            metrics.inc_counter("matchmaking_round_errors_total", description="Batch matching rounds that failed")
+            log.error("DB error during matchmaking round: %s", e)
+        except Exception:
+            metrics.inc_counter("matchmaking_round_errors_total", description="Batch matching rounds that failed")
+            log.exception("Unexpected error during matchmaking round")
+
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval_seconds)
+        except asyncio.TimeoutError:
+            pass
+    log.info("Matchmaking rounds stopped")
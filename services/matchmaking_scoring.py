@@ -0,0 +1,108 @@
+import heapq
+import math
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+"""
+THE PURPOSE OF THIS FILE IS TO RANK THE CANDIDATES THAT PASSED THE HARD FILTERS (controllers.matchmaking
+_compatibility_rejection) INSTEAD OF TAKING THE FIRST COMPATIBLE ONE IN QUEUE ORDER.
+
+EVERY SCORER TAKES THE SEEKER AND THE WHOLE CANDIDATE LIST AND RETURNS ONE SCORE IN [0, 1] PER CANDIDATE, SO EACH
+FEATURE IS COMPUTED AS ONE PASS OVER THE BATCH. THE FINAL SCORE IS THE WEIGHTED SUM, AND THE TOP k IS PICKED WITH
+heapq.nlargest (TIES GO TO THE CANDIDATE WHO HAS WAITED LONGEST, SO FAIRNESS IS THE TIE-BREAKER).
+
+DEFAULT SCORERS: SHARED INTERESTS, LANGUAGES SPOKEN OVERLAP, DISTANCE DECAY AND A WAIT-TIME BOOST.
+NEW ONES ARE PLUGGED IN WITH '@register_scorer("name", weight=...)', AND A WEIGHT OF 0 TURNS ONE OFF.
+"""
+
+# Score halves roughly every DISTANCE_HALF_LIFE_MILES
+DISTANCE_HALF_LIFE_MILES = 15.0
+
+
+@dataclass(frozen=True)
+class CandidateFeatures:
+    """What the scorers see of a user. distance_miles is relative to the seeker (None for the seeker / unknown)."""
+    uid: str
+    interests: FrozenSet[str] = frozenset()
+    languages: FrozenSet[str] = frozenset()
+    distance_miles: Optional[float] = None
+    waited_seconds: float = 0.0
+
+
+# Arguments: seeker, candidates, wait horizon in seconds (the matchmaking timeout)
+Scorer = Callable[[CandidateFeatures, Sequence[CandidateFeatures], float], List[float]]
+
+SCORERS: Dict[str, Tuple[float, Scorer]] = {}
+
+
+def register_scorer(name: str, weight: float):
+    """Add (or replace) a scorer in the ranking stage."""
+
+    def decorator(scorer: Scorer) -> Scorer:
+        SCORERS[name] = (weight, scorer)
+        return scorer
+
+    return decorator
+
+
+def set_weight(name: str, weight: float):
+    _, scorer = SCORERS[name]
+    SCORERS[name] = (weight, scorer)
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@register_scorer("shared_interests", weight=0.35)
+def _shared_interests(seeker, candidates, wait_horizon):
+    return [_jaccard(seeker.interests, c.interests) for c in candidates]
+
+
+@register_scorer("languages_spoken", weight=0.2)
+def _languages_spoken(seeker, candidates, wait_horizon):
+    # One shared language is what matters, so overlap is measured against the smaller set
+    mine = seeker.languages
+    return [
+        len(mine & c.languages) / min(len(mine), len(c.languages)) if mine and c.languages else 0.0
+        for c in candidates
+    ]
+
+
+@register_scorer("distance_decay", weight=0.25)
+def _distance_decay(seeker, candidates, wait_horizon):
+    decay = math.log(2) / DISTANCE_HALF_LIFE_MILES
+    return [math.exp(-decay * c.distance_miles) if c.distance_miles is not None else 0.0 for c in candidates]
+
+
+@register_scorer("wait_time", weight=0.2)
+def _wait_time(seeker, candidates, wait_horizon):
+    if wait_horizon <= 0:
+        return [0.0 for _ in candidates]
+    return [min(1.0, c.waited_seconds / wait_horizon) for c in candidates]
+
+
+def score_candidates(seeker: CandidateFeatures, candidates: Sequence[CandidateFeatures], wait_horizon: float) -> List[float]:
+    totals = [0.0] * len(candidates)
+    for weight, scorer in SCORERS.values():
+        if not weight:
+            continue
+        for i, value in enumerate(scorer(seeker, candidates, wait_horizon)):
+            totals[i] += weight * value
+    return totals
+
+
+def top_candidates(
+    seeker: CandidateFeatures,
+    candidates: Sequence[CandidateFeatures],
+    k: int = 1,
+    wait_horizon: float = 15.0,
+) -> List[Tuple[float, CandidateFeatures]]:
+    """The k best (score, candidate) pairs, best first."""
+    if not candidates:
+        return []
+    scores = score_candidates(seeker, candidates, wait_horizon)
+    best = heapq.nlargest(k, range(len(candidates)), key=lambda i: (scores[i], candidates[i].waited_seconds))
+    return [(scores[i], candidates[i]) for i in best]
@@ -0,0 +1,92 @@
+import math
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from config import settings
+
+"""
+THE PURPOSE OF THIS FILE IS TO PARTITION THE MATCHMAKING QUEUE INTO SHARDS SO A SEEKER ONLY LOOKS AT USERS WHO
+COULD POSSIBLY BE COMPATIBLE WITH THEM.
+
+A SHARD KEY IS '<geo cell>|<gender>><target gender>':
+- GEO CELL: 'lat_index:lng_index' OF A MATCHMAKING_SHARD_CELL_DEGREES GRID OVER location_snapshot, OR '*' WHEN
+  THE USER HAS NO LOCATION (THE DISTANCE CHECK IS SKIPPED FOR THEM, SO THEY FIT ANY CELL)
+- GENDER PAIR: THE USER'S OWN GENDER AND THEIR prefs_snapshot TARGET GENDER ('any' WHEN UNSET)
+
+shard_accepts() IS THE SHARD-LEVEL VERSION OF THE GENDER AND DISTANCE CHECKS OF
+controllers.matchmaking._compatibility_rejection: IT MAY LET AN INCOMPATIBLE PAIR THROUGH (THE PAIR CHECK STILL
+RUNS) BUT NEVER DROPS A COMPATIBLE ONE. THE KEY IS ALSO STORED IN sessions.matchmaking_queue.shard_key, SO
+SHARDS CAN BE READ (AND OWNED) INDEPENDENTLY.
+"""
+
+NO_CELL = "*"
+ANY_GENDER = "any"
+
+# A max_distance at least this large reaches every cell on Earth (half the circumference)
+UNBOUNDED_DISTANCE_MILES = 12500
+
+
+@dataclass(frozen=True)
+class ShardKey:
+    cell: Optional[Tuple[int, int]]
+    gender: str
+    target: str
+
+    def __str__(self) -> str:
+        cell = f"{self.cell[0]}:{self.cell[1]}" if self.cell else NO_CELL
+        return f"{cell}|{self.gender}>{self.target}"
+
+
+def make_shard_key(coords: Optional[Tuple[float, float]], gender: Optional[str], target: Optional[str]) -> ShardKey:
+    """coords is (lat, lng) or None, gender / target are already normalized (controllers.matchmaking._normalize_value)."""
+    size = settings.matchmaking_shard_cell_degrees
+    cell = (math.floor(coords[0] / size), math.floor(coords[1] / size)) if coords else None
+    return ShardKey(cell=cell, gender=gender or "", target=target or ANY_GENDER)
+
+
+def parse_shard_key(key: str) -> ShardKey:
+    cell, genders = key.split("|", 1)
+    gender, target = genders.split(">", 1)
+    if cell == NO_CELL:
+        return ShardKey(cell=None, gender=gender, target=target)
+    lat_index, lng_index = cell.split(":")
+    return ShardKey(cell=(int(lat_index), int(lng_index)), gender=gender, target=target)
+
+
+def _accepts_gender(target: str, actual: str) -> bool:
+    return target == ANY_GENDER or target == actual
+
+
+def _min_distance_to_cell(coords: Tuple[float, float], cell: Tuple[int, int]) -> float:
+    """Lower bound of the distance (miles) from coords to any point of the cell."""
+    from controllers.matchmaking import _calculate_distance_miles
+
+    size = settings.matchmaking_shard_cell_degrees
+    south, west = cell[0] * size, cell[1] * size
+    center = (south + size / 2, west + size / 2)
+    # Farthest point of a lat/lng rectangle from its center is the corner nearest the equator
+    radius = max(
+        _calculate_distance_miles(*center, lat, lng)
+        for lat in (south, south + size)
+        for lng in (west, west + size)
+    )
+    return max(0.0, _calculate_distance_miles(*coords, *center) - radius * 1.01)
+
+
+def is_unbounded(coords: Optional[Tuple[float, float]], max_distance: Optional[float]) -> bool:
+    """Whether a seeker has to look at every geo cell (no location, or a radius covering the globe)."""
+    return coords is None or max_distance is None or max_distance >= UNBOUNDED_DISTANCE_MILES
+
+
+def shard_accepts(
+    seeker: ShardKey,
+    seeker_coords: Optional[Tuple[float, float]],
+    max_distance: Optional[float],
+    other: ShardKey,
+) -> bool:
+    """Whether users in shard 'other' may be compatible with the seeker (gender both ways + seeker's radius)."""
+    if not _accepts_gender(seeker.target, other.gender) or not _accepts_gender(other.target, seeker.gender):
+        return False
+    if other.cell is None or is_unbounded(seeker_coords, max_distance) or other.cell == seeker.cell:
+        return True
+    return _min_distance_to_cell(seeker_coords, other.cell) <= max_distance
@@ -0,0 +1,118 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config import settings
+from services import metrics
+from services.cache import TTLCache, versions
+
+"""
+THE PURPOSE OF THIS FILE IS AN IN-MEMORY SNAPSHOT OF EVERY ACTIVE USER'S MATCHMAKING STATE, SO THE ENDPOINTS CLIENTS
+HIT ON EVERY PAGE LOAD / EVERY FEW SECONDS (GET /matchmaking/me/session, /matchmaking/me/poll) DON'T HAVE TO START
+WITH THE SESSION / QUEUE / PARTNER NAME LOOKUPS:
+    {"state": "idle"}
+    {"state": "searching", "enqueued_at", "expires_at", "mode_id", "prefs_snapshot", "timeout_seconds"}
+    {"state": "in_session", "role", "session" (THE sessions.sessions ROW), "other_user_uid", "other_user_first_name"}
+
+- EVERY TRANSITION (JOIN / LEAVE QUEUE, SESSION CREATED / JOINED / LEFT, JANITOR EXPIRY, BATCH ROUNDS) CALLS
+  touch(db, uid...): THE USER'S "matchmaking" VERSION (services.cache.versions) IS BUMPED RIGHT AWAY AND AGAIN WHEN
+  THAT TRANSACTION COMMITS, SO A SNAPSHOT LOADED FROM THE DB BEFORE THE COMMIT IS NEVER SERVED. A TRANSITION THAT
+  KNOWS THE NEW STATE (JOINING THE QUEUE) PASSES IT AND IT IS STORED AT COMMIT
+- A READER TAKES version(uid) BEFORE LOADING FROM THE DB AND put()s THE SNAPSHOT UNDER IT: AFTER A COLD START (OR
+  A TRANSITION) THE FIRST READ GOES TO THE DB, THE NEXT ONES ARE SERVED FROM MEMORY
+
+PER WORKER LIKE EVERY CACHE HERE: A TRANSITION ON ANOTHER WORKER IS ONLY SEEN WHEN THE SNAPSHOT EXPIRES
+(MATCHMAKING_STATE_TTL_SECONDS). THE DB GUARDS OF THE TRANSITIONS (ALREADY IN A SESSION, ROW CLAIMS) STILL APPLY,
+AND THE POLL CHECKS THE DB BEFORE ANY WRITE IT WOULD DO FROM A 'searching' SNAPSHOT.
+"""
+
+VERSION_KIND = "matchmaking"
+
+_snapshots = TTLCache(
+    "matchmaking_state",
+    maxsize=settings.matchmaking_state_cache_size,
+    ttl_seconds=settings.matchmaking_state_ttl_seconds,
+)
+_INFO_KEY = "matchmaking_state_touched"
+
+
+def version(uid: str) -> int:
+    return versions.get(VERSION_KIND, uid)
+
+
+def get(uid: str) -> Optional[Dict[str, Any]]:
+    """The user's current snapshot, None on a miss or when a transition happened since it was taken."""
+    entry = _snapshots.get(str(uid))
+    if entry is None:
+        return None
+    snapshot_version, snapshot = entry
+    if snapshot_version != version(uid):
+        return None
+    if snapshot["state"] == "searching" and snapshot["expires_at"] <= datetime.utcnow():
+        # the janitor is about to delete the queue row, let the DB say what happened
+        return None
+    return snapshot
+
+
+def put(uid: str, loaded_at_version: int, snapshot: Dict[str, Any]):
+    _snapshots.set(str(uid), (loaded_at_version, snapshot))
+
+
+def drop(uid: str):
+    """Forget the user's snapshot (found stale by a DB check), the next read loads it again."""
+    _snapshots.delete(str(uid))
+
+
+def touch(db: Session, *uids: Any, snapshot: Optional[Dict[str, Any]] = None):
+    """A matchmaking transition of 'uids' is being written in 'db': drop their snapshots now and at commit."""
+    touched = db.info.setdefault(_INFO_KEY, {})
+    uids = [str(uid) for uid in uids if uid is not None]
+    for uid in uids:
+        versions.bump(VERSION_KIND, uid)
+        touched[uid] = snapshot if len(uids) == 1 else None
+    metrics.inc_counter("matchmaking_state_transitions_total", len(uids), description="Matchmaking state transitions (snapshot invalidations)")
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(db: Session):
+    touched = db.info.pop(_INFO_KEY, None)
+    if not touched:
+        return
+    for uid, snapshot in touched.items():
+        committed = versions.bump(VERSION_KIND, uid)
+        if snapshot is not None:
+            put(uid, committed, snapshot)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(db: Session):
+    # nothing was written, the bumps done by touch() only cost a reload
+    db.info.pop(_INFO_KEY, None)
+
+
+def searching(queue_row, timeout_seconds: int) -> Dict[str, Any]:
+    return {
+        "state": "searching",
+        "enqueued_at": queue_row["enqueued_at"],
+        "expires_at": queue_row["expires_at"],
+        "mode_id": queue_row["mode_id"],
+        "prefs_snapshot": queue_row["prefs_snapshot"],
+        "timeout_seconds": timeout_seconds,
+    }
+
+
+def in_session(uid: str, session: Dict[str, Any], other_first_name: Optional[str]) -> Dict[str, Any]:
+    host_uid = str(session["host_uid"]) if session.get("host_uid") else None
+    guest_uid = str(session["guest_uid"]) if session.get("guest_uid") else None
+    return {
+        "state": "in_session",
+        "role": "guest" if guest_uid == str(uid) else "host",
+        "session": session,
+        "other_user_uid": guest_uid if str(uid) == host_uid else host_uid,
+        "other_user_first_name": other_first_name,
+    }
+
+
+IDLE = {"state": "idle"}
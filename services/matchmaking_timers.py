@@ -0,0 +1,116 @@
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.exc import SQLAlchemyError
+
+from models.db import SessionLocal
+
+"""
+THE PURPOSE OF THIS FILE IS TO PROMOTE QUEUED USERS TO HOSTS EXACTLY WHEN THEIR MATCHMAKING TIMEOUT EXPIRES,
+INSTEAD OF WAITING FOR THEIR NEXT '/matchmaking/me/poll' TO NOTICE. EVERY ENQUEUE SCHEDULES ONE TIMER ON THE
+EVENT LOOP (loop.call_later), LEAVING THE QUEUE CANCELS IT. WHEN IT FIRES THE USER BECOMES A HOST AND THE RESULT
+IS PUSHED TO THEM OVER THE SOCKET AS 'matchmaking_timeout' (SAME PAYLOAD AS A 'timeout' POLL RESPONSE).
+
+THE CONTROLLERS RUN IN THE THREADPOOL (SYNC ROUTES), SO SCHEDULING / CANCELLING IS HANDED TO THE LOOP WITH
+call_soon_threadsafe. THE LOOP IS BOUND IN THE 'lifespan' HOOK; WITHOUT IT (SCRIPTS, BENCHMARKS) TIMERS ARE NO-OPS.
+"""
+
+log = logging.getLogger("matchmaking")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_timers: Dict[str, asyncio.TimerHandle] = {}
+
+
+def bind_loop(loop: asyncio.AbstractEventLoop):
+    global _loop
+    _loop = loop
+
+
+def unbind_loop():
+    global _loop
+    for handle in _timers.values():
+        handle.cancel()
+    _timers.clear()
+    _loop = None
+
+
+def _on_loop(callback, *args):
+    if _loop is None or _loop.is_closed():
+        return
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+
+    if running is _loop:
+        callback(*args)
+    else:
+        _loop.call_soon_threadsafe(callback, *args)
+
+
+def _schedule(uid: str, delay_seconds: float):
+    existing = _timers.pop(uid, None)
+    if existing:
+        existing.cancel()
+    _timers[uid] = _loop.call_later(max(0.0, delay_seconds), _fire, uid)
+
+
+def _cancel(uid: str):
+    handle = _timers.pop(uid, None)
+    if handle:
+        handle.cancel()
+
+
+def _fire(uid: str):
+    _timers.pop(uid, None)
+    _loop.create_task(_promote(uid))
+
+
+def schedule_host_promotion(uid: str, delay_seconds: float):
+    """(Re)schedule the host promotion for a queued user. Safe to call from any thread."""
+    _on_loop(_schedule, str(uid), delay_seconds)
+
+
+def cancel_host_promotion(uid: str):
+    """Cancel a pending host promotion (user left the queue or was matched). Safe to call from any thread."""
+    _on_loop(_cancel, str(uid))
+
+
+def _promote_blocking(uid: str) -> Optional[dict]:
+    from controllers.matchmaking import _promote_to_host_on_timeout
+
+    db = SessionLocal()
+    try:
+        result = _promote_to_host_on_timeout(uid=uid, db=db)
+        db.commit()
+        return result
+    except HTTPException as e:
+        # e.g. 409 when a concurrent poll already made them a host or matched them
+        db.rollback()
+        log.info("Host promotion for %s skipped: %s", uid, e.detail)
+        return None
+    except SQLAlchemyError as e:
+        db.rollback()
+        log.error("DB error promoting %s to host on timeout: %s", uid, e)
+        return None
+    finally:
+        db.close()
+
+
+async def _promote(uid: str):
+    result = await asyncio.to_thread(_promote_blocking, uid)
+    if not result:
+        return
+
+    from services.sockets import socket_manager
+    if socket_manager is None:
+        return
+
+    try:
+        await socket_manager.emit("matchmaking_timeout", jsonable_encoder(result), room=f"user:{uid}")
+        log.info("Pushed server-side matchmaking timeout to %s", uid)
+    except Exception as e:
+        log.error("Failed to push matchmaking timeout to %s: %s", uid, e)
@@ -0,0 +1,118 @@
+import os
+import threading
+from typing import Dict, Tuple
+
+"""
+THE PURPOSE OF THIS FILE IS TO KEEP A SMALL IN-PROCESS METRICS REGISTRY (COUNTERS, GAUGES AND HISTOGRAMS)
+AND RENDER IT IN THE PROMETHEUS TEXT EXPOSITION FORMAT FOR THE '/metrics' ENDPOINT.
+VALUES ARE PER WORKER PROCESS, EVERY SAMPLE CARRIES A 'worker' LABEL WITH THE PID SO SCRAPES CAN BE TOLD APART.
+
+USAGE: inc_counter("janitor_sweeps_total", description="...") / observe("x_seconds", 0.12, route="/foo")
+"""
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+WORKER = str(os.getpid())
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_types: Dict[str, str] = {}
+_descriptions: Dict[str, str] = {}
+_counters: Dict[str, Dict[LabelKey, float]] = {}
+_gauges: Dict[str, Dict[LabelKey, float]] = {}
+_histograms: Dict[str, Dict[LabelKey, list]] = {}  # [bucket counts..., sum, count]
+_buckets: Dict[str, tuple] = {}
+
+
+def _label_key(labels: dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _register(name: str, kind: str, description: str):
+    if name not in _types:
+        _types[name] = kind
+        _descriptions[name] = description
+
+
+def inc_counter(name: str, value: float = 1, description: str = "", **labels):
+    """Increment a monotonically increasing counter."""
+    key = _label_key(labels)
+    with _lock:
+        _register(name, "counter", description)
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + value
+
+
+def set_gauge(name: str, value: float, description: str = "", **labels):
+    """Set a gauge to an absolute value."""
+    key = _label_key(labels)
+    with _lock:
+        _register(name, "gauge", description)
+        _gauges.setdefault(name, {})[key] = value
+
+
+def add_gauge(name: str, delta: float, description: str = "", **labels):
+    """Move a gauge up or down by delta."""
+    key = _label_key(labels)
+    with _lock:
+        _register(name, "gauge", description)
+        series = _gauges.setdefault(name, {})
+        series[key] = series.get(key, 0) + delta
+
+
+def observe(name: str, value: float, description: str = "", buckets: tuple = DEFAULT_BUCKETS, **labels):
+    """Record one observation in a histogram."""
+    key = _label_key(labels)
+    with _lock:
+        _register(name, "histogram", description)
+        bounds = _buckets.setdefault(name, tuple(buckets))
+        series = _histograms.setdefault(name, {})
+        values = series.get(key)
+        if values is None:
+            values = series[key] = [0] * (len(bounds) + 2)
+        for i, bound in enumerate(bounds):
+            if value <= bound:
+                values[i] += 1
+        values[-2] += value
+        values[-1] += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = (("worker", WORKER),) + key + extra
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus() -> str:
+    """Render every registered metric in the Prometheus text exposition format (0.0.4)."""
+    lines = []
+    with _lock:
+        for name in sorted(_types):
+            kind = _types[name]
+            if _descriptions.get(name):
+                lines.append(f"# HELP {name} {_descriptions[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+            if kind == "counter":
+                for key, value in _counters.get(name, {}).items():
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+            elif kind == "gauge":
+                for key, value in _gauges.get(name, {}).items():
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+            elif kind == "histogram":
+                bounds = _buckets[name]
+                for key, values in _histograms.get(name, {}).items():
+                    for bound, count in zip(bounds, values):
+                        lines.append(f"{name}_bucket{_format_labels(key, (('le', repr(float(bound))),))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(key, (('le', '+Inf'),))} {values[-1]}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(values[-2])}")
+                    lines.append(f"{name}_count{_format_labels(key)} {values[-1]}")
+    return "\n".join(lines) + "\n"
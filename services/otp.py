@@ -40,8 +40,6 @@ def send_otp(phone: str):
     if not is_valid_phone(e164_phone):
         raise ValueError("Phone number is invalid. It must be a 10-digit US/Canada number or full E.164 format.")
 
-    print(is_valid_phone(e164_phone))
-    
     # Use the validated, formatted E.164 number for Supabase
     return supabase.auth.sign_in_with_otp({
       'phone': e164_phone,
@@ -0,0 +1,170 @@
+import hashlib
+import logging
+import uuid
+from typing import Any, Callable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from config import settings
+from services import metrics, serializers
+from services.cache import TTLCache, versions
+
+"""
+THE PURPOSE OF THIS FILE IS A READ-THROUGH CACHE OF THE RENDERED (JSON) RESPONSES OF THE READ-HEAVY, RARELY
+CHANGING "ANOTHER USER" READS: GET /profile/{uid}, /profile/{uid}/photos, /user/{uid}, /user/{uid}/preferences.
+
+- TIER 1: A TTLCache PER WORKER (services/cache.py), TIER 2 (OPTIONAL): REDIS, SHARED BY EVERY WORKER, WHEN
+  RESPONSE_CACHE_REDIS_URL IS SET AND THE 'redis' PACKAGE IS INSTALLED. A REDIS ERROR IS A MISS, NEVER A FAILED READ
+- INVALIDATION IS WRITE-THROUGH, DRIVEN BY THE VERSION BUMPS THE WRITERS ALREADY DO (services.cache.versions):
+  A BUMP OF A KIND DROPS THE RESOURCES LISTED FOR IT IN INVALIDATES, FROM BOTH TIERS. THE WRITERS BUMP WITH THEIR
+  SESSION, SO THE DROP HAPPENS AGAIN WHEN THEIR TRANSACTION COMMITS: A GET RUNNING IN BETWEEN RE-CACHES THE OLD ROW,
+  THE COMMIT DROPS IT. OTHER WORKERS' TIER 1 CAN SERVE THE OLD BODY UNTIL RESPONSE_CACHE_TTL_SECONDS (SAME CAVEAT
+  AS EVERY PER-WORKER CACHE HERE)
+- EVERY RESPONSE CARRIES AN ETag (HASH OF THE BODY), AN 'If-None-Match' THAT MATCHES IS ANSWERED 304 WITHOUT A BODY
+
+ONLY 200 BODIES ARE CACHED: 404s ARE RAISED BY THE LOADERS AND A None (E.G. UNKNOWN USER) IS NOT STORED.
+"""
+
+log = logging.getLogger("response_cache")
+
+# version kind (or scope) bumped by a writer -> cached resources that embed that data
+INVALIDATES = {
+    "profile": ("profile",),
+    "prefs": ("user_prefs",),
+    "user": ("user",),
+    "user_birthdate": ("profile",),  # the profile embeds birthdate / age, not the rest of the user row
+    "photos": ("photos",),
+}
+
+# Photo URLs are signed for this long (services.storage.get_user_photos), the cached list must expire well before
+PHOTO_URL_TTL_SECONDS = 500
+
+_local = TTLCache(
+    "responses",
+    maxsize=settings.response_cache_size,
+    ttl_seconds=settings.response_cache_ttl_seconds,
+)
+_redis_client = None
+_redis_unavailable = False
+
+
+def _ttl_seconds(resource: str) -> float:
+    if resource == "photos":
+        return min(settings.response_cache_ttl_seconds, PHOTO_URL_TTL_SECONDS / 2)
+    return settings.response_cache_ttl_seconds
+
+
+def _redis():
+    """The shared tier's client, None when it is not configured (or the redis package is missing)."""
+    global _redis_client, _redis_unavailable
+    if _redis_client is not None or _redis_unavailable or not settings.response_cache_redis_url:
+        return _redis_client
+    try:
+        import redis
+    except ImportError:
+        log.warning("RESPONSE_CACHE_REDIS_URL is set but the 'redis' package is not installed, using the in-process tier only")
+        _redis_unavailable = True
+        return None
+    _redis_client = redis.Redis.from_url(
+        settings.response_cache_redis_url,
+        socket_timeout=settings.response_cache_redis_timeout_seconds,
+        socket_connect_timeout=settings.response_cache_redis_timeout_seconds,
+    )
+    return _redis_client
+
+
+def _canonical_uid(uid: str) -> str:
+    """Path uids can differ in case / format from the ones the writers bump, key on the canonical form."""
+    try:
+        return str(uuid.UUID(str(uid)))
+    except ValueError:
+        return str(uid)
+
+
+def _redis_key(resource: str, uid: str) -> str:
+    return f"responses:{resource}:{uid}"
+
+
+def _redis_call(op: str, fn: Callable[[Any], Any]) -> Any:
+    client = _redis()
+    if client is None:
+        return None
+    try:
+        return fn(client)
+    except Exception as e:
+        metrics.inc_counter("response_cache_redis_errors_total", description="Failed Redis calls of the response cache", op=op)
+        log.debug("Response cache Redis %s failed: %s", op, e)
+        return None
+
+
+def _etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def get(resource: str, uid: str) -> Optional[Tuple[str, bytes]]:
+    """(etag, body) of a cached response, None on a miss in both tiers."""
+    uid = _canonical_uid(uid)
+    key = (resource, uid)
+    entry = _local.get(key)
+    if entry is not None:
+        return entry
+
+    body = _redis_call("get", lambda client: client.get(_redis_key(resource, uid)))
+    if body is None:
+        return None
+    entry = (_etag(body), body)
+    _local.set(key, entry)
+    return entry
+
+
+def put(resource: str, uid: str, value: Any) -> Tuple[str, bytes]:
+    """Render 'value' (services.serializers), store it in both tiers (unless None) and return (etag, body)."""
+    body = serializers.dumps(value)
+    entry = (_etag(body), body)
+    if value is not None:
+        uid = _canonical_uid(uid)
+        _local.set((resource, uid), entry)
+        ttl = max(1, int(_ttl_seconds(resource)))
+        _redis_call("set", lambda client: client.set(_redis_key(resource, uid), body, ex=ttl))
+    return entry
+
+
+def invalidate(resource: str, uid: str):
+    uid = _canonical_uid(uid)
+    _local.delete((resource, uid))
+    _redis_call("delete", lambda client: client.delete(_redis_key(resource, uid)))
+
+
+def _on_version_bump(kind: str, uid: str):
+    for resource in INVALIDATES.get(kind, ()):
+        invalidate(resource, uid)
+
+
+versions.add_scope("user", "user_birthdate", ("birthdate",))
+versions.add_listener(_on_version_bump)
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # Weak comparison (RFC 9110 13.1.2): W/"x" matches "x"
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def respond(request: Request, resource: str, entry: Tuple[str, bytes]) -> Response:
+    etag, body = entry
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _not_modified(request, etag):
+        metrics.inc_counter("response_cache_not_modified_total", description="Conditional GETs answered 304", resource=resource)
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cached_response(request: Request, resource: str, uid: str, load: Callable[[], Any]) -> Response:
+    """Read-through: the cached body of (resource, uid), or load() rendered and cached, with ETag / 304 handling."""
+    entry = get(resource, uid)
+    if entry is None:
+        entry = put(resource, uid, load())
+    return respond(request, resource, entry)
@@ -0,0 +1,88 @@
+from collections.abc import Mapping
+from datetime import timedelta
+from decimal import Decimal
+from typing import Any, List
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+from schemas.chats import ChatDetailSchema, ChatListItemSchema
+
+"""
+THE PURPOSE OF THIS FILE IS FAST JSON RENDERING OF THE API RESPONSES.
+
+- FastJSONResponse: THE APP'S DEFAULT RESPONSE CLASS (main.py), RENDERS WITH orjson INSTEAD OF json.dumps. FASTAPI
+  STILL RUNS jsonable_encoder ON WHAT A ROUTE RETURNS BEFORE IT GETS THERE
+- json_response(content): FOR THE HOT ROUTES (PROFILE, POLL), RETURNED DIRECTLY FROM THE ROUTE SO FASTAPI SKIPS
+  jsonable_encoder TOO: orjson SERIALIZES UUIDS / DATETIMES / ENUMS NATIVELY AND RowMapping / Decimal / timedelta /
+  PYDANTIC MODELS THROUGH _default, WITH THE SAME OUTPUT AS jsonable_encoder + json.dumps
+- SocketJSON: THE json MODULE STAND-IN GIVEN TO python-socketio / python-engineio (services/socket_protocol.py) SO
+  THE JSON SOCKET PACKETS ARE ENCODED / DECODED WITH orjson TOO
+- chat_list_response / chat_detail_response: THE CHAT DTOs KEEP THEIR response_model SEMANTICS (VALIDATION, ONLY THE
+  SCHEMA FIELDS OF other_user ARE SENT) THROUGH A TypeAdapter BUILT ONCE AT IMPORT, WHOSE dump_json SERIALIZES IN
+  pydantic-core INSTEAD OF model_dump + jsonable_encoder + json.dumps
+
+python -m bench.serialization COMPARES BOTH PATHS ON LARGE PROFILE / CHAT / POLL PAYLOADS.
+"""
+
+OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, Decimal):
+        # same as jsonable_encoder: whole numbers stay ints
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+    if isinstance(obj, timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(content: Any, status_code: int = 200) -> FastJSONResponse:
+    return FastJSONResponse(content=content, status_code=status_code)
+
+
+class SocketJSON:
+    """Just the json.dumps / json.loads surface the Socket.IO packet classes use (they want str back)."""
+
+    @staticmethod
+    def dumps(obj: Any, **kwargs) -> str:
+        return dumps(obj).decode()
+
+    @staticmethod
+    def loads(s: Any, **kwargs) -> Any:
+        return orjson.loads(s)
+
+
+_chat_list = TypeAdapter(List[ChatListItemSchema])
+_chat_detail = TypeAdapter(ChatDetailSchema)
+
+
+class _PrerenderedResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return content
+
+
+def chat_list_response(chats: List[Mapping]) -> JSONResponse:
+    return _PrerenderedResponse(content=_chat_list.dump_json(_chat_list.validate_python(chats)))
+
+
+def chat_detail_response(chat: Mapping) -> JSONResponse:
+    return _PrerenderedResponse(content=_chat_detail.dump_json(_chat_detail.validate_python(chat)))
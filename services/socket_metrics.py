@@ -0,0 +1,112 @@
+import functools
+import inspect
+import time
+
+from middleware.instrumentation import track_queries, stop_tracking_queries
+from services import metrics
+
+"""
+THE PURPOSE OF THIS FILE IS TO MEASURE THE SOCKET.IO SIDE OF THE APP, WHICH THE HTTP MIDDLEWARE NEVER SEES.
+- instrumented_on(sm) IS A DROP-IN FOR '@sm.on(event)' THAT RECORDS PER EVENT: CALL COUNT (BY OUTCOME), HANDLER
+  LATENCY AND THE SQL STATEMENTS / DB TIME THE HANDLER SPENT (SAME QueryStats AS THE HTTP ROUTES)
+- instrument_emits(sm) WRAPS THE SERVER'S emit SO EVERY EMIT (HANDLERS AND CONTROLLERS ALIKE) RECORDS HOW MANY
+  SOCKETS IT FANNED OUT TO
+- A 'socket_connected_clients' GAUGE PER WORKER, MOVED BY THE connect / disconnect HANDLERS
+ALL OF IT ENDS UP ON THE '/metrics' ENDPOINT THROUGH services.metrics.
+"""
+
+FANOUT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+DB_QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def _positional_limit(handler):
+    """How many positional args the handler takes (None = any), python-socketio passes extras like the disconnect reason."""
+    params = inspect.signature(handler).parameters.values()
+    if any(p.kind == inspect.Parameter.VAR_POSITIONAL for p in params):
+        return None
+    return sum(1 for p in params if p.kind in (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD))
+
+
+def instrumented_on(sm):
+    """Returns an 'on' decorator that registers the handler with sm.on and records its metrics."""
+
+    def on(event: str, namespace=None):
+        def decorator(handler):
+            limit = _positional_limit(handler)
+
+            @functools.wraps(handler)
+            async def wrapper(*args):
+                stats, token = track_queries()
+                started = time.perf_counter()
+                outcome = "ok"
+                try:
+                    result = await handler(*(args if limit is None else args[:limit]))
+                    if event == "connect":
+                        if result is False:
+                            outcome = "rejected"
+                        else:
+                            metrics.add_gauge("socket_connected_clients", 1, description="Connected, authenticated sockets")
+                    elif event == "disconnect":
+                        metrics.add_gauge("socket_connected_clients", -1, description="Connected, authenticated sockets")
+                    return result
+                except Exception:
+                    outcome = "error"
+                    raise
+                finally:
+                    stop_tracking_queries(token)
+                    elapsed = time.perf_counter() - started
+                    metrics.inc_counter(
+                        "socket_events_total",
+                        description="Socket.IO events handled, by event and outcome",
+                        event=event, outcome=outcome,
+                    )
+                    metrics.observe(
+                        "socket_event_duration_seconds", elapsed,
+                        description="Socket.IO handler latency (time the handler held the event loop or awaited)",
+                        event=event,
+                    )
+                    metrics.observe(
+                        "socket_event_db_seconds", stats.db_seconds,
+                        description="Time spent in SQL statements per Socket.IO event",
+                        event=event,
+                    )
+                    metrics.observe(
+                        "socket_event_db_queries", stats.count,
+                        description="SQL statements issued per Socket.IO event",
+                        buckets=DB_QUERY_BUCKETS, event=event,
+                    )
+
+            sm.on(event, namespace=namespace)(wrapper)
+            return wrapper
+
+        return decorator
+
+    return on
+
+
+def instrument_emits(sm):
+    """Wrap the AsyncServer's emit to record emit counts and fan-out (sockets reached on this worker)."""
+    sio = sm._sio
+    emit = sio.emit
+
+    @functools.wraps(emit)
+    async def instrumented_emit(event, data=None, to=None, room=None, skip_sid=None, namespace=None, **kwargs):
+        target = to if to is not None else room
+        skip = set(skip_sid) if isinstance(skip_sid, (list, tuple, set)) else {skip_sid}
+        try:
+            recipients = sum(
+                1 for sid, _ in sio.manager.get_participants(namespace or "/", target)
+                if sid not in skip
+            )
+        except Exception:
+            recipients = 0
+
+        metrics.inc_counter("socket_emits_total", description="Socket.IO emits, by event", event=event)
+        metrics.observe(
+            "socket_emit_fanout", recipients,
+            description="Sockets reached per emit on this worker",
+            buckets=FANOUT_BUCKETS, event=event,
+        )
+        return await emit(event, data=data, to=to, room=room, skip_sid=skip_sid, namespace=namespace, **kwargs)
+
+    sio.emit = instrumented_emit
@@ -0,0 +1,190 @@
+import functools
+import logging
+import uuid
+from datetime import date, datetime, timezone
+from typing import Any, Iterable, Set
+
+from config import settings
+from services import metrics, serializers
+
+"""
+THE PURPOSE OF THIS FILE IS THE WIRE FORMAT OF THE SOCKET.IO EVENTS (chat_received, session_found, match_interaction...).
+
+- TRANSPORT: SOCKET_SERIALIZER="msgpack" SWITCHES python-socketio TO ITS MSGPACK PACKETS (THE CLIENT NEEDS
+  socket.io-msgpack-parser, IT IS SERVER-WIDE: EVERY CLIENT HAS TO USE IT). THE DEFAULT JSON PACKETS ARE RENDERED
+  WITH orjson (services/serializers.py). WEBSOCKET permessage-deflate IS NEGOTIATED BY THE ASGI SERVER (UVICORN,
+  --ws-per-message-deflate, ON BY DEFAULT), LONG-POLLING RESPONSES ARE GZIPPED BY ENGINE.IO ABOVE
+  SOCKET_COMPRESSION_THRESHOLD BYTES
+- PROTOCOL VERSION, NEGOTIATED PER CLIENT IN THE CONNECT AUTH ({"token": ..., "protocol": 2}):
+    1 (DEFAULT, WHAT EVERY EXISTING CLIENT GETS): THE PAYLOADS AS THE HANDLERS BUILD THEM, UUIDS AS STRINGS,
+      TIMESTAMPS AS ISO STRINGS
+    2 (COMPACT): SHORT KEYS (COMPACT_KEYS, UNKNOWN KEYS ARE KEPT AS THEY ARE), TIMESTAMPS ('*_at') AS EPOCH
+      MILLISECONDS (NAIVE ONES ARE UTC, LIKE THE DB COLUMNS) AND, ON THE MSGPACK TRANSPORT, UUIDS ('id', '*_id',
+      '*_uid') AS THEIR 16 RAW BYTES
+  THE CLIENT GETS A 'protocol' EVENT WITH THE VERSION IT WAS GRANTED WHEN IT ASKED FOR ONE
+- install(sm) WRAPS THE SERVER'S emit: A ROOM WITH COMPACT CLIENTS IN IT IS SENT AS TWO EMITS (FULL PAYLOAD SKIPPING
+  THEM, COMPACT PAYLOAD SKIPPING THE OTHERS), SO THE EMITTERS KEEP BUILDING ONE PAYLOAD. LIKE user_sid_map, WHICH
+  CLIENTS ARE COMPACT IS KNOWN PER WORKER
+"""
+
+log = logging.getLogger("sockets")
+
+PROTOCOL_FULL = 1
+PROTOCOL_COMPACT = 2
+SUPPORTED_PROTOCOLS = (PROTOCOL_FULL, PROTOCOL_COMPACT)
+
+# Long key -> key on the compact protocol; must stay unique, clients decode with the inverse table
+COMPACT_KEYS = {
+    "id": "i",
+    "session_id": "s",
+    "chat_id": "c",
+    "author_uid": "a",
+    "receiver_uid": "r",
+    "content": "b",
+    "created_at": "t",
+    "system": "y",
+    "role": "ro",
+    "partner_uid": "p",
+    "partner_first_name": "pn",
+    "message": "m",
+    "from_uid": "f",
+    "to_uid": "u",
+    "is_mutual": "mu",
+    "status": "st",
+    "session": "se",
+    "host_uid": "h",
+    "guest_uid": "g",
+    "mode_id": "md",
+    "started_at": "sa",
+    "closed_at": "ca",
+}
+
+# Compact sids of this worker (a sid missing here speaks protocol 1)
+sid_protocol_map: dict[str, int] = {}
+
+
+def server_options() -> dict:
+    """Packet serializer / compression options for the socketio.AsyncServer (SocketManager kwargs)."""
+    serializer = settings.socket_serializer
+    if serializer not in ("json", "msgpack"):
+        log.warning("Unknown SOCKET_SERIALIZER '%s', using json", serializer)
+        serializer = "json"
+    options = {"compression_threshold": settings.socket_compression_threshold}
+    if serializer == "msgpack":
+        options["serializer"] = "msgpack"
+    else:
+        options["json"] = serializers.SocketJSON
+    return options
+
+
+def negotiate(sid: str, auth: Any) -> int:
+    """Record the protocol a connecting client asked for: the highest supported version not above it."""
+    requested = auth.get("protocol") if isinstance(auth, dict) else None
+    try:
+        requested = int(requested) if requested is not None else PROTOCOL_FULL
+    except (TypeError, ValueError):
+        requested = PROTOCOL_FULL
+    granted = max(v for v in SUPPORTED_PROTOCOLS if v <= max(requested, PROTOCOL_FULL))
+    if granted == PROTOCOL_FULL:
+        sid_protocol_map.pop(sid, None)
+    else:
+        sid_protocol_map[sid] = granted
+    metrics.inc_counter("socket_protocol_clients_total", description="Connected sockets, by negotiated payload protocol", protocol=str(granted))
+    return granted
+
+
+def forget(sid: str):
+    sid_protocol_map.pop(sid, None)
+
+
+def _epoch_ms(value: Any) -> Any:
+    if isinstance(value, str):
+        text = value[:-1] if value.endswith("Z") else value
+        try:
+            value = datetime.fromisoformat(text)
+        except ValueError:
+            return value
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+    return value
+
+
+def _is_uuid_key(key: str) -> bool:
+    return key == "id" or key.endswith("_id") or key.endswith("_uid")
+
+
+def _full(data: Any) -> Any:
+    """Protocol 1: the payload as built, with any datetime / UUID the emitter left in rendered as strings."""
+    if isinstance(data, dict):
+        return {key: _full(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [_full(value) for value in data]
+    if isinstance(data, (datetime, date)):
+        return data.isoformat()
+    if isinstance(data, uuid.UUID):
+        return str(data)
+    return data
+
+
+def _compact(data: Any, binary: bool) -> Any:
+    if isinstance(data, dict):
+        out = {}
+        for key, value in data.items():
+            if key.endswith("_at"):
+                value = _epoch_ms(value)
+            elif binary and _is_uuid_key(key) and isinstance(value, (str, uuid.UUID)):
+                try:
+                    value = (value if isinstance(value, uuid.UUID) else uuid.UUID(value)).bytes
+                except ValueError:
+                    pass
+            else:
+                value = _compact(value, binary)
+            out[COMPACT_KEYS.get(key, key)] = value
+        return out
+    if isinstance(data, (list, tuple)):
+        return [_compact(value, binary) for value in data]
+    return _full(data)
+
+
+def render(data: Any, protocol: int) -> Any:
+    if protocol == PROTOCOL_COMPACT:
+        return _compact(data, binary=settings.socket_serializer == "msgpack")
+    return _full(data)
+
+
+def _targets(sio, namespace: str, target: Any) -> Iterable[str]:
+    if target is None:
+        return list(sid_protocol_map)
+    return [sid for sid, _ in sio.manager.get_participants(namespace, target)]
+
+
+def install(sm):
+    """Wrap the AsyncServer's emit so each recipient gets the payload in its negotiated protocol."""
+    sio = sm._sio
+    emit = sio.emit
+
+    @functools.wraps(emit)
+    async def protocol_emit(event, data=None, to=None, room=None, skip_sid=None, namespace=None, **kwargs):
+        target = to if to is not None else room
+        skip: Set[str] = set(skip_sid) if isinstance(skip_sid, (list, tuple, set)) else {skip_sid} - {None}
+
+        compact = []
+        if sid_protocol_map:
+            try:
+                recipients = [sid for sid in _targets(sio, namespace or "/", target) if sid not in skip]
+            except Exception as e:
+                log.debug("Could not list the recipients of %s: %s", event, e)
+                recipients = []
+            compact = [sid for sid in recipients if sid_protocol_map.get(sid) == PROTOCOL_COMPACT]
+
+        if not compact:
+            return await emit(event, data=render(data, PROTOCOL_FULL), to=to, room=room, skip_sid=skip_sid, namespace=namespace, **kwargs)
+
+        full = [sid for sid in recipients if sid not in sid_protocol_map]
+        if full or target is None:
+            await emit(event, data=render(data, PROTOCOL_FULL), to=to, room=room, skip_sid=list(skip | set(compact)), namespace=namespace, **kwargs)
+        return await emit(event, data=render(data, PROTOCOL_COMPACT), to=to, room=room, skip_sid=list(skip | set(full)), namespace=namespace, **kwargs)
+
+    sio.emit = protocol_emit
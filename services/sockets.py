@@ -8,11 +8,13 @@ from fastapi.exceptions import HTTPException
 from config import settings
 from models.db import SessionLocal
 from controllers.user import _set_user_online, _set_user_offline
+from services.socket_metrics import instrumented_on, instrument_emits
+from services import socket_protocol
 
 
 SECRET = settings.supabase_jwt_secret
 
-logging.basicConfig(level=logging.INFO)
+log = logging.getLogger("sockets")
 
 user_sid_map: dict[str, str] = {}
 sid_user_map: dict[str, str] = {}
@@ -23,12 +25,12 @@ socket_manager = None
 async def _get_auth_user_id(sid, auth_data):
     try:
         if not isinstance(auth_data, dict):
-            logging.error(f"Invalid socket auth for SID {sid}: {auth_data}")
+            log.error("Invalid socket auth for SID %s: %s", sid, auth_data)
             return None
 
         token = auth_data.get("token")
         if not token:
-            logging.error(f"Missing token in socket auth for SID {sid}")
+            log.error("Missing token in socket auth for SID %s", sid)
             return None
 
         payload = jwt.decode(
@@ -39,17 +41,17 @@ async def _get_auth_user_id(sid, auth_data):
         )
         sub = payload.get("sub")
         if not sub:
-            logging.error(f"Missing sub in JWT for SID {sid}")
+            log.error("Missing sub in JWT for SID %s", sid)
             return None
 
-        logging.info(f"User {sub} authenticated via socket")
+        log.info("User %s authenticated via socket", sub)
         return sub
 
     except JWTError as e:
-        logging.error(f"JWT error during socket auth for SID {sid}: {e}")
+        log.error("JWT error during socket auth for SID %s: %s", sid, e)
         return None
     except Exception as e:
-        logging.error(f"Unexpected error during socket auth for SID {sid}: {e}")
+        log.error("Unexpected error during socket auth for SID %s: %s", sid, e)
         return None
 
 
@@ -57,14 +59,20 @@ def register_socket_handlers(sm):
     global socket_manager
     socket_manager = sm
 
-    @sm.on("connect")
+    # every emit is rendered in each recipient's negotiated payload protocol (services/socket_protocol.py)
+    socket_protocol.install(sm)
+    # '@on(event)' is '@sm.on(event)' plus per-event counts, latency and DB time on /metrics
+    instrument_emits(sm)
+    on = instrumented_on(sm)
+
+    @on("connect")
     async def handle_connect(sid, environ, auth):
-        logging.info(f"Connect attempt from SID {sid}")
-        logging.info(f"Auth data received: {auth}")
+        log.info("Connect attempt from SID %s", sid)
+        log.debug("Auth data received: %s", auth)
 
         uid = await _get_auth_user_id(sid, auth)
         if not uid:
-            logging.error(f"Authentication failed for SID {sid}")
+            log.error("Authentication failed for SID %s", sid)
             await sm.emit("error", {"message": "Invalid or expired authorization token"}, room=sid)
             return False
 
@@ -75,22 +83,27 @@ def register_socket_handlers(sm):
         user_room = f"user:{uid_str}"
         await sm.enter_room(sid, user_room)
 
+        protocol = socket_protocol.negotiate(sid, auth)
+        if isinstance(auth, dict) and "protocol" in auth:
+            await sm.emit("protocol", {"protocol": protocol}, room=sid)
+
         db = SessionLocal()
         try:
             _set_user_online(uid=uid_str, db=db)
             db.commit()
-            logging.info(f"User {uid_str} set ONLINE via socket")
+            log.info("User %s set ONLINE via socket", uid_str)
         except SQLAlchemyError as e:
             db.rollback()
-            logging.error(f"DB error setting user ONLINE for uid={uid_str}: {e}")
+            log.error("DB error setting user ONLINE for uid=%s: %s", uid_str, e)
         finally:
             db.close()
 
-        logging.info(f"User {uid_str} connected with SID {sid}")
+        log.info("User %s connected with SID %s", uid_str, sid)
         return True
 
-    @sm.on("disconnect")
+    @on("disconnect")
     async def handle_disconnect(sid):
+        socket_protocol.forget(sid)
         uid = sid_user_map.pop(sid, None)
         if not uid:
             return
@@ -101,17 +114,17 @@ def register_socket_handlers(sm):
         try:
             _set_user_offline(uid=uid_str, db=db)
             db.commit()
-            logging.info(f"User {uid_str} set OFFLINE via socket")
+            log.info("User %s set OFFLINE via socket", uid_str)
         except SQLAlchemyError as e:
             db.rollback()
-            logging.error(f"DB error setting user OFFLINE for uid={uid_str}: {e}")
+            log.error("DB error setting user OFFLINE for uid=%s: %s", uid_str, e)
         finally:
             db.close()
 
         user_sid_map.pop(uid_str, None)
-        logging.info(f"User {uid_str} disconnected SID {sid}")
+        log.info("User %s disconnected SID %s", uid_str, sid)
 
-    @sm.on("join_session")
+    @on("join_session")
     async def handle_join_session(sid, data):
         raw_uid = sid_user_map.get(sid)
         uid = str(raw_uid) if raw_uid is not None else None
@@ -121,7 +134,7 @@ def register_socket_handlers(sm):
             if sid_val is not None:
                 session_id = str(sid_val)
 
-        logging.info(f"join_session from SID={sid}, uid={uid}, data={data}")
+        log.debug("join_session from SID=%s, uid=%s, data=%s", sid, uid, data)
 
         if not uid or not session_id:
             await sm.emit("error", {"message": "Invalid session join payload"}, room=sid)
@@ -131,7 +144,7 @@ def register_socket_handlers(sm):
         try:
             from controllers.session import _get_active_session_by_id
             session = _get_active_session_by_id(session_id, db)
-            logging.info(f"join_session fetched session={session}")
+            log.debug("join_session fetched session=%s", session)
 
             if not session:
                 await sm.emit("error", {"message": "Session not found or inactive"}, room=sid)
@@ -147,7 +160,7 @@ def register_socket_handlers(sm):
             host_uid_str = str(host_uid) if host_uid is not None else None
             guest_uid_str = str(guest_uid) if guest_uid is not None else None
 
-            logging.info(f"join_session uid={uid}, host_uid={host_uid_str}, guest_uid={guest_uid_str}")
+            log.info("join_session uid=%s, host_uid=%s, guest_uid=%s", uid, host_uid_str, guest_uid_str)
 
             if uid not in {host_uid_str, guest_uid_str}:
                 await sm.emit("error", {"message": "Not allowed to join this session"}, room=sid)
@@ -155,19 +168,19 @@ def register_socket_handlers(sm):
 
             room = f"session:{session_id}"
             await sm.enter_room(sid, room)
-            logging.info(f"User {uid} joined session {session_id} in room {room}")
+            log.info("User %s joined session %s in room %s", uid, session_id, room)
             await sm.emit("session_joined", {"session_id": session_id}, room=sid)
 
         except SQLAlchemyError as e:
-            logging.error(f"DB error in join_session for uid={uid}, session_id={session_id}: {e}")
+            log.error("DB error in join_session for uid=%s, session_id=%s: %s", uid, session_id, e)
             await sm.emit("error", {"message": "Server error joining session"}, room=sid)
         except Exception as e:
-            logging.error(f"Unexpected error in join_session for uid={uid}, session_id={session_id}: {e}")
+            log.error("Unexpected error in join_session for uid=%s, session_id=%s: %s", uid, session_id, e)
             await sm.emit("error", {"message": "Server error joining session"}, room=sid)
         finally:
             db.close()
 
-    @sm.on("leave_session")
+    @on("leave_session")
     async def handle_leave_session(sid, data):
         raw_uid = sid_user_map.get(sid)
         uid = str(raw_uid) if raw_uid is not None else None
@@ -183,12 +196,12 @@ def register_socket_handlers(sm):
 
         room = f"session:{session_id}"
         await sm.leave_room(sid, room)
-        logging.info(f"User {uid} left session {session_id} room {room}")
+        log.info("User %s left session %s room %s", uid, session_id, room)
         await sm.emit("session_left", {"session_id": session_id}, room=sid)
 
     async def _handle_session_chat_message(uid: str, session_id: str, content: str, db: Session, sid: str):
-        logging.info(
-            f"Persisting chat_message: uid={uid}, session_id={session_id}, content_len={len(content)}"
+        log.info(
+            "Persisting chat_message: uid=%s, session_id=%s, content_len=%s", uid, session_id, len(content)
         )
 
         from controllers.session import _add_chat_message, _get_active_session_by_id
@@ -200,7 +213,7 @@ def register_socket_handlers(sm):
             db=db,
         )
 
-        logging.info(f"_add_chat_message returned: {message_data}")
+        log.debug("_add_chat_message returned: %s", message_data)
 
         if isinstance(message_data, dict):
             created_at = message_data["created_at"]
@@ -210,31 +223,30 @@ def register_socket_handlers(sm):
             message_id = getattr(message_data, "id", None)
 
         if created_at is None or message_id is None:
-            logging.error(f"message_data missing fields: {message_data}")
+            log.error("message_data missing fields: %s", message_data)
             raise RuntimeError("message_data missing created_at or id")
 
-        message_id_str = str(message_id)
-        created_at_str = created_at.isoformat()
 
         session = _get_active_session_by_id(session_id, db)
-        logging.info(f"_get_active_session_by_id({session_id}) -> {session}")
+        log.debug("_get_active_session_by_id(%s) -> %s", session_id, session)
 
         if not session:
             await sm.emit("error", {"message": "Chat session is no longer active"}, room=sid)
             return
 
+        # created_at / id are rendered per recipient protocol by the emit (ISO string / epoch ms, str / bytes)
         payload = {
             "session_id": session_id,
             "author_uid": uid,
             "content": content,
-            "created_at": created_at_str,
-            "id": message_id_str,
+            "created_at": created_at,
+            "id": message_id,
         }
 
         room = f"session:{session_id}"
-        logging.info(f"Emitting chat_received to room {room} with payload={payload}")
+        log.debug("Emitting chat_received to room %s with payload=%s", room, payload)
         await sm.emit("chat_received", payload, room=room)
-        logging.info(f"Message from {uid} in session {session_id} broadcast to room {room}")
+        log.info("Message from %s in session %s broadcast to room %s", uid, session_id, room)
 
     async def _handle_chat_message_with_chat_id(uid: str, chat_id: str, content: str, db: Session, sid: str):
         stmt_chat = text("""
@@ -285,8 +297,8 @@ def register_socket_handlers(sm):
             "author_uid": uid,
             "receiver_uid": receiver_uid,
             "content": content,
-            "created_at": message_row["created_at"].isoformat(),
-            "id": str(message_row["id"]),
+            "created_at": message_row["created_at"],
+            "id": message_row["id"],
         }
 
         room = f"chat:{chat_id}"
@@ -295,15 +307,15 @@ def register_socket_handlers(sm):
         user_room = f"user:{receiver_uid}"
         await sm.emit("chat_notification", payload, room=user_room)
 
-    @sm.on("chat_message")
+    @on("chat_message")
     async def handle_chat_message(sid, data):
         raw_uid = sid_user_map.get(sid)
         uid = str(raw_uid) if raw_uid is not None else None
 
-        logging.info(f"chat_message from SID={sid}, uid={uid}, data={data}")
+        log.debug("chat_message from SID=%s, uid=%s, data=%s", sid, uid, data)
 
         if not isinstance(data, dict):
-            logging.warning(f"chat_message invalid data type: {type(data)}")
+            log.warning("chat_message invalid data type: %s", type(data))
             await sm.emit("error", {"message": "Invalid message format"}, room=sid)
             return
 
@@ -318,9 +330,8 @@ def register_socket_handlers(sm):
         content = data.get("content")
 
         if not uid or not content or (not session_id and not chat_id) or (session_id and chat_id):
-            logging.warning(
-                f"Invalid message payload or unauthenticated sender: "
-                f"sid={sid}, uid={uid}, session_id={session_id}, chat_id={chat_id}, content={content!r}"
+            log.warning(
+                "Invalid message payload or unauthenticated sender: sid=%s, uid=%s, session_id=%s, chat_id=%s, content=%r", sid, uid, session_id, chat_id, content
             )
             await sm.emit("error", {"message": "Invalid message format"}, room=sid)
             return
@@ -332,18 +343,18 @@ def register_socket_handlers(sm):
             elif chat_id:
                 await _handle_chat_message_with_chat_id(uid, chat_id, content, db, sid)
         except HTTPException as e:
-            logging.warning(f"HTTPException in chat_message: {e.detail}")
+            log.warning("HTTPException in chat_message: %s", e.detail)
             await sm.emit("error", {"message": e.detail}, room=sid)
         except SQLAlchemyError as e:
-            logging.exception(f"SQLAlchemyError handling chat_message (uid={uid}, session_id={session_id}, chat_id={chat_id}): {e}")
+            log.exception("SQLAlchemyError handling chat_message (uid=%s, session_id=%s, chat_id=%s): %s", uid, session_id, chat_id, e)
             await sm.emit("error", {"message": "Server error processing message"}, room=sid)
         except Exception as e:
-            logging.exception(f"Critical error handling chat_message (uid={uid}, session_id={session_id}, chat_id={chat_id}): {e}")
+            log.exception("Critical error handling chat_message (uid=%s, session_id=%s, chat_id=%s): %s", uid, session_id, chat_id, e)
             await sm.emit("error", {"message": "Server error processing message"}, room=sid)
         finally:
             db.close()
 
-    @sm.on("join_chat")
+    @on("join_chat")
     async def handle_join_chat(sid, data):
         raw_uid = sid_user_map.get(sid)
         uid = str(raw_uid) if raw_uid is not None else None
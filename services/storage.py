@@ -6,6 +6,7 @@ from storage3 import SyncStorageClient
 from fastapi import HTTPException
 
 from schemas.photos import PhotoMetaSchema, PhotoSchema, PhotoMetadataSchema
+from services.cache import versions
 
 import mimetypes
 import uuid
@@ -112,6 +113,7 @@ def upload_profile_photo(
         file_options={"content-type": mime_type, "upsert": False},
     )
     signed = bucket.create_signed_url(path, 300) or {}
+    versions.bump("photos", uid, db=db)
 
     return PhotoMetaSchema (
         id = row["id"],
@@ -142,6 +144,7 @@ def delete_profile_photo(photo: PhotoSchema, uid: str, storage: SyncStorageClien
     bucket = storage.from_(BUCKET)
 
     res = bucket.remove([photo.path])
+    versions.bump("photos", uid, db=db)
     return res
 
 
@@ -169,6 +172,7 @@ def update_profile_photo(photo: PhotoSchema, mime_type: str, file_bytes: bytes,
         file=file_bytes,
         file_options={"content-type": mime_type, "upsert": True}
     )
+    versions.bump("photos", uid, db=db)
 
     signed = bucket.create_signed_url(photo.path, 300) or {}
     url = signed.get("signedUrl") or signed.get("signedURL")
@@ -206,6 +210,7 @@ def update_profile_photo_metadata(photo: PhotoSchema, metadata: PhotoMetadataSch
     row = db.execute(stmt, {"slot": metadata.slot, "moderation_status": metadata.moderation_status.value or None, "is_primary": metadata.is_primary, "id": str(photo.id), "uid": uid}).mappings().one_or_none()
     if not row:
         raise HTTPException(status_code=404, detail=f"The photo with id '{photo.id}' does not exist!")
+    versions.bump("photos", uid, db=db)
 
     bucket = storage.from_(BUCKET)
 
@@ -0,0 +1,14 @@
+import os
+import sys
+from pathlib import Path
+
+# Importing the app modules builds config.settings: give the required settings a value when no .env is around.
+# Nothing here connects to Supabase or the database.
+for name, value in {
+    "SUPABASE_JWT_SECRET": "test", "SUPABASE_URL": "http://localhost", "SUPABASE_ANON_KEY": "test",
+    "SUPABASE_SERVICE_KEY": "test", "DB_USER": "test", "DB_PASS": "test", "DB_HOST": "localhost",
+    "DB_PORT": "5432", "DB_NAME": "test",
+}.items():
+    os.environ.setdefault(name, value)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,56 @@
+import random
+
+from services.cache import VersionRegistry
+
+
+def test_versions_stay_bounded():
+    registry = VersionRegistry(maxsize=100)
+    for n in range(10_000):
+        registry.bump("matchmaking", f"user-{n}")
+    assert len(registry._versions) == 100
+
+
+def test_forgotten_version_never_matches_a_stale_one():
+    registry = VersionRegistry(maxsize=3)
+    registry.bump("prefs", "a")
+    cached = registry.get("prefs", "a")  # a reader caches under this version
+    registry.bump("prefs", "a")  # ... the prefs change ...
+    for n in range(10):
+        registry.bump("prefs", f"other-{n}")  # ... and 'a' is evicted
+
+    assert ("prefs", "a") not in registry._versions
+    assert registry.get("prefs", "a") != cached
+
+
+def test_versions_only_move_forward_through_evictions():
+    # Whatever gets evicted, a (kind, uid) never reads a version it had before its last bump
+    rng = random.Random(0)
+    registry = VersionRegistry(maxsize=5)
+    uids = [f"user-{n}" for n in range(20)]
+    seen = {uid: registry.get("profile", uid) for uid in uids}
+    bumped_from = {uid: None for uid in uids}
+    for _ in range(5_000):
+        uid = rng.choice(uids)
+        if rng.random() < 0.5:
+            bumped_from[uid] = registry.get("profile", uid)
+            registry.bump("profile", uid)
+            assert registry.get("profile", uid) > bumped_from[uid]
+        version = registry.get("profile", uid)
+        assert version >= seen[uid]
+        if bumped_from[uid] is not None:
+            assert version != bumped_from[uid]
+        seen[uid] = version
+
+
+def test_scopes_and_listeners_survive_the_bound():
+    registry = VersionRegistry(maxsize=2)
+    registry.add_scope("profile", "profile_match", ("gender",))
+    calls = []
+    registry.add_listener(lambda kind, uid: calls.append((kind, uid)))
+
+    before = registry.get("profile_match", "a")
+    registry.bump("profile", "a", fields=("bio",))
+    assert registry.get("profile_match", "a") == before
+    registry.bump("profile", "a", fields=("gender",))
+    assert registry.get("profile_match", "a") != before
+    assert calls == [("profile", "a"), ("profile", "a"), ("profile_match", "a")]
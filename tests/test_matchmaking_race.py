@@ -0,0 +1,172 @@
+"""
+A poll (or the host-promotion timer) and a batch round working on the same queued user at once must leave them in
+exactly one open session. Needs the throwaway local Postgres with the bench population (python -m bench.seed),
+skipped otherwise.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Tuple
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+import controllers.matchmaking as matchmaking
+from bench.seed import BENCH_LAST_NAME
+from config import settings
+from migrations.explain_hot_queries import _is_local
+from models.db import SessionLocal, engine
+from services import matchmaking_rounds, matchmaking_state
+
+
+def _bench_db_available() -> bool:
+    if not _is_local(settings.db_host):
+        return False
+    try:
+        with engine.connect() as conn:
+            users = conn.execute(
+                text("SELECT count(*) FROM users.users WHERE last_name = :last_name"), {"last_name": BENCH_LAST_NAME}
+            ).scalar()
+    except SQLAlchemyError:
+        return False
+    return users >= 2
+
+
+pytestmark = pytest.mark.skipif(not _bench_db_available(), reason="needs the local bench database")
+
+# Matches anyone, so the round pairs the two users whatever the seeded preferences
+ANYONE = '{"target_gender": "any", "age_min": 18, "age_max": 99, "max_distance": 999999, "extra_options": {}}'
+
+
+def _open_sessions(uid: str) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT count(*) FROM sessions.sessions
+            WHERE (host_uid = :uid OR guest_uid = :uid) AND status = 'open'
+        """), {"uid": uid}).scalar()
+
+
+@pytest.fixture
+def queued_pair(monkeypatch) -> Tuple[str, str]:
+    """Two bench users who never met, both queued; the first one has reached their timeout."""
+    monkeypatch.setattr(settings, "matchmaking_round_interval_ms", 1000)
+
+    with engine.connect() as conn:
+        a, b = conn.execute(text("""
+            SELECT a.id, b.id
+            FROM users.users a
+            JOIN users.users b ON b.last_name = a.last_name AND b.id > a.id
+            WHERE a.last_name = :last_name
+              AND NOT EXISTS (
+                  SELECT 1 FROM sessions.sessions s
+                  WHERE s.host_uid IN (a.id, b.id) AND s.guest_uid IN (a.id, b.id)
+              )
+              AND NOT EXISTS (
+                  SELECT 1 FROM sessions.sessions s
+                  WHERE s.status = 'open' AND (s.host_uid IN (a.id, b.id) OR s.guest_uid IN (a.id, b.id))
+              )
+            LIMIT 1
+        """), {"last_name": BENCH_LAST_NAME}).one()
+    a, b = str(a), str(b)
+
+    db = SessionLocal()
+    try:
+        for uid in (a, b):
+            matchmaking._join_queue(uid=uid, db=db)
+        db.execute(
+            text("UPDATE sessions.matchmaking_queue SET prefs_snapshot = CAST(:prefs AS jsonb) WHERE uid IN (:a, :b)"),
+            {"prefs": ANYONE, "a": a, "b": b},
+        )
+        db.execute(
+            text("UPDATE sessions.matchmaking_queue SET enqueued_at = :enqueued_at WHERE uid = :uid"),
+            {"uid": a, "enqueued_at": datetime.utcnow() - timedelta(seconds=matchmaking.MATCHMAKING_TIMEOUT_SECONDS + 1)},
+        )
+        db.commit()
+    finally:
+        db.close()
+    for uid in (a, b):
+        matchmaking_state.drop(uid)
+        matchmaking._drop_exclusion_set(uid=uid)
+
+    yield a, b
+
+    with engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE sessions.sessions SET status = 'closed', closed_at = NOW()
+            WHERE status = 'open' AND (host_uid IN (:a, :b) OR guest_uid IN (:a, :b))
+        """), {"a": a, "b": b})
+        conn.execute(text("DELETE FROM sessions.matchmaking_queue WHERE uid IN (:a, :b)"), {"a": a, "b": b})
+    for uid in (a, b):
+        matchmaking_state.drop(uid)
+        matchmaking._drop_exclusion_set(uid=uid)
+
+
+def _during_round(monkeypatch, work):
+    """Run work(db) on its own connection while the round holds its queue row locks."""
+    load_users = matchmaking_rounds._load_users
+
+    def locked_then_work(rows, db):
+        other = SessionLocal()
+        try:
+            # Waiting on the round's locks would deadlock this single-threaded test: fail fast instead
+            other.execute(text("SET LOCAL lock_timeout = '2s'"))
+            work(other)
+            other.commit()
+        finally:
+            other.close()
+        return load_users(rows, db)
+
+    monkeypatch.setattr(matchmaking_rounds, "_load_users", locked_then_work)
+
+
+def test_poll_during_a_round_does_not_become_a_host(queued_pair, monkeypatch):
+    a, b = queued_pair
+    polls = []
+    _during_round(monkeypatch, lambda db: polls.append(asyncio.run(matchmaking._poll_for_match(uid=a, db=db))))
+
+    sessions = matchmaking_rounds.run_round()
+
+    assert polls[0]["status"] == "searching"
+    assert {(str(s["host_uid"]), str(s["guest_uid"])) for s in sessions} >= {(a, b)}
+    assert _open_sessions(a) == 1
+
+    db = SessionLocal()
+    try:
+        assert asyncio.run(matchmaking._poll_for_match(uid=a, db=db))["status"] == "found"
+    finally:
+        db.close()
+
+
+def test_timer_during_a_round_does_not_become_a_host(queued_pair, monkeypatch):
+    a, b = queued_pair
+    promoted = []
+    _during_round(monkeypatch, lambda db: promoted.append(matchmaking._promote_to_host_on_timeout(uid=a, db=db)))
+
+    sessions = matchmaking_rounds.run_round()
+
+    assert promoted == [None]
+    assert {(str(s["host_uid"]), str(s["guest_uid"])) for s in sessions} >= {(a, b)}
+    assert _open_sessions(a) == 1
+
+
+def test_round_during_a_poll_skips_the_new_host(queued_pair, monkeypatch):
+    a, b = queued_pair
+    become_host = matchmaking._become_host
+    rounds = []
+
+    def become_host_then_round(*args, **kwargs):
+        result = become_host(*args, **kwargs)
+        rounds.append(matchmaking_rounds.run_round())  # before the poll commits
+        return result
+
+    monkeypatch.setattr(matchmaking, "_become_host", become_host_then_round)
+    db = SessionLocal()
+    try:
+        poll = asyncio.run(matchmaking._poll_for_match(uid=a, db=db))
+        db.commit()
+    finally:
+        db.close()
+
+    assert poll["status"] == "timeout"
+    assert all(a not in (str(s["host_uid"]), str(s["guest_uid"])) for s in rounds[0])
+    assert _open_sessions(a) == 1
@@ -0,0 +1,108 @@
+import random
+from datetime import datetime
+from typing import List, Optional
+
+import pytest
+
+import controllers.matchmaking as matchmaking
+from services.matchmaking_rounds import (
+    PAIR_WEIGHT,
+    Edge,
+    QueuedUser,
+    _build_graph,
+    _exact_matching,
+    _greedy_matching,
+    solve_matching,
+)
+
+
+def _worth(matching: List[Edge]) -> float:
+    return sum(weight + PAIR_WEIGHT for _, _, weight in matching)
+
+
+def _is_matching(matching: List[Edge], edges: List[Edge]) -> bool:
+    vertices = [v for i, j, _ in matching for v in (i, j)]
+    return len(vertices) == len(set(vertices)) and all(edge in edges for edge in matching)
+
+
+def _brute_force(edges: List[Edge]) -> float:
+    """Best worth over every subset of the edges that is a matching."""
+    best = 0.0
+    for mask in range(1 << len(edges)):
+        chosen = [edge for n, edge in enumerate(edges) if mask >> n & 1]
+        if _is_matching(chosen, edges):
+            best = max(best, _worth(chosen))
+    return best
+
+
+def _random_graph(rng: random.Random, vertices: int, density: float, zero_share: float) -> List[Edge]:
+    edges = []
+    for i in range(vertices):
+        for j in range(i + 1, vertices):
+            if rng.random() < density:
+                edges.append((i, j, 0.0 if rng.random() < zero_share else round(rng.random(), 3)))
+    return edges
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_exact_matching_is_optimal(seed):
+    rng = random.Random(seed)
+    edges = _random_graph(rng, rng.randint(2, 7), rng.choice([0.3, 0.6, 1.0]), rng.choice([0.0, 0.5, 1.0]))
+    if len(edges) > 14:
+        edges = edges[:14]
+
+    exact = _exact_matching(edges)
+    greedy = _greedy_matching(edges)
+
+    assert _is_matching(exact, edges)
+    assert _is_matching(greedy, edges)
+    assert _worth(exact) == pytest.approx(_brute_force(edges))
+    assert _worth(greedy) <= _worth(exact) + 1e-9
+
+
+def test_zero_weight_pair_is_matched_by_both_solvers():
+    edges = [(0, 1, 0.0)]
+    assert _exact_matching(edges) == edges
+    assert _greedy_matching(edges) == edges
+    assert solve_matching(edges) == edges
+
+
+def test_zero_weight_pairs_beat_one_heavier_pair():
+    # 0-1 and 2-3 (both scoring 0) leave nobody waiting, 1-2 alone would leave two users
+    edges = [(0, 1, 0.0), (1, 2, 0.5), (2, 3, 0.0)]
+    assert sorted(_exact_matching(edges)) == [(0, 1, 0.0), (2, 3, 0.0)]
+    assert sorted(_greedy_matching(edges)) == [(0, 1, 0.0), (2, 3, 0.0)]
+
+
+def _queued(uid: str, mode_id: Optional[str], gender: str = "woman", target_gender: str = "any") -> QueuedUser:
+    return QueuedUser(
+        uid=uid,
+        mode_id=mode_id,
+        prefs={"target_gender": target_gender},
+        profile={"uid": uid, "gender": gender},
+        coords=None,
+        waited_seconds=0.0,
+        enqueued_at=datetime(2026, 1, 1),
+    )
+
+
+def test_round_only_pairs_users_queued_for_the_same_mode(monkeypatch):
+    # Hard filters and exclusions are the poll's (and need the DB), only the mode partition is under test here
+    monkeypatch.setattr(matchmaking, "_are_preferences_compatible", lambda *args: True)
+    monkeypatch.setattr(
+        matchmaking, "_exclusion_set", lambda uid, enqueued_at, db: matchmaking.ExclusionSet(enqueued_at, set(), {})
+    )
+    users = [
+        _queued("a1", "mode-a"),
+        _queued("b1", "mode-b"),
+        _queued("a2", "mode-a", gender="man", target_gender="woman"),
+        _queued("none1", None),
+        _queued("b2", "mode-b"),
+        _queued("none2", None),
+    ]
+
+    edges = _build_graph(users, db=None, wait_horizon=60)
+
+    pairs = {frozenset((users[i].uid, users[j].uid)) for i, j, _ in edges}
+    assert pairs == {frozenset(("a1", "a2")), frozenset(("b1", "b2")), frozenset(("none1", "none2"))}
+    assert {frozenset((users[i].uid, users[j].uid)) for i, j, _ in solve_matching(edges)} == pairs